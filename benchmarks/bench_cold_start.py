@@ -0,0 +1,70 @@
+"""
+서버 콜드 스타트 벤치마크: 프로세스 시작 → 요청 수신 → 색인 준비(/ready) → 첫 답변 완료까지의 시간
+
+uvicorn 을 새 프로세스로 띄워 측정하므로 import / 색인 로드 비용이 모두 포함됩니다.
+OpenAI 호출이 필요하므로 benchmarks.fake_openai 와 함께 실행하는 것을 권장합니다.
+실행 (프로젝트 루트):
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=fake python -m benchmarks.bench_cold_start --runs 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def wait_for(url: str, started: float, timeout: float, ok_statuses=(200,)) -> float:
+    """
+    url 이 ok_statuses 중 하나를 반환할 때까지 폴링하고, 시작 시점부터 걸린 시간(초)을 반환
+    """
+    while time.perf_counter() - started < timeout:
+        try:
+            if httpx.get(url, timeout=1.0).status_code in ok_statuses:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} 응답 대기 시간 초과")
+
+
+def first_answer(base_url: str, query: str) -> None:
+    with httpx.stream("GET", f"{base_url}/chat", params={'query': query}, timeout=60.0) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line.startswith("data: ") and json.loads(line[len("data: "):])['status'] in ('complete', 'error'):
+                return
+
+
+def run_once(port: int, query: str, timeout: float) -> dict:
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                               env=os.environ.copy())
+    try:
+        listening = wait_for(f"{base_url}/ready", started, timeout, ok_statuses=(200, 503))
+        ready = wait_for(f"{base_url}/ready", started, timeout)
+        first_answer(base_url, query)
+        answered = time.perf_counter() - started
+        server_boot = httpx.get(f"{base_url}/ready").json()['boot']
+    finally:
+        process.terminate()
+        process.wait()
+    return {'listening_seconds': round(listening, 3), 'ready_seconds': round(ready, 3),
+            'first_answer_seconds': round(answered, 3), 'server_boot': server_boot}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="cold start benchmark")
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--query", default="스마트스토어 회원가입은 어떻게 하나요")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    for i in range(args.runs):
+        result = run_once(args.port, args.query, args.timeout)
+        print(f"run {i + 1}: listening={result['listening_seconds']}s ready={result['ready_seconds']}s "
+              f"first_answer={result['first_answer_seconds']}s server={result['server_boot']}")
@@ -0,0 +1,76 @@
+"""
+FAQ 전처리 벤치마크: 기존 행 단위 구현(apply + 여러 번의 re.sub) vs 벡터화 구현 (+ 다중 프로세스)
+
+FAQ 원본을 반복하여 행 수를 늘린 뒤 초당 처리 행 수를 비교하고, 결과가 기존 구현과 동일한지 확인합니다.
+실행 (프로젝트 루트): python -m benchmarks.bench_preprocessing [반복 횟수] [프로세스 수]
+"""
+import re
+import sys
+import time
+
+import pandas as pd
+
+from src.data_loader import load_data, additional_preprocessing, assign_faq_ids
+
+
+def legacy_extract_categories(df: pd.DataFrame) -> pd.DataFrame:
+    categories = []
+    subcategories = []
+    subcategory_pattern = re.compile(r'\(([^)]+)\)$')
+    for q in df['question']:
+        category_matches = re.findall(r'\[([^\]]+)\]', q)
+        categories.append(category_matches if category_matches else ['Uncategorized'])
+        subcategory_match = subcategory_pattern.search(q)
+        subcategories.append(subcategory_match.group(1) if subcategory_match else '')
+    df['category'] = categories
+    df['subcategory'] = subcategories
+    return df
+
+
+def legacy_clean_question(text: str) -> str:
+    text = re.sub(r'^\[([^\]]+)\]', '', text)
+    text = re.sub(r'\(([^)]+)\)$', '', text)
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def legacy_clean_answer(text: str) -> str:
+    text = re.sub(r'[^\w\s]', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text.strip()
+
+
+def legacy_preprocessing(df: pd.DataFrame) -> pd.DataFrame:
+    df = legacy_extract_categories(df.copy())
+    df['question_clean'] = df['question'].apply(legacy_clean_question)
+    df['answer_clean'] = df['answer'].apply(legacy_clean_answer)
+    return assign_faq_ids(df)
+
+
+def timed(name: str, fn, df: pd.DataFrame) -> pd.DataFrame:
+    start = time.perf_counter()
+    result = fn(df)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {elapsed:8.2f}s  {len(df) / elapsed:12.0f} rows/s")
+    return result
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    base = load_data("data/final_result.pkl")
+    # 행 단위 처리이므로 중복 행도 처리량 측정에는 문제가 없음 (유효성 검사는 하지 않음)
+    df = pd.concat([base] * repeat, ignore_index=True)
+    print(f"rows={len(df)}")
+
+    expected = timed("legacy (apply + re.sub)", legacy_preprocessing, df)
+    vectorized = timed("vectorized", lambda d: additional_preprocessing(d, workers=1), df)
+    parallel = timed(f"vectorized x{workers} proc",
+                     lambda d: additional_preprocessing(d, workers=workers, chunk_size=max(1, len(d) // workers)), df)
+
+    columns = ['category', 'subcategory', 'question_clean', 'answer_clean', 'id', 'content_hash']
+    for name, result in (("vectorized", vectorized), ("parallel", parallel)):
+        identical = expected[columns].equals(result[columns])
+        print(f"{name}: 결과 동일 = {identical}")
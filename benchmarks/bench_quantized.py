@@ -0,0 +1,119 @@
+"""
+2단계 검색 벤치마크: float32 정확 검색 vs int8 / PQ / Matryoshka(축소 차원) 근사 검색 + 원본 재계산
+
+재계산 후보 수별 recall@k(정확 검색 기준), 질의 지연 시간, 벡터당 상주 바이트 수를 비교합니다.
+Matryoshka 는 --matryoshka-dims 로 지정한 차원별로 측정합니다 (text-embedding-3 계열 실제 임베딩으로 측정해야 의미가 있음).
+--synthetic N 을 지정하면 FAQ 벡터에 노이즈를 더해 N 개로 늘린 코퍼스로 측정합니다 (대규모 코퍼스 모의).
+OpenAI API 를 호출하지 않습니다. 실행 (프로젝트 루트):
+    python -m benchmarks.bench_quantized --queries 300 --candidates 5 20 50 100 --matryoshka-dims 128 256 512
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.bench_retrieval import make_queries, report
+from src.embedding_store import load_embedding_store
+from src.quantization import normalize_rows, rescored_search, train_quantized_index
+
+
+def exact_search(corpus: np.ndarray, queries: np.ndarray, top_k: int) -> tuple:
+    latencies = []
+    ids = []
+    for query in queries:
+        start = time.perf_counter()
+        scores = corpus @ query
+        top = np.argpartition(-scores, top_k - 1)[:top_k]
+        top = top[np.argsort(-scores[top])]
+        latencies.append(time.perf_counter() - start)
+        ids.append(top)
+    return np.array(latencies), ids
+
+
+def quantized_search(index, corpus: np.ndarray, queries: np.ndarray, top_k: int, candidates: int) -> tuple:
+    latencies = []
+    ids = []
+    for query in queries:
+        start = time.perf_counter()
+        top, _ = rescored_search(index, corpus, query[np.newaxis, :], top_k, candidates)
+        latencies.append(time.perf_counter() - start)
+        ids.append(top[0])
+    return np.array(latencies), ids
+
+
+def variants(args) -> list:
+    """
+    (이름, 종류, 학습 옵션) 목록 - matryoshka 는 차원별로 하나씩
+    """
+    result = []
+    for kind in args.kinds:
+        if kind == "matryoshka":
+            result.extend((f"matryoshka{d}", kind, {'matryoshka_dimensions': d}) for d in args.matryoshka_dims)
+        else:
+            result.append((kind, kind, {'pq_subvectors': args.pq_subvectors}))
+    return result
+
+
+def resident_bytes(index) -> int:
+    """
+    검색 시 메모리에 상주하는 색인 본체 크기 (int8 / PQ 코드, 축소 차원 벡터)
+    """
+    return (index.codes if hasattr(index, 'codes') else index.vectors).nbytes
+
+
+def recall(result_ids: list, exact_ids: list) -> float:
+    return float(np.mean([len(set(r.tolist()) & set(e.tolist())) / len(e) for r, e in zip(result_ids, exact_ids)]))
+
+
+def synthetic_corpus(corpus: np.ndarray, count: int, noise: float, seed: int = 1) -> np.ndarray:
+    """
+    FAQ 벡터에 노이즈를 더해 count 개로 늘린 코퍼스 (대규모 코퍼스 모의, 청크 단위로 생성)
+    """
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(corpus), size=count)
+    synthetic = np.empty((count, corpus.shape[1]), dtype=np.float32)
+    for start in range(0, count, 10000):
+        block = corpus[rows[start:start + 10000]]
+        synthetic[start:start + len(block)] = normalize_rows(
+            block + rng.normal(0, noise, size=block.shape).astype(np.float32))
+    return synthetic
+
+
+def main(args):
+    store = load_embedding_store("data/embedding_store")
+    corpus = normalize_rows(store.vectors)
+    if args.synthetic > len(corpus):
+        corpus = synthetic_corpus(corpus, args.synthetic, args.synthetic_noise)
+    count, dim = corpus.shape
+    queries = make_queries(corpus, args.queries, noise=args.noise)
+    print(f"코퍼스 {count} x {dim}, 질의 {args.queries}개, top_k={args.top_k}\n")
+
+    exact_latencies, exact_ids = exact_search(corpus, queries, args.top_k)
+    print(f"float32 정확 검색: {dim * 4} bytes/vector, 전체 {corpus.nbytes / 1024 / 1024:.1f} MB")
+    report("float32", exact_latencies)
+
+    for name, kind, options in variants(args):
+        start = time.perf_counter()
+        index = train_quantized_index(corpus, kind, **options)
+        build_seconds = time.perf_counter() - start
+        code_bytes = resident_bytes(index) / count
+        print(f"\n{name}: {code_bytes:.1f} bytes/vector (float32 대비 1/{dim * 4 / code_bytes:.0f}), "
+              f"부가 데이터 포함 전체 {index.nbytes() / 1024 / 1024:.1f} MB, 생성 {build_seconds:.1f}s")
+        for candidates in args.candidates:
+            latencies, ids = quantized_search(index, corpus, queries, args.top_k, candidates)
+            report(f"{name} c={candidates}", latencies)
+            print(f"{'':<14} recall@{args.top_k}={recall(ids, exact_ids):.4f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="two-stage (quantized / matryoshka) retrieval benchmark")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--kinds", nargs="+", default=["int8", "pq", "matryoshka"])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[5, 20, 50, 100])
+    parser.add_argument("--pq-subvectors", type=int, default=96)
+    parser.add_argument("--matryoshka-dims", type=int, nargs="+", default=[128, 256, 512])
+    parser.add_argument("--noise", type=float, default=0.02)
+    parser.add_argument("--synthetic", type=int, default=0)
+    parser.add_argument("--synthetic-noise", type=float, default=0.05)
+    main(parser.parse_args())
@@ -0,0 +1,71 @@
+"""
+검색 백엔드 벤치마크: Chroma(HNSW) vs NumPy 정확 검색
+
+FAQ 질문 임베딩에 약간의 노이즈를 더한 벡터를 질의로 사용하므로 OpenAI API 를 호출하지 않습니다.
+실행 (프로젝트 루트): python -m benchmarks.bench_retrieval [질의 수] [top_k]
+"""
+import sys
+import time
+
+import numpy as np
+
+from src.embedding_store import load_embedding_store
+from src.retrieval import NumpyBackend, create_backend
+
+
+def make_queries(vectors: np.ndarray, n_queries: int, noise: float = 0.02, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, vectors.shape[0], size=n_queries)
+    queries = np.asarray(vectors[rows], dtype=np.float32) + rng.normal(0, noise, size=(n_queries, vectors.shape[1]))
+    return (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+
+
+def time_single(backend, queries: np.ndarray, top_k: int) -> tuple:
+    latencies = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        result = backend.query(query_embeddings=[query.tolist()], n_results=top_k)
+        latencies.append(time.perf_counter() - start)
+        results.append(result['ids'][0])
+    return np.array(latencies), results
+
+
+def report(name: str, latencies: np.ndarray):
+    print(f"{name:<14} p50={np.percentile(latencies, 50) * 1000:8.3f} ms  "
+          f"p95={np.percentile(latencies, 95) * 1000:8.3f} ms  "
+          f"p99={np.percentile(latencies, 99) * 1000:8.3f} ms  "
+          f"qps={len(latencies) / latencies.sum():10.1f}")
+
+
+def main(n_queries: int = 500, top_k: int = 5):
+    start = time.perf_counter()
+    store = load_embedding_store("data/embedding_store")
+    numpy_backend = NumpyBackend.from_store(store)
+    print(f"NumPy 백엔드 준비: {(time.perf_counter() - start) * 1000:.1f} ms ({store.header['count']} x {store.dim})")
+
+    start = time.perf_counter()
+    chroma_backend = create_backend("chroma")
+    print(f"Chroma 백엔드 준비: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    queries = make_queries(store.vectors, n_queries)
+    numpy_latencies, numpy_ids = time_single(numpy_backend, queries, top_k)
+    chroma_latencies, chroma_ids = time_single(chroma_backend, queries, top_k)
+
+    start = time.perf_counter()
+    numpy_backend.query(query_embeddings=queries, n_results=top_k)
+    batched_seconds = time.perf_counter() - start
+
+    print(f"\n질의 {n_queries}개, top_k={top_k}")
+    report("chroma", chroma_latencies)
+    report("numpy", numpy_latencies)
+    print(f"{'numpy (batch)':<14} 총 {batched_seconds * 1000:8.3f} ms  qps={n_queries / batched_seconds:10.1f}")
+
+    # NumPy 는 정확 검색이므로 Chroma(HNSW 근사) 결과의 recall 기준이 됩니다.
+    recall = np.mean([len(set(c) & set(n)) / len(n) for c, n in zip(chroma_ids, numpy_ids)])
+    print(f"chroma recall@{top_k} (numpy 정확 검색 기준): {recall:.4f}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,91 @@
+"""
+다중 워커 메모리 벤치마크: 워커 수별 워커당 상주 메모리(RSS / 전용 / 파일 매핑 / PSS)
+
+uvicorn --workers N 으로 서버를 띄우고, 모든 워커가 준비(/ready 200)되면 각 워커의 /proc 메모리 정보를 읽습니다.
+서빙 스냅샷(임베딩 저장소)은 워커마다 같은 파일을 매핑하므로 rss_file 은 공유되고, 워커 수에 비례해 늘어나는 것은 rss_anon 입니다.
+pss 는 공유 페이지를 공유하는 프로세스 수로 나눈 값이라 워커들의 pss 합이 실제 전체 사용량에 가깝습니다.
+Linux 전용. 실행 (프로젝트 루트, RETRIEVAL_BACKEND=numpy 권장):
+    RETRIEVAL_BACKEND=numpy OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=fake \\
+        python -m benchmarks.bench_workers --workers 1 2 4
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+MB = 1024 * 1024
+
+
+def read_memory(pid: int) -> dict:
+    memory = {}
+    fields = {'VmRSS': 'rss', 'RssAnon': 'rss_anon', 'RssFile': 'rss_file'}
+    with open(f"/proc/{pid}/status", encoding='utf-8') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in fields:
+                memory[fields[key]] = int(value.split()[0]) * 1024
+    with open(f"/proc/{pid}/smaps_rollup", encoding='utf-8') as f:
+        for line in f:
+            if line.startswith("Pss:"):
+                memory['pss'] = int(line.split()[1]) * 1024
+    return memory
+
+
+def wait_for_workers(base_url: str, workers: int, timeout: float) -> set:
+    """
+    서로 다른 워커 workers 개가 /ready 에 200 을 반환할 때까지 폴링하고 워커 pid 목록을 반환
+    """
+    started = time.perf_counter()
+    ready = set()
+    while time.perf_counter() - started < timeout:
+        try:
+            response = httpx.get(f"{base_url}/ready", timeout=1.0)
+            if response.status_code == 200:
+                ready.add(response.json()['pid'])
+                if len(ready) >= workers:
+                    return ready
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"워커 준비 대기 시간 초과 (준비된 워커 {len(ready)}/{workers})")
+
+
+def run(workers: int, port: int, requests: int, query: str, timeout: float) -> list:
+    base_url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+                                "--workers", str(workers), "--log-level", "warning"], env=os.environ.copy())
+    try:
+        pids = wait_for_workers(base_url, workers, timeout)
+        # 선택: 실제 질의로 메타데이터/답변 페이지까지 읽도록 워밍업 (OpenAI 호출 필요 - fake_openai 사용)
+        for _ in range(requests):
+            with httpx.stream("GET", f"{base_url}/chat", params={'query': query}, timeout=60.0) as response:
+                for _ in response.iter_lines():
+                    pass
+        return [(pid, read_memory(pid)) for pid in sorted(pids)]
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="multi-worker memory benchmark")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--port", type=int, default=8012)
+    parser.add_argument("--requests", type=int, default=0)
+    parser.add_argument("--query", default="스마트스토어 회원가입은 어떻게 하나요")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    print(f"{'workers':>7} {'pid':>8} {'rss':>9} {'anon':>9} {'file':>9} {'pss':>9}  (MB)")
+    for count in args.workers:
+        results = run(count, args.port, args.requests, args.query, args.timeout)
+        for pid, memory in results:
+            print(f"{count:>7} {pid:>8} {memory['rss'] / MB:9.1f} {memory['rss_anon'] / MB:9.1f} "
+                  f"{memory['rss_file'] / MB:9.1f} {memory['pss'] / MB:9.1f}")
+        total_rss = sum(memory['rss'] for _, memory in results) / MB
+        total_pss = sum(memory['pss'] for _, memory in results) / MB
+        print(f"{count:>7} {'total':>8} {total_rss:9.1f} {'':>9} {'':>9} {total_pss:9.1f}  "
+              f"(pss/worker={total_pss / count:.1f})")
@@ -0,0 +1,154 @@
+"""
+부하 테스트용 OpenAI 대역(fake) 서버 - embeddings / chat.completions(스트리밍 포함)
+
+- 임베딩: 문자 2-gram 특징 해싱으로 만든 결정적(deterministic) 단위 벡터. 비슷한 문장은 비슷한 벡터가 되므로
+  이 서버로 만든 색인에서 Chroma/NumPy 검색이 실제처럼 동작합니다.
+- 채팅: 설정한 첫 토큰 지연(TTFT)과 초당 토큰 수로 고정 답변을 스트리밍합니다.
+- 설정한 확률로 429 / 500 오류를 반환합니다.
+
+실행 (프로젝트 루트):
+    python -m benchmarks.fake_openai --port 9000 --ttft-ms 300 --tokens-per-second 40 --error-rate 0.01
+서버/오프라인 스크립트에서 사용:
+    OPENAI_BASE_URL=http://127.0.0.1:9000/v1 OPENAI_API_KEY=fake python main.py
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import zlib
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+settings = {
+    'embedding_latency_ms': 30.0,
+    'ttft_ms': 300.0,
+    'tokens_per_second': 40.0,
+    'completion_tokens': 120,
+    'error_rate': 0.0,
+    'dim': 1536,
+}
+
+ANSWER_TOKENS = [
+    "안녕하세요", "! ", "문의", "하신 ", "내용", "에 ", "대해 ", "안내", "해 ", "드리겠습니다", ".\n",
+    "1) ", "스마트스토어", "센터", "에 ", "로그인", "합니다", ".\n",
+    "2) ", "메뉴", "에서 ", "해당 ", "항목", "을 ", "선택", "합니다", ".\n",
+    "도움", "이 ", "되셨길 ", "바랍니다", ".\n\n", "추천 질문:\n", "- 스마트스토어센터 회원가입은 어떻게 하나요\n",
+]
+
+app = FastAPI(title="Fake OpenAI API")
+
+
+def fake_embedding(text: str, dim: int) -> list:
+    """
+    문자 2-gram 을 crc32 로 해싱하여 dim 차원에 부호와 함께 누적한 뒤 정규화
+    """
+    vector = [0.0] * dim
+    words = text.lower().split()
+    for word in words:
+        grams = [word] if len(word) <= 2 else [word[i:i + 2] for i in range(len(word) - 1)]
+        for gram in grams:
+            h = zlib.crc32(gram.encode('utf-8'))
+            vector[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def shorten(vector: list, dimensions: int) -> list:
+    """
+    dimensions 파라미터: 실제 API 와 같이 앞쪽 차원만 남기고 다시 정규화
+    """
+    if not dimensions or dimensions >= len(vector):
+        return vector
+    vector = vector[:dimensions]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def maybe_error():
+    if settings['error_rate'] > 0 and random.random() < settings['error_rate']:
+        if random.random() < 0.5:
+            return JSONResponse(status_code=429, headers={'retry-after': '1'},
+                                content={'error': {'message': 'Rate limit reached (fake)', 'type': 'rate_limit_error'}})
+        return JSONResponse(status_code=500, content={'error': {'message': 'Internal error (fake)', 'type': 'server_error'}})
+    return None
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    body = await request.json()
+    error = maybe_error()
+    if error is not None:
+        return error
+    await asyncio.sleep(settings['embedding_latency_ms'] / 1000)
+
+    inputs = body['input'] if isinstance(body['input'], list) else [body['input']]
+    dimensions = body.get('dimensions')
+    data = [{'object': 'embedding', 'index': i, 'embedding': shorten(fake_embedding(text, settings['dim']), dimensions)}
+            for i, text in enumerate(inputs)]
+    tokens = sum(len(text) for text in inputs)
+    return {'object': 'list', 'data': data, 'model': body.get('model'),
+            'usage': {'prompt_tokens': tokens, 'total_tokens': tokens}}
+
+
+def completion_tokens() -> list:
+    n = settings['completion_tokens']
+    return [ANSWER_TOKENS[i % len(ANSWER_TOKENS)] for i in range(n)]
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    error = maybe_error()
+    if error is not None:
+        return error
+
+    prompt_tokens = sum(len(message.get('content') or '') for message in body.get('messages', []))
+    tokens = completion_tokens()
+    usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(tokens),
+             'total_tokens': prompt_tokens + len(tokens)}
+    created = int(time.time())
+    base = {'id': f"chatcmpl-fake-{random.getrandbits(32):08x}", 'created': created, 'model': body.get('model')}
+
+    if not body.get('stream'):
+        await asyncio.sleep(settings['ttft_ms'] / 1000 + len(tokens) / settings['tokens_per_second'])
+        return {**base, 'object': 'chat.completion', 'usage': usage, 'choices': [
+            {'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': ''.join(tokens)}}]}
+
+    include_usage = (body.get('stream_options') or {}).get('include_usage', False)
+
+    async def stream():
+        await asyncio.sleep(settings['ttft_ms'] / 1000)
+        interval = 1.0 / settings['tokens_per_second']
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(interval)
+            chunk = {**base, 'object': 'chat.completion.chunk',
+                     'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]}
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        final = {**base, 'object': 'chat.completion.chunk', 'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]}
+        yield f"data: {json.dumps(final)}\n\n"
+        if include_usage:
+            yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake OpenAI API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--embedding-latency-ms", type=float, default=settings['embedding_latency_ms'])
+    parser.add_argument("--ttft-ms", type=float, default=settings['ttft_ms'])
+    parser.add_argument("--tokens-per-second", type=float, default=settings['tokens_per_second'])
+    parser.add_argument("--completion-tokens", type=int, default=settings['completion_tokens'])
+    parser.add_argument("--error-rate", type=float, default=settings['error_rate'])
+    parser.add_argument("--dim", type=int, default=settings['dim'])
+    args = parser.parse_args()
+
+    settings.update({key: value for key, value in vars(args).items() if key in settings})
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
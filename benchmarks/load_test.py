@@ -0,0 +1,179 @@
+"""
+/chat 부하 테스트
+
+지정한 동시성으로 GET /chat 을 호출하여 SSE 스트림을 끝까지 읽고 다음을 측정합니다.
+- TTFT: 요청 시작 → 첫 processing 프레임
+- 전체 지연 시간: 요청 시작 → complete/error 프레임
+- SSE 프레임 수 / 초당 프레임 수, 오류 수
+결과는 커밋 해시와 함께 benchmarks/results/ 에 JSON 으로 저장되어 커밋 간 비교할 수 있습니다.
+
+실행 (프로젝트 루트, 서버는 fake_openai 와 함께 실행 중이어야 함):
+    python -m benchmarks.load_test --concurrency 1 10 50 100 --requests 200
+    python -m benchmarks.load_test --compare benchmarks/results/a.json benchmarks/results/b.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import random
+import subprocess
+import time
+from datetime import datetime
+
+import httpx
+
+RESULTS_DIR = "benchmarks/results"
+
+
+def load_queries(path: str) -> list:
+    """
+    질의 목록: .txt 는 한 줄에 하나, 그 외에는 FAQ 원본(.pkl, {질문: 답변})의 질문을 사용
+    """
+    if path.endswith(".txt"):
+        with open(path, encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+    with open(path, 'rb') as f:
+        return list(pickle.load(f).keys())
+
+
+async def run_one(client: httpx.AsyncClient, base_url: str, query: str) -> dict:
+    result = {'ttft': None, 'latency': None, 'frames': 0, 'error': None}
+    start = time.perf_counter()
+    try:
+        async with client.stream("GET", f"{base_url}/chat", params={'query': query}) as response:
+            if response.status_code != 200:
+                result['error'] = f"http_{response.status_code}"
+                return result
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                frame = json.loads(line[len("data: "):])
+                result['frames'] += 1
+                if frame['status'] == 'processing' and result['ttft'] is None:
+                    result['ttft'] = time.perf_counter() - start
+                elif frame['status'] == 'error':
+                    result['error'] = 'sse_error'
+                    break
+                elif frame['status'] == 'complete':
+                    break
+    except httpx.HTTPError as e:
+        result['error'] = type(e).__name__
+    result['latency'] = time.perf_counter() - start
+    return result
+
+
+async def run_level(base_url: str, queries: list, concurrency: int, n_requests: int, timeout: float) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def bounded(query: str):
+            async with semaphore:
+                return await run_one(client, base_url, query)
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*[bounded(random.choice(queries)) for _ in range(n_requests)])
+        wall = time.perf_counter() - start
+    return summarize(results, concurrency, wall)
+
+
+def percentile(values: list, p: float):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(results: list, concurrency: int, wall: float) -> dict:
+    ok = [r for r in results if r['error'] is None]
+    ttfts = [r['ttft'] for r in ok if r['ttft'] is not None]
+    latencies = [r['latency'] for r in ok]
+    frames = sum(r['frames'] for r in results)
+    errors = {}
+    for r in results:
+        if r['error'] is not None:
+            errors[r['error']] = errors.get(r['error'], 0) + 1
+    ms = lambda v: round(v * 1000, 1) if v is not None else None
+    return {
+        'concurrency': concurrency,
+        'requests': len(results),
+        'wall_seconds': round(wall, 3),
+        'requests_per_second': round(len(results) / wall, 2),
+        'ttft_ms': {'p50': ms(percentile(ttfts, 50)), 'p95': ms(percentile(ttfts, 95)), 'p99': ms(percentile(ttfts, 99))},
+        'latency_ms': {'p50': ms(percentile(latencies, 50)), 'p95': ms(percentile(latencies, 95)),
+                       'p99': ms(percentile(latencies, 99))},
+        'frames': frames,
+        'frames_per_second': round(frames / wall, 1),
+        'errors': errors,
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def print_level(level: dict):
+    print(f"c={level['concurrency']:<4} rps={level['requests_per_second']:<8} "
+          f"ttft p50/p95/p99={level['ttft_ms']['p50']}/{level['ttft_ms']['p95']}/{level['ttft_ms']['p99']} ms  "
+          f"total p50/p95/p99={level['latency_ms']['p50']}/{level['latency_ms']['p95']}/{level['latency_ms']['p99']} ms  "
+          f"frames/s={level['frames_per_second']}  errors={level['errors']}")
+
+
+def compare(paths: list):
+    runs = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            runs.append(json.load(f))
+    print(f"{'concurrency':<12}" + "".join(f"{run['commit'] + ' ttft p95':>22}{'total p95':>12}" for run in runs))
+    levels = sorted({level['concurrency'] for run in runs for level in run['levels']})
+    for concurrency in levels:
+        row = f"{concurrency:<12}"
+        for run in runs:
+            level = next((lv for lv in run['levels'] if lv['concurrency'] == concurrency), None)
+            row += f"{(level['ttft_ms']['p95'] if level else '-'):>22}{(level['latency_ms']['p95'] if level else '-'):>12}"
+        print(row)
+
+
+async def main(args):
+    queries = load_queries(args.queries)
+    random.seed(args.seed)
+    levels = []
+    for concurrency in args.concurrency:
+        level = await run_level(args.base_url, queries, concurrency, args.requests, args.timeout)
+        print_level(level)
+        levels.append(level)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    run = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'base_url': args.base_url,
+        'requests_per_level': args.requests,
+        'levels': levels,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{run['commit']}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(run, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="/chat load test")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8001")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--requests", type=int, default=200, help="동시성 단계별 요청 수")
+    parser.add_argument("--queries", default="data/final_result.pkl")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    parser.add_argument("--compare", nargs="+", metavar="RESULT_JSON")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(args.compare)
+    else:
+        asyncio.run(main(args))
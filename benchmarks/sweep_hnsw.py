@@ -0,0 +1,184 @@
+"""
+Chroma(HNSW) 색인 설정 탐색: 거리 공간 x M x construction_ef x search_ef 조합별
+정확 검색 대비 recall@k, 질의 지연 시간(p50/p95/p99), 색인 생성 시간, 색인 크기를 측정합니다.
+
+질의는 FAQ 질문 임베딩과 노이즈를 더한 변형(--noise 단계별)이며, --query-file 로 실제 질문(한 줄에 하나)을 추가할 수 있습니다
+(이 경우에만 임베딩 API 호출 - fake_openai 사용 가능). 거리 공간별로 검색 결과 없음 임계값(NO_FAQ_MAX_DISTANCE)을
+해당 공간의 거리 단위로 환산하고, 공통 척도로 변환한 거리의 임계값 판정이 정확 검색과 일치하는 비율을 함께 보고합니다.
+결과는 커밋 해시와 함께 benchmarks/results/ 에 JSON 으로 저장합니다. 실행 (프로젝트 루트):
+    python -m benchmarks.sweep_hnsw --spaces l2 cosine --m 8 16 32 --construction-ef 100 200 --search-ef 10 50 100
+"""
+import argparse
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.bench_quantized import synthetic_corpus
+from benchmarks.bench_retrieval import make_queries, report
+from benchmarks.load_test import git_commit, RESULTS_DIR
+from src.config import EMBEDDING_DIMENSIONS
+from src.embedding_store import load_embedding_store
+from src.quantization import normalize_rows
+from src.retrieval import NO_FAQ_MAX_DISTANCE, to_l2_distance
+from src.vector_db import hnsw_configuration, apply_search_ef
+
+
+def load_queries(args, store, corpus: np.ndarray) -> np.ndarray:
+    """
+    FAQ 질문 임베딩(최대 --queries 개) + 노이즈 단계별 변형 + --query-file 의 실제 질문 임베딩
+    """
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(corpus), size=min(args.queries, len(corpus)), replace=False)
+    queries = [corpus[rows]]
+    for i, noise in enumerate(args.noise):
+        queries.append(make_queries(corpus, args.queries, noise=noise, seed=i + 1))
+    if args.query_file:
+        from src.openai_embedding import get_embeddings, load_openai_api_key
+
+        with open(args.query_file, encoding='utf-8') as f:
+            texts = [line.strip() for line in f if line.strip()]
+        embeddings = get_embeddings(load_openai_api_key(), texts, model=store.model,
+                                    dimensions=EMBEDDING_DIMENSIONS or None)
+        queries.append(normalize_rows(np.asarray(embeddings, dtype=np.float32)))
+        print(f"실제 질문 {len(texts)}개 임베딩 완료")
+    return np.concatenate(queries).astype(np.float32)
+
+
+def exact_search(corpus: np.ndarray, queries: np.ndarray, top_k: int) -> tuple:
+    """
+    정확 검색 top-k 행 번호와 1위 거리(공통 척도 2 - 2·cos)
+    """
+    scores = queries @ corpus.T
+    top = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    best = np.take_along_axis(scores, top, axis=1).max(axis=1)
+    return top, np.maximum(2.0 - 2.0 * best, 0.0)
+
+
+def directory_bytes(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def build_collection(path: str, corpus: np.ndarray, configuration: dict):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=path)
+    collection = client.create_collection(name="faq_embeddings_sweep", configuration=configuration,
+                                          embedding_function=None)
+    batch_size = client.get_max_batch_size()
+    for start in range(0, len(corpus), batch_size):
+        block = corpus[start:start + batch_size]
+        collection.add(ids=[str(i) for i in range(start, start + len(block))], embeddings=block)
+    return collection
+
+
+def reopen_collection(path: str, search_ef: int):
+    """
+    ef_search 를 바꾼 뒤 다시 엽니다. 이미 메모리에 올라온 HNSW 색인에는 변경된 ef_search 가 반영되지 않으므로
+    프로세스 내 Chroma 클라이언트 캐시를 비우고 새로 로드합니다 (서버는 기동 시 색인을 로드하기 전에 적용).
+    """
+    import chromadb
+    from chromadb.api.client import SharedSystemClient
+
+    apply_search_ef(chromadb.PersistentClient(path=path).get_collection("faq_embeddings_sweep"), search_ef)
+    SharedSystemClient.clear_system_cache()
+    return chromadb.PersistentClient(path=path).get_collection("faq_embeddings_sweep")
+
+
+def measure(collection, space: str, queries: np.ndarray, exact_ids: np.ndarray, exact_best: np.ndarray,
+            top_k: int) -> tuple:
+    latencies = []
+    recalls = []
+    agree = 0
+    # 첫 질의의 색인 로드 시간은 제외
+    collection.query(query_embeddings=[queries[0]], n_results=top_k, include=[])
+    for query, expected, best in zip(queries, exact_ids, exact_best):
+        start = time.perf_counter()
+        result = collection.query(query_embeddings=[query], n_results=top_k, include=['distances'])
+        latencies.append(time.perf_counter() - start)
+        found = {int(doc_id) for doc_id in result['ids'][0]}
+        recalls.append(len(found & set(expected.tolist())) / top_k)
+        distance = to_l2_distance(result['distances'], space)[0][0]
+        agree += (distance > NO_FAQ_MAX_DISTANCE) == (best > NO_FAQ_MAX_DISTANCE)
+    return np.array(latencies), float(np.mean(recalls)), agree / len(queries)
+
+
+def main(args):
+    store = load_embedding_store("data/embedding_store")
+    corpus = normalize_rows(store.vectors)
+    if args.synthetic > len(corpus):
+        corpus = synthetic_corpus(corpus, args.synthetic, args.synthetic_noise)
+    queries = load_queries(args, store, corpus)
+    exact_ids, exact_best = exact_search(corpus, queries, args.top_k)
+    print(f"코퍼스 {corpus.shape[0]} x {corpus.shape[1]}, 질의 {len(queries)}개, top_k={args.top_k}\n")
+
+    runs = []
+    for space, m, construction_ef in itertools.product(args.spaces, args.m, args.construction_ef):
+        path = tempfile.mkdtemp(prefix="hnsw-sweep-")
+        try:
+            configuration = hnsw_configuration(space, m, construction_ef, max(args.search_ef))
+            start = time.perf_counter()
+            build_collection(path, corpus, configuration)
+            build_seconds = time.perf_counter() - start
+            index_bytes = directory_bytes(path)
+            # 공통 척도 임계값을 이 공간의 거리 단위로 환산 (l2: 그대로, cosine / ip: 1/2)
+            native_threshold = NO_FAQ_MAX_DISTANCE if space == "l2" else NO_FAQ_MAX_DISTANCE / 2
+            print(f"space={space} M={m} construction_ef={construction_ef}: 생성 {build_seconds:.1f}s, "
+                  f"크기 {index_bytes / 1024 / 1024:.1f} MB, 임계값 {native_threshold} ({space} 거리 단위)")
+            for search_ef in args.search_ef:
+                collection = reopen_collection(path, search_ef)
+                latencies, recall, agreement = measure(collection, space, queries, exact_ids, exact_best, args.top_k)
+                report(f"  ef={search_ef}", latencies)
+                print(f"{'':<14} recall@{args.top_k}={recall:.4f}  임계값 판정 일치율={agreement:.4f}")
+                runs.append({
+                    'space': space, 'm': m, 'construction_ef': construction_ef, 'search_ef': search_ef,
+                    'recall': round(recall, 4), 'threshold_agreement': round(agreement, 4),
+                    'native_threshold': native_threshold,
+                    'latency_ms': {p: round(float(np.percentile(latencies, q)) * 1000, 3)
+                                   for p, q in (('p50', 50), ('p95', 95), ('p99', 99))},
+                    'build_seconds': round(build_seconds, 2), 'index_bytes': index_bytes,
+                })
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+
+    # recall 기준을 만족하는 조합 중 p99 가 가장 낮은 설정
+    passing = [run for run in runs if run['recall'] >= args.min_recall]
+    if passing:
+        best = min(passing, key=lambda run: (run['latency_ms']['p99'], run['index_bytes']))
+        print(f"\nrecall@{args.top_k} ≥ {args.min_recall} 중 p99 최저: CHROMA_SPACE={best['space']} HNSW_M={best['m']} "
+              f"HNSW_CONSTRUCTION_EF={best['construction_ef']} HNSW_SEARCH_EF={best['search_ef']} "
+              f"(p99={best['latency_ms']['p99']} ms, recall={best['recall']})")
+    else:
+        print(f"\nrecall@{args.top_k} ≥ {args.min_recall} 을 만족하는 조합이 없습니다.")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    commit = git_commit()
+    output = args.output or os.path.join(RESULTS_DIR,
+                                         f"hnsw-sweep-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'commit': commit, 'timestamp': datetime.now().isoformat(timespec='seconds'),
+                   'corpus': list(corpus.shape), 'queries': len(queries), 'top_k': args.top_k, 'runs': runs},
+                  f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Chroma HNSW parameter sweep (recall / latency / build time / size)")
+    parser.add_argument("--spaces", nargs="+", default=["l2", "cosine"], choices=["l2", "cosine", "ip"])
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=500, help="FAQ 질문 / 노이즈 단계별 질의 수")
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.02, 0.05])
+    parser.add_argument("--query-file", help="실제 질문 목록 (한 줄에 하나, 임베딩 API 호출)")
+    parser.add_argument("--min-recall", type=float, default=0.99)
+    parser.add_argument("--synthetic", type=int, default=0)
+    parser.add_argument("--synthetic-noise", type=float, default=0.05)
+    parser.add_argument("--output")
+    main(parser.parse_args())
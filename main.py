@@ -1,26 +1,73 @@
 import asyncio
 import json
+import os
+import time
+
+# 기동 시간 측정 기준 (무거운 import 전에 기록)
+BOOT_STARTED = time.perf_counter()
 
 import uvicorn
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
-from openai import Stream
+from fastapi.responses import StreamingResponse, PlainTextResponse, JSONResponse
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
 import logging
 
-from src.create_query_embedding_openai import create_query_embedding
-from src.generate_openai_response import generate_response_sse
-from src.openai_embedding import load_openai_api_key
-from src.search_faq import search_faq, get_answers_from_results
-from src.vector_db import initialize_chroma, load_embeddings_from_csv
+from src.config import (
+    EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL_SECONDS, EMBEDDING_CACHE_PATH,
+    EMBEDDING_BATCH_WINDOW_MS, EMBEDDING_BATCH_MAX_SIZE,
+    RESPONSE_CACHE_SIZE, RESPONSE_CACHE_MAX_DISTANCE, RETRIEVAL_BACKEND, BATCH_MAX_QUERIES, BATCH_MAX_CONCURRENCY,
+    LEXICAL_ENABLED, LEXICAL_FAST_PATH_MIN_SIMILARITY, LEXICAL_FAST_PATH_MIN_MARGIN, LEXICAL_FUSION_K,
+    SLOW_REQUEST_LOG_MS, REQUEST_DEADLINE_SECONDS, EMBEDDING_TIMEOUT_SECONDS, RETRIEVAL_TIMEOUT_SECONDS,
+    LLM_FIRST_TOKEN_TIMEOUT_SECONDS, SERVER_WORKERS, INDEX_RELOAD_INTERVAL_SECONDS,
+    DIRECT_ANSWER_MAX_DISTANCE, DIRECT_ANSWER_MIN_MARGIN, EMBEDDING_MAX_IN_FLIGHT, LLM_MAX_IN_FLIGHT, ADMISSION_MAX_QUEUE,
+    ADMISSION_MAX_WAIT_SECONDS, CLIENT_RATE_LIMIT_PER_MINUTE, CLIENT_RATE_LIMIT_BURST
+)
+from openai import RateLimitError
+from src.admission import AdmissionLimiter, AdmissionRejected, ClientRateLimiter, BUSY_MESSAGE
+from src.create_query_embedding_openai import create_query_embedding_async
+from src.direct_answer import DirectAnswerPolicy
+from src.embedding_batcher import EmbeddingMicroBatcher
+from src.embedding_cache import QueryEmbeddingCache
+from src.generate_openai_response import (
+    generate_response_sse, replay_response_sse, error_response_sse, generate_answer_async, TIMEOUT_MESSAGE,
+    NO_FAQ_MESSAGE
+)
+from src.lexical_index import BM25Index, LexicalRetriever
+from src.metrics import REGISTRY, RETRIEVAL_PATH_TOTAL, INDEX_RELOADS_TOTAL, RequestTimer, BootTimer, process_memory
+from src.openai_embedding import load_async_openai_client, get_embeddings_async
+from src.response_cache import SemanticResponseCache
+from src.retrieval import create_backend, NO_FAQ_MAX_DISTANCE
+from src.search_faq import (
+    search_faq_async, search_faq_batch_async, select_query_results, split_contexts, get_original_answer
+)
+from src.embedding_store import load_embedding_store, store_exists, current_store_version
+from src.vector_db import load_answer_index, load_answer_index_from_store
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-chroma_client = None
-collection = None
-df_embeddings = None
+boot = BootTimer(BOOT_STARTED)
+boot.mark("imports")
+
+retriever = None
+answer_index = None
 client = None
+embedding_cache = None
+embedding_batcher = None
+lexical_retriever = None
+response_cache = None
+# 고신뢰 검색 결과는 LLM 없이 저장된 답변으로 바로 응답
+direct_answer = DirectAnswerPolicy(max_distance=DIRECT_ANSWER_MAX_DISTANCE, min_margin=DIRECT_ANSWER_MIN_MARGIN)
+# 진입 제어: 업스트림별 동시 실행 수 + 대기열, 클라이언트별 요청 제한
+embedding_limiter = AdmissionLimiter("embedding", EMBEDDING_MAX_IN_FLIGHT, max_queue=ADMISSION_MAX_QUEUE,
+                                     max_wait_seconds=ADMISSION_MAX_WAIT_SECONDS)
+llm_limiter = AdmissionLimiter("llm", LLM_MAX_IN_FLIGHT, max_queue=ADMISSION_MAX_QUEUE,
+                               max_wait_seconds=ADMISSION_MAX_WAIT_SECONDS)
+client_rate_limiter = ClientRateLimiter(CLIENT_RATE_LIMIT_PER_MINUTE, burst=CLIENT_RATE_LIMIT_BURST)
+db_path: str = "data/chroma_db"
+embedding_store_dir: str = "data/embedding_store"
+# 색인(검색 백엔드/답변/어휘 색인) 준비 상태 - 준비되기 전에는 /chat 이 503 을 반환
+index_state = {'ready': False, 'error': None, 'backend': RETRIEVAL_BACKEND, 'snapshot_version': None, 'documents': None}
 
 
 # Pydantic 모델 정의
@@ -32,35 +79,150 @@ class QueryRequest(BaseModel):
 #     response: str
 
 
+def load_index() -> tuple:
+    """
+    검색 백엔드 / 답변 인덱스 / 어휘 색인을 준비하고 한 번 검색하여 워밍업합니다 (블로킹, 스레드에서 실행).
+    임베딩 저장소(서빙 스냅샷)가 있으면 메모리 매핑으로 열어 검색 백엔드와 답변/메타데이터에 함께 사용합니다.
+    """
+    store = load_embedding_store(embedding_store_dir) if store_exists(embedding_store_dir) else None
+    if store is not None and EMBEDDING_DIMENSIONS and store.dim != EMBEDDING_DIMENSIONS:
+        # 질의 임베딩과 FAQ 임베딩의 차원이 다르면 검색할 수 없음 (EMBEDDING_DIMENSIONS 로 임베딩을 다시 생성해야 함)
+        raise ValueError(f"임베딩 저장소 차원({store.dim})과 EMBEDDING_DIMENSIONS({EMBEDDING_DIMENSIONS})가 다릅니다.")
+
+    # 검색 백엔드 초기화 (chroma | numpy)
+    new_retriever = create_backend(RETRIEVAL_BACKEND, db_path=db_path, store_dir=embedding_store_dir, store=store)
+    logging.info(f"검색 백엔드 '{RETRIEVAL_BACKEND}' 초기화 완료")
+
+    # 문서 id → 답변 인덱스 로드 (메타데이터에 답변이 없는 기존 컬렉션용, 임베딩 벡터는 읽지 않음)
+    if store is not None:
+        new_answer_index = load_answer_index_from_store(store)
+    else:
+        new_answer_index = load_answer_index("data/embeddings_openai.csv")
+    logging.info("답변 인덱스 로드 완료")
+
+    # 어휘(BM25) 색인: 확신할 수 있는 질의는 임베딩 없이 바로 검색, 그 외에는 벡터 검색과 결합
+    new_lexical_retriever = None
+    if LEXICAL_ENABLED:
+        if store is None:
+            logging.warning("임베딩 저장소가 없어 어휘 색인을 사용하지 않습니다.")
+        else:
+            new_lexical_retriever = LexicalRetriever(
+                BM25Index.from_store(store),
+                min_similarity=LEXICAL_FAST_PATH_MIN_SIMILARITY,
+                min_margin=LEXICAL_FAST_PATH_MIN_MARGIN,
+                fusion_k=LEXICAL_FUSION_K
+            )
+
+    # 워밍업: 실제 검색을 한 번 실행하여 HNSW 색인 / 매핑된 벡터 페이지를 미리 읽어 둠
+    if store is not None and len(store) > 0:
+        new_retriever.query(query_embeddings=[store.vectors[0].tolist()], n_results=5)
+        logging.info("검색 워밍업 완료")
+
+    return new_retriever, new_answer_index, new_lexical_retriever, store
+
+
+def apply_index(loaded: tuple):
+    """
+    새로 로드한 색인으로 한 번에 교체 (await 없이 실행되므로 요청 처리 중간에 일부만 바뀌지 않음).
+    이전 스냅샷은 처리 중인 요청이 끝나 참조가 없어지면 매핑이 해제됩니다.
+    """
+    global retriever, answer_index, lexical_retriever
+    new_retriever, new_answer_index, new_lexical_retriever, store = loaded
+    retriever, answer_index, lexical_retriever = new_retriever, new_answer_index, new_lexical_retriever
+    index_state.update(
+        ready=True,
+        error=None,
+        snapshot_version=store.version if store is not None else new_retriever.index_version(),
+        documents=len(store) if store is not None else None
+    )
+
+
+async def prepare_index():
+    try:
+        apply_index(await asyncio.to_thread(load_index))
+        boot.mark("ready")
+    except Exception as e:
+        index_state['error'] = str(e)
+        logging.error(f"색인 준비 실패: {e}")
+
+
+async def watch_index(interval: float):
+    """
+    서빙 스냅샷의 CURRENT 가 바뀌면(src.reindex 등) 새 버전을 매핑하여 워커 재시작 없이 교체합니다.
+    교체에 실패하면 기존 색인으로 계속 서비스하고 다음 주기에 다시 시도합니다.
+    기동 시 색인 준비에 실패했으면(스냅샷 미발행, 일시적인 읽기 오류 등) 준비될 때까지 주기마다 다시 로드합니다.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        if not index_state['ready']:
+            # 기동 시 로드가 아직 진행 중이면(error 없음) 기다리고, 실패했으면 다시 시도
+            if index_state['error'] is not None:
+                await prepare_index()
+            continue
+        version = current_store_version(embedding_store_dir)
+        if version is None or version == index_state['snapshot_version']:
+            continue
+        try:
+            apply_index(await asyncio.to_thread(load_index))
+            INDEX_RELOADS_TOTAL.inc(result="swapped")
+            logging.info(f"서빙 스냅샷 교체 완료: {index_state['snapshot_version']} (pid={os.getpid()})")
+        except Exception as e:
+            INDEX_RELOADS_TOTAL.inc(result="failed")
+            logging.error(f"서빙 스냅샷 교체 실패 ({version}): {e}")
+
+
 # lifespan 핸들러
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global chroma_client, collection, df_embeddings, client
-    # OpenAI API 키 로드
-    client = load_openai_api_key()
+    global client, embedding_cache, embedding_batcher, response_cache
+    # OpenAI API 키 로드 (이벤트 루프를 막지 않도록 비동기 클라이언트 사용)
+    client = load_async_openai_client()
     logging.info("OpenAI API 키 로드 완료")
 
-    # Chroma 클라이언트 초기화
-    db_path: str = "data/chroma_db"
-    chroma_client = initialize_chroma(db_path)
-    logging.info("ChromaDB 클라이언트 초기화 완료")
-
-    # 컬렉션 로드
-    collection_name = "faq_embeddings"
-    try:
-        collection = chroma_client.get_collection(name=collection_name)
-        logging.info(f"컬렉션 '{collection_name}' 로드 완료")
-    except Exception as e:
-        logging.error(f"컬렉션 '{collection_name}'을(를) 찾을 수 없습니다: {e}")
-        raise e
-
-    # Embedding 데이터 로드
-    embedding_csv_path = "data/embeddings_openai.csv"
-    df_embeddings = load_embeddings_from_csv(embedding_csv_path)
-    logging.info("Embedding 데이터 로드 완료")
+    # 질의 임베딩 캐시
+    embedding_cache = QueryEmbeddingCache(
+        model=EMBEDDING_MODEL,
+        max_size=EMBEDDING_CACHE_SIZE,
+        ttl_seconds=EMBEDDING_CACHE_TTL_SECONDS,
+        disk_path=EMBEDDING_CACHE_PATH or None,
+        dimensions=EMBEDDING_DIMENSIONS or None
+    )
+
+    # 질의 임베딩 마이크로 배칭 (동시 요청을 모아 한 번의 API 호출로 처리)
+    if EMBEDDING_BATCH_WINDOW_MS > 0:
+        embedding_batcher = EmbeddingMicroBatcher(
+            client,
+            model=EMBEDDING_MODEL,
+            window_ms=EMBEDDING_BATCH_WINDOW_MS,
+            max_batch_size=EMBEDDING_BATCH_MAX_SIZE,
+            dimensions=EMBEDDING_DIMENSIONS or None,
+            limiter=embedding_limiter
+        )
+
+    # 의미 기반 응답 캐시
+    response_cache = SemanticResponseCache(
+        max_entries=RESPONSE_CACHE_SIZE,
+        max_distance=RESPONSE_CACHE_MAX_DISTANCE
+    )
+
+    register_cache_metrics()
+
+    # 색인 로드/워밍업은 백그라운드에서 진행하고 바로 요청을 받기 시작 (준비 여부는 GET /ready)
+    index_task = asyncio.create_task(prepare_index())
+    # 서빙 스냅샷 변경 감지 → 무중단 교체
+    watch_task = None
+    if INDEX_RELOAD_INTERVAL_SECONDS > 0:
+        watch_task = asyncio.create_task(watch_index(INDEX_RELOAD_INTERVAL_SECONDS))
+    boot.mark("startup")
 
     yield
 
+    index_task.cancel()
+    if watch_task is not None:
+        watch_task.cancel()
+    await client.close()
+    embedding_cache.close()
+
 
 app = FastAPI(
     title="SmartStore FAQ Chatbot API",
@@ -83,70 +245,347 @@ async def get_chat(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
+@app.get("/stats")
+async def stats():
+    return {
+        'embedding_cache': embedding_cache.stats(),
+        'embedding_batcher': embedding_batcher.stats() if embedding_batcher else None,
+        'lexical': lexical_retriever.stats() if lexical_retriever else None,
+        'response_cache': response_cache.stats(),
+        'direct_answer': direct_answer.stats(),
+        'admission': {'embedding': embedding_limiter.stats(), 'llm': llm_limiter.stats(),
+                      'client_rate_limit': client_rate_limiter.stats()},
+        # 워커가 여러 개이면 요청을 처리한 워커의 값 (rss_file 은 공유되는 매핑 파일 페이지)
+        'worker': {'pid': os.getpid(), 'snapshot_version': index_state['snapshot_version'], 'memory': process_memory()}
+    }
+
+
+def register_cache_metrics():
+    """
+    캐시/어휘 검색 통계를 /metrics 의 gauge 로 노출 (조회 시점의 값)
+    """
+    REGISTRY.gauge_callback("faq_embedding_cache_hit_rate", "Query embedding cache hit rate",
+                            lambda: embedding_cache.stats()['hit_rate'])
+    REGISTRY.gauge_callback("faq_embedding_cache_saved_requests", "Embedding API calls avoided by the cache",
+                            lambda: embedding_cache.stats()['saved_requests'])
+    REGISTRY.gauge_callback("faq_response_cache_hit_rate", "Semantic response cache hit rate",
+                            lambda: response_cache.stats()['hit_rate'])
+    REGISTRY.gauge_callback("faq_lexical_fast_path_rate", "Share of requests answered by the lexical fast path",
+                            lambda: lexical_retriever.stats()['fast_path_rate'] if lexical_retriever else None)
+    REGISTRY.gauge_callback("faq_direct_answer_rate", "Share of answerable requests served with the stored FAQ answer",
+                            lambda: direct_answer.stats()['rate'] if direct_answer.enabled else None)
+    REGISTRY.gauge_callback("faq_admission_embedding_queue_depth", "Requests waiting for an embedding call slot",
+                            lambda: embedding_limiter.queue_depth)
+    REGISTRY.gauge_callback("faq_admission_embedding_in_flight", "Embedding calls currently in flight",
+                            lambda: embedding_limiter.in_flight)
+    REGISTRY.gauge_callback("faq_admission_llm_queue_depth", "Requests waiting for an LLM stream slot",
+                            lambda: llm_limiter.queue_depth)
+    REGISTRY.gauge_callback("faq_admission_llm_in_flight", "LLM streams currently in flight",
+                            lambda: llm_limiter.in_flight)
+    REGISTRY.gauge_callback("faq_boot_ready_seconds", "Seconds from process boot until the index was warm",
+                            lambda: boot.phases.get("ready"))
+    REGISTRY.gauge_callback("faq_boot_first_answer_seconds", "Seconds from process boot until the first answer finished",
+                            lambda: boot.phases.get("first_answer"))
+    REGISTRY.gauge_callback("faq_process_resident_bytes", "Resident memory of this worker process",
+                            lambda: process_memory().get('rss'))
+    REGISTRY.gauge_callback("faq_process_resident_anon_bytes", "Private (anonymous) resident memory of this worker",
+                            lambda: process_memory().get('rss_anon'))
+    REGISTRY.gauge_callback("faq_process_resident_file_bytes",
+                            "File-backed resident memory (shared libraries and mapped snapshot pages)",
+                            lambda: process_memory().get('rss_file'))
+    REGISTRY.gauge_callback("faq_process_proportional_bytes", "Proportional set size (shared pages split across processes)",
+                            lambda: process_memory().get('pss'))
+    REGISTRY.gauge_callback("faq_embedding_batcher_avg_batch_size", "Average query embedding micro-batch size",
+                            lambda: embedding_batcher.stats()['avg_batch_size'] if embedding_batcher else None)
+
+
+@app.get("/ready")
+async def ready():
+    """
+    준비 상태 확인 (readiness probe): 색인 로드/워밍업이 끝나면 200, 그 전에는 503
+    """
+    body = {**index_state, 'pid': os.getpid(), 'boot': boot.stats()}
+    return JSONResponse(body, status_code=200 if index_state['ready'] else 503)
+
+
+def ensure_ready():
+    if not index_state['ready']:
+        raise HTTPException(status_code=503, detail="서버가 아직 준비 중입니다. 잠시 후 다시 시도해 주세요.",
+                            headers={'Retry-After': '1'})
+
+
+def admit(request: Request):
+    """
+    클라이언트별 요청 제한 + LLM 대기열이 이미 가득 찼으면 작업을 시작하기 전에 429 로 거절
+    (클라이언트 주소는 프록시 뒤에서는 uvicorn --proxy-headers / --forwarded-allow-ips 로 X-Forwarded-For 를 반영)
+    임베딩 대기열은 실제로 임베딩 API 를 호출할 때(캐시 미스, 어휘 빠른 경로가 아닌 경우)만 확인합니다.
+    """
+    try:
+        client_rate_limiter.check(request.client.host if request.client else "unknown")
+        llm_limiter.check()
+    except AdmissionRejected as e:
+        raise too_many_requests(e)
+
+
+def too_many_requests(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=429, detail=e.message, headers={'Retry-After': str(e.retry_after)})
+
+
+def mark_first_answer(outcome: str):
+    if outcome != "error":
+        boot.mark("first_answer")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus 텍스트 형식 지표 (단계별 지연 시간, 요청 결과별 건수, 스트리밍 토큰 수, 캐시 적중률)
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+def build_contexts(results, timer: RequestTimer = None) -> tuple:
+    """
+    검색 결과(top_k=5)에서 LLM 에 전달할 FAQ 답변과 추천 질문 후보를 고릅니다.
+    상위 3개는 답변용, 나머지 2개는 추천 질문용 (프롬프트 구성/토큰 예산은 src.prompt_builder 에서 처리)
+    """
+    timer = timer or RequestTimer()
+    # 실제 답변 text 추출, 나머지 2개의 질문 text 를 추천 질문 후보로 사용
+    with timer.stage("answers"):
+        answers_for_llm, recommended_questions = split_contexts(results, answer_index)
+    logging.info("FAQ 답변 추출 완료")
+
+    return answers_for_llm, recommended_questions
+
+
+def build_direct_answer(results) -> str:
+    """
+    1위 FAQ 의 저장된 원문 답변 + 추천 질문 (직접 응답)
+    """
+    return direct_answer.format(get_original_answer(results, answer_index), results)
+
+
 @app.get("/chat")
-async def chat(query: str):
+async def chat(query: str, request: Request):
     user_query = query
     if not user_query:
         raise HTTPException(status_code=400, detail="질문이 비어 있습니다.")
-
+    ensure_ready()
+    admit(request)
+
+    # 단계별 소요 시간 기록 (스트리밍 응답은 스트림이 끝날 때 요청 종료 처리)
+    # 요청 전체 마감(REQUEST_DEADLINE_SECONDS) 안에서 단계별 제한 시간을 적용하고, 초과하면 error 프레임으로 응답
+    timer = RequestTimer("/chat", slow_request_ms=SLOW_REQUEST_LOG_MS, on_finish=mark_first_answer,
+                         deadline_seconds=REQUEST_DEADLINE_SECONDS)
+    # 요청 처리 중 서빙 스냅샷이 교체되어도 검색 결과와 응답 캐시 키가 같은 색인 버전을 사용하도록 고정
+    active_retriever = retriever
     try:
-        # 1) 사용자 입력을 임베딩
-        query_embedding = create_query_embedding(client, user_query)
-
-        # 2) FAQ 검색 → top_k=5개
-        results = search_faq(collection, query_embedding, top_k=5)
-        logging.info("유사한 FAQ 검색 완료")
+        # 0) 어휘 빠른 경로: FAQ 질문과 거의 같은 질의면 임베딩 호출 없이 바로 검색 결과 사용
+        results = None
+        if lexical_retriever is not None:
+            with timer.stage("lexical"):
+                results = lexical_retriever.fast_path(user_query, top_k=5)
+        query_embedding = None
+        if results is not None:
+            retrieval_path = "lexical"
+        else:
+            # 1) 사용자 입력을 임베딩
+            with timer.stage("embedding"):
+                query_embedding = await asyncio.wait_for(
+                    create_query_embedding_async(client, user_query, cache=embedding_cache,
+                                                 model=EMBEDDING_MODEL, batcher=embedding_batcher,
+                                                 dimensions=EMBEDDING_DIMENSIONS or None, limiter=embedding_limiter),
+                    timeout=timer.timeout(EMBEDDING_TIMEOUT_SECONDS)
+                )
+
+            # 2) FAQ 검색 → top_k=5개 (검색 스레드 풀에서 실행)
+            with timer.stage("search"):
+                results = await asyncio.wait_for(search_faq_async(active_retriever, query_embedding, top_k=5),
+                                                 timeout=timer.timeout(RETRIEVAL_TIMEOUT_SECONDS))
+            retrieval_path = "vector"
+            if lexical_retriever is not None:
+                with timer.stage("fuse"):
+                    results = lexical_retriever.fuse(user_query, results, top_k=5)
+                retrieval_path = "fused"
+        RETRIEVAL_PATH_TOTAL.inc(path=retrieval_path)
+        logging.info(f"유사한 FAQ 검색 완료 (path={retrieval_path})")
 
         distances = results.get('distances', [1.0])
         # print(distances)
         min_distance = min(distances[0])
-        threshold = 1.0
+        # 어휘 빠른 경로의 거리는 자카드 유사도 기반이라 임베딩 거리(2 - 2·cos) 기준의 임계값과 비교하지 않음
+        # (빠른 경로 자체가 유사도 / 점수 차 기준을 통과한 결과이므로 관련 FAQ 없음 / 직접 응답 판정을 건너뜀)
+        embedding_scale = retrieval_path != "lexical"
 
-        if min_distance > threshold:
+        if embedding_scale and min_distance > NO_FAQ_MAX_DISTANCE:
             # 유사도 점수가 낮아 연관성이 없는 경우
             logging.info(f"FAQ 유사도 점수 낮음 (min_distance={min_distance}), LLM 호출 생략")
+            return StreamingResponse(replay_response_sse(NO_FAQ_MESSAGE, timer=timer, outcome="below_threshold"),
+                                     media_type="text/event-stream")
+
+        # 1위 FAQ 가 질의와 거의 같고 다른 후보와 충분히 떨어져 있으면 저장된 답변을 그대로 전송
+        if embedding_scale and direct_answer.matches(results):
+            with timer.stage("answers"):
+                answer = build_direct_answer(results)
+            return StreamingResponse(replay_response_sse(answer, timer=timer, outcome="direct_answer"),
+                                     media_type="text/event-stream")
+
+        # 동일한 FAQ 들이 검색된 유사 질문의 답변이 캐시되어 있으면 LLM 호출 없이 재사용
+        # (어휘 빠른 경로는 질의 임베딩이 없으므로 응답 캐시를 사용하지 않음)
+        faq_ids = results['ids'][0]
+        index_version = active_retriever.index_version()
+        if query_embedding is not None:
+            with timer.stage("response_cache"):
+                cached_answer = response_cache.lookup(query_embedding, faq_ids, index_version)
+            if cached_answer is not None:
+                return StreamingResponse(replay_response_sse(cached_answer, timer=timer, outcome="response_cache"),
+                                         media_type="text/event-stream")
+
+        # 3) 답변/추천 질문 컨텍스트 구성
+        faq_answers, related_questions = build_contexts(results, timer)
+
+        def cache_answer(answer: str):
+            if query_embedding is not None:
+                response_cache.store(query_embedding, faq_ids, answer, index_version)
+
+        # 클라이언트가 연결을 끊으면 LLM 스트림을 바로 닫음
+        return StreamingResponse(generate_response_sse(client, user_query, faq_answers, related_questions,
+                                                       on_complete=cache_answer, timer=timer,
+                                                       is_disconnected=request.is_disconnected,
+                                                       first_token_timeout=LLM_FIRST_TOKEN_TIMEOUT_SECONDS,
+                                                       limiter=llm_limiter),
+                                 media_type="text/event-stream")
 
-            def generate_error():
-                yield f"data: {json.dumps({'status': 'processing', 'data': '질문과 관련된 FAQ가 없습니다. 다시 시도해 주세요.'}, ensure_ascii=False)}\n\n"
-                yield f"data: {json.dumps({'status': 'complete', 'data': 'Stream finished'}, ensure_ascii=False)}\n\n"
-
-            return StreamingResponse(generate_error(), media_type="text/event-stream")
-
-        # 3) 상위 3개는 답변용, 나머지 2개는 추천 질문용
-        top_3_results = {
-            'documents': [results['documents'][0][:3]],
-            'metadatas': [results['metadatas'][0][:3]]
-        }
-        # 나머지 2개
-        recommended_results = {
-            'documents': [results['documents'][0][3:]],
-            'metadatas': [results['metadatas'][0][3:]]
-        }
-
-        # 4) 실제 답변 text 추출
-        answers_for_llm = get_answers_from_results(top_3_results, df_embeddings)
-        logging.info("FAQ 답변 추출 완료")
-
-        # 5) 추천 질문 text 추출
-        recommended_questions = [doc for doc in recommended_results['documents'][0]]
+    except asyncio.TimeoutError:
+        logging.warning(f"검색 단계 시간 초과: {timer.stages}")
+        return StreamingResponse(error_response_sse(TIMEOUT_MESSAGE, timer=timer, outcome="timeout"),
+                                 media_type="text/event-stream")
 
-        faq_context = ""
-        for i, ans in enumerate(answers_for_llm):
-            faq_context += f"FAQ {i + 1} Answer:\n{ans}\n\n"
+    except AdmissionRejected as e:
+        # 질의 임베딩 대기열이 가득 찼거나 대기 시간 초과 (응답 시작 전이므로 429)
+        timer.finish("rejected")
+        logging.warning(f"질의 임베딩 진입 거절 ({e.reason})")
+        raise too_many_requests(e)
 
-        # 추천 질문 컨텍스트 구성
-        recommended_context = ""
-        for i, q in enumerate(recommended_questions):
-            recommended_context += f"- {q}\n"
+    except RateLimitError as e:
+        timer.finish("rejected")
+        logging.warning(f"OpenAI 요청 한도 초과: {e}")
+        raise too_many_requests(AdmissionRejected(BUSY_MESSAGE, "upstream_rate_limited"))
 
-        return StreamingResponse(generate_response_sse(client, user_query, faq_context, recommended_context),
-                                 media_type="text/event-stream")
+    except Exception as e:
+        timer.finish("error")
+        logging.error(f"챗봇 응답 생성 실패: {e}")
+        raise HTTPException(status_code=500, detail="챗봇 응답 생성에 실패했습니다.")
 
 
+class BatchQueryRequest(BaseModel):
+    queries: list[str]
+    # ndjson: 한 줄에 하나의 JSON 결과 / sse: data: 프레임으로 다중화
+    format: str = "ndjson"
+
+
+async def embed_queries(queries: list) -> list:
+    """
+    캐시에 없는 질의만 모아 한 번의 임베딩 API 호출로 처리합니다.
+    """
+    embeddings = list(await asyncio.gather(*(embedding_cache.get_async(q) for q in queries)))
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        start = time.perf_counter()
+        async with embedding_limiter.slot():
+            new_embeddings = await get_embeddings_async(client, [queries[i] for i in missing], model=EMBEDDING_MODEL,
+                                                        dimensions=EMBEDDING_DIMENSIONS or None)
+        elapsed = (time.perf_counter() - start) / len(missing)
+        for i, embedding in zip(missing, new_embeddings):
+            embeddings[i] = embedding
+            embedding_cache.set(queries[i], embedding, elapsed_seconds=elapsed)
+    return embeddings
+
+
+@app.post("/chat/batch")
+async def chat_batch(request: BatchQueryRequest, http_request: Request):
+    queries = [q.strip() for q in request.queries]
+    if not queries or any(not q for q in queries):
+        raise HTTPException(status_code=400, detail="질문이 비어 있습니다.")
+    if len(queries) > BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"한 번에 최대 {BATCH_MAX_QUERIES}개의 질문만 처리할 수 있습니다.")
+    if request.format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format 은 ndjson 또는 sse 만 지원합니다.")
+    ensure_ready()
+    admit(http_request)
+
+    active_retriever = retriever
+    try:
+        # 1) 모든 질의를 한 번에 임베딩, 2) 한 번의 다중 질의 검색
+        query_embeddings = await embed_queries(queries)
+        results = await search_faq_batch_async(active_retriever, query_embeddings, top_k=5)
+        logging.info(f"배치 FAQ 검색 완료: {len(queries)}건")
+    except AdmissionRejected as e:
+        raise too_many_requests(e)
     except Exception as e:
-        logging.error(f"챗봇 응답 생성 실패: {e}")
+        logging.error(f"배치 챗봇 응답 생성 실패: {e}")
         raise HTTPException(status_code=500, detail="챗봇 응답 생성에 실패했습니다.")
 
+    index_version = active_retriever.index_version()
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+
+    async def answer(i: int) -> dict:
+        row = select_query_results(results, i)
+        result = {'index': i, 'query': queries[i], 'status': 'complete'}
+        try:
+            if min(row['distances'][0]) > NO_FAQ_MAX_DISTANCE:
+                result['data'] = NO_FAQ_MESSAGE
+                return result
+            if direct_answer.matches(row):
+                result['data'] = build_direct_answer(row)
+                return result
+
+            faq_ids = row['ids'][0]
+            cached_answer = response_cache.lookup(query_embeddings[i], faq_ids, index_version)
+            if cached_answer is not None:
+                result['data'] = cached_answer
+                return result
+
+            faq_answers, related_questions = build_contexts(row)
+            # 3) LLM 생성은 동시 실행 수를 제한하여 병렬 처리
+            async with semaphore, llm_limiter.slot():
+                generated = await generate_answer_async(client, queries[i], faq_answers, related_questions)
+            response_cache.store(query_embeddings[i], faq_ids, generated, index_version)
+            result['data'] = generated
+        except Exception as e:
+            logging.error(f"배치 응답 생성 실패 (index={i}): {e}")
+            result.update(status='error', data=str(e))
+        return result
+
+    async def stream_results():
+        # 완료되는 순서대로 결과를 전송, 클라이언트가 연결을 끊으면 남은 질의의 LLM 생성을 취소
+        tasks = [asyncio.create_task(answer(i)) for i in range(len(queries))]
+        pending = set(tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=1.0, return_when=asyncio.FIRST_COMPLETED)
+                if await http_request.is_disconnected():
+                    logging.info(f"클라이언트 연결 종료, 남은 배치 응답 {len(pending)}건 취소")
+                    return
+                for finished in done:
+                    result = finished.result()
+                    if request.format == "sse":
+                        yield f"data: {json.dumps(result, ensure_ascii=False)}\n\n"
+                    else:
+                        yield json.dumps(result, ensure_ascii=False) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+        if request.format == "sse":
+            yield f"data: {json.dumps({'status': 'done', 'data': 'Batch finished'}, ensure_ascii=False)}\n\n"
+
+    media_type = "text/event-stream" if request.format == "sse" else "application/x-ndjson"
+    return StreamingResponse(stream_results(), media_type=media_type)
+
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8001, reload=True)
+    if SERVER_WORKERS > 1:
+        # 운영 모드: 워커 프로세스마다 같은 서빙 스냅샷 파일을 매핑하므로 벡터/메타데이터 페이지는 OS 페이지 캐시로 공유됨
+        uvicorn.run("main:app", host="0.0.0.0", port=8001, workers=SERVER_WORKERS)
+    else:
+        uvicorn.run("main:app", host="0.0.0.0", port=8001, reload=True)
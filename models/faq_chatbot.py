@@ -3,8 +3,9 @@ import logging
 from src.create_query_embedding_openai import create_query_embedding
 from src.generate_openai_response import generate_response
 from src.openai_embedding import load_openai_api_key
-from src.search_faq import search_faq, get_answers_from_results
-from src.vector_db import initialize_chroma, create_collection, load_embeddings_from_csv
+from src.search_faq import search_faq, split_contexts
+from src.vector_db import initialize_chroma, create_collection, load_answer_index_from_store
+from src.embedding_store import load_embedding_store
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -21,8 +22,8 @@ def main():
         logging.error(f"컬렉션 '{collection_name}'을(를) 찾을 수 없습니다: {e}")
         return
 
-    embedding_csv_path = "../data/embeddings_openai.csv"
-    df_embeddings = load_embeddings_from_csv(embedding_csv_path)
+    embedding_store_dir = "data/embedding_store"
+    answer_index = load_answer_index_from_store(load_embedding_store(embedding_store_dir))
     while True:
         user_query = input("\n질문을 입력하세요 (종료하려면 'exit' 입력): ")
         if user_query.lower() == 'exit':
@@ -32,14 +33,14 @@ def main():
         # 질의 Embedding 생성
         query_embedding = create_query_embedding(client, user_query)
 
-        # 유사한 FAQ 검색
-        results = search_faq(collection, query_embedding, top_k=3)
+        # 유사한 FAQ 검색 (상위 3개는 답변, 나머지 2개는 추천 질문 후보)
+        results = search_faq(collection, query_embedding, top_k=5)
 
         # 답변 추출
-        answers = get_answers_from_results(results, df_embeddings)
+        answers, related_questions = split_contexts(results, answer_index)
 
         # LLM을 사용하여 최종 응답 생성
-        llm_response = generate_response(client, answers, user_query)
+        llm_response = generate_response(client, answers, related_questions, user_query)
 
         # 응답 출력
         print("\n챗봇 응답:")
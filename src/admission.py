@@ -0,0 +1,184 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+
+from src.metrics import ADMISSION_WAIT_SECONDS, ADMISSION_REJECTED_TOTAL
+
+BUSY_MESSAGE = "요청이 많아 지금은 처리할 수 없습니다. 잠시 후 다시 시도해 주세요."
+RATE_LIMITED_MESSAGE = "요청 횟수 제한을 초과했습니다. 잠시 후 다시 시도해 주세요."
+
+
+class AdmissionRejected(Exception):
+    """
+    대기열이 가득 찼거나(queue_full), 대기 시간을 넘겼거나(wait_timeout), 클라이언트 요청 제한(rate_limited)으로 거절
+    retry_after: 클라이언트에 알려줄 재시도 대기 시간(초, Retry-After 헤더)
+    """
+
+    def __init__(self, message: str, reason: str, retry_after: int = 1):
+        super().__init__(message)
+        self.message = message
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """
+    업스트림(임베딩 / LLM) 호출의 동시 실행 수 제한 + 크기가 제한된 FIFO 대기열
+    - 실행 중인 호출이 max_concurrency 개이면 최대 max_queue 개까지 대기하고, 대기열이 가득 차면 바로 거절
+    - 대기는 최대 max_wait_seconds (호출 측 남은 마감 시간이 더 짧으면 그 값)
+    max_concurrency <= 0 이면 제한하지 않습니다. 워커 프로세스마다 따로 적용됩니다.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_queue: int = 64, max_wait_seconds: float = 5.0):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.in_flight = 0
+        self._waiters = deque()
+
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = {'queue_full': 0, 'wait_timeout': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _reject(self, reason: str):
+        self.rejected[reason] += 1
+        ADMISSION_REJECTED_TOTAL.inc(upstream=self.name, reason=reason)
+        return AdmissionRejected(BUSY_MESSAGE, reason, retry_after=max(1, round(self.max_wait_seconds)))
+
+    def check(self):
+        """
+        대기열이 가득 찼으면 AdmissionRejected (작업을 시작하기 전에 미리 거절할 때 사용)
+        """
+        if self.enabled and self.in_flight >= self.max_concurrency and len(self._waiters) >= self.max_queue:
+            raise self._reject('queue_full')
+
+    async def acquire(self, timeout: float = None):
+        """
+        실행 슬롯을 얻을 때까지 대기 (반드시 release 와 짝을 맞춰 호출)
+        timeout: 호출 측 남은 마감 시간 - max_wait_seconds 보다 짧으면 이 값까지만 대기
+        """
+        if not self.enabled:
+            return
+        if self.in_flight < self.max_concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            ADMISSION_WAIT_SECONDS.observe(0.0, upstream=self.name)
+            return
+        self.check()
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        wait = self.max_wait_seconds if timeout is None else min(self.max_wait_seconds, timeout)
+        start = time.perf_counter()
+        try:
+            # 슬롯은 release 에서 대기 순서대로 넘겨받음 (in_flight 유지)
+            await asyncio.wait_for(waiter, timeout=wait)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start, upstream=self.name)
+            raise self._reject('wait_timeout')
+        except asyncio.CancelledError:
+            # 슬롯을 넘겨받은 직후 취소된 경우 다음 대기자에게 넘김
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                self._discard(waiter)
+            raise
+        self.admitted += 1
+        ADMISSION_WAIT_SECONDS.observe(time.perf_counter() - start, upstream=self.name)
+
+    def release(self):
+        if not self.enabled:
+            return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _discard(self, waiter):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    @asynccontextmanager
+    async def slot(self, timeout: float = None):
+        await self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> dict:
+        return {
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'queue_depth': self.queue_depth,
+            'max_queue': self.max_queue,
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'rejected': dict(self.rejected),
+        }
+
+
+class ClientRateLimiter:
+    """
+    클라이언트(IP)별 토큰 버킷 요청 제한: 분당 rate_per_minute 개, 최대 burst 개까지 연속 허용
+    rate_per_minute <= 0 이면 제한하지 않습니다. 최근 요청한 max_clients 개 클라이언트의 버킷만 유지합니다 (LRU).
+    """
+
+    def __init__(self, rate_per_minute: float = 0, burst: int = 10, max_clients: int = 10000):
+        self.rate = rate_per_minute / 60
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()  # client → (남은 토큰, 마지막 갱신 시각)
+
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def check(self, client: str):
+        """
+        요청 하나를 허용하면 토큰을 차감하고, 초과하면 AdmissionRejected(rate_limited)
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(client, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = None
+        else:
+            retry_after = max(1, round((1 - tokens) / self.rate))
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+
+        if retry_after is not None:
+            self.rejected += 1
+            ADMISSION_REJECTED_TOTAL.inc(upstream="client", reason="rate_limited")
+            raise AdmissionRejected(RATE_LIMITED_MESSAGE, "rate_limited", retry_after=retry_after)
+
+    def stats(self) -> dict:
+        return {
+            'rate_per_minute': self.rate * 60,
+            'burst': self.burst,
+            'clients': len(self._buckets),
+            'rejected': self.rejected,
+        }
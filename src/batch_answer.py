@@ -0,0 +1,254 @@
+"""
+오프라인 대량 답변 생성 (QA 검토용)
+
+질문 목록(JSONL / CSV)을 청크 단위로 읽어
+1) 청크의 질문을 토큰 기준 배치로 한 번에 임베딩 (get_embeddings - 동시 요청, 429 재시도)
+2) 청크 전체를 한 번의 다중 질의 검색으로 FAQ 검색
+3) 서버(/chat)와 같은 규칙(관련 FAQ 없음 / 직접 응답 / LLM 생성)으로 답변을 만들고, LLM 생성은 최대 --concurrency 개 동시 실행
+4) 완료되는 순서대로 결과를 JSONL 에 한 줄씩 기록 (다음 청크의 임베딩/검색은 생성과 겹쳐서 진행)
+중단 후 같은 명령으로 다시 실행하면 출력 파일에 이미 완료(status=complete)로 기록된 질문은 건너뜁니다 (오류 건은 다시 처리).
+실행 (프로젝트 루트):
+    python -m src.batch_answer data/questions.jsonl data/answers.jsonl --concurrency 16
+"""
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from src.config import (
+    EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, EMBEDDING_MAX_BATCH_TOKENS, EMBEDDING_MAX_BATCH_SIZE,
+    EMBEDDING_MAX_CONCURRENCY, EMBEDDING_MAX_RETRIES, RETRIEVAL_BACKEND, BATCH_MAX_CONCURRENCY,
+    DIRECT_ANSWER_MAX_DISTANCE, DIRECT_ANSWER_MIN_MARGIN
+)
+from src.direct_answer import DirectAnswerPolicy
+from src.embedding_store import load_embedding_store, store_exists
+from src.generate_openai_response import generate_answer_async, NO_FAQ_MESSAGE
+from src.openai_embedding import get_embeddings, load_openai_api_key, load_async_openai_client, estimate_tokens
+from src.retrieval import create_backend, NO_FAQ_MAX_DISTANCE
+from src.search_faq import select_query_results, split_contexts, get_original_answer
+from src.vector_db import load_answer_index_from_store, load_answer_index
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def read_questions(path: str, question_field: str = "question", id_field: str = "id") -> list:
+    """
+    JSONL(한 줄에 하나의 객체) 또는 CSV(헤더 포함)에서 (id, 질문) 목록을 읽습니다.
+    id 가 없으면 행 번호(JSONL: 빈 줄을 포함한 파일의 줄 번호, CSV: 헤더를 제외한 데이터 행 번호, 1부터)를 id 로 사용하므로,
+    이어서 실행할 때는 같은 입력 파일을 사용해야 합니다. id 가 0 인 행도 그대로 0 을 id 로 사용합니다.
+    """
+    questions = []
+    with open(path, encoding='utf-8', newline='') as f:
+        if path.endswith(".csv"):
+            rows = enumerate(csv.DictReader(f), 1)
+        else:
+            rows = ((line_no, json.loads(line)) for line_no, line in enumerate(f, 1) if line.strip())
+        for line_no, row in rows:
+            question = (row.get(question_field) or row.get('query') or '').strip()
+            if question:
+                doc_id = row[id_field] if row.get(id_field) not in (None, "") else line_no
+                questions.append((str(doc_id), question))
+    return questions
+
+
+def load_completed(output_path: str) -> set:
+    """
+    출력 파일에서 완료된 질문 id 를 읽습니다. 기록 도중 중단되어 잘린 마지막 줄은 파일에서 잘라냅니다.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    valid_bytes = 0
+    with open(output_path, 'rb') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if not line.endswith(b"\n"):
+                break
+            valid_bytes += len(line)
+            if record.get('status') == 'complete':
+                completed.add(str(record['id']))
+    if valid_bytes < os.path.getsize(output_path):
+        with open(output_path, 'r+b') as f:
+            f.truncate(valid_bytes)
+    return completed
+
+
+class BatchAnswerer:
+    """
+    청크 단위 임베딩 / 검색(생산자)과 동시 실행 수가 제한된 LLM 생성(소비자)을 큐로 연결하여
+    네트워크 대기 시간 동안 다음 청크를 준비합니다.
+    """
+
+    def __init__(self, retriever, answer_index, client, async_client, output, concurrency: int = 8,
+                 chunk_size: int = 500, model: str = "gpt-4o-mini"):
+        self.retriever = retriever
+        self.answer_index = answer_index
+        self.client = client
+        self.async_client = async_client
+        self.output = output
+        self.concurrency = concurrency
+        self.chunk_size = chunk_size
+        self.model = model
+        self.direct_answer = DirectAnswerPolicy(max_distance=DIRECT_ANSWER_MAX_DISTANCE,
+                                                min_margin=DIRECT_ANSWER_MIN_MARGIN)
+
+        self.routes = {'llm': 0, 'direct_answer': 0, 'no_faq': 0}
+        self.errors = 0
+        self.tokens = {'embedding': 0, 'prompt': 0, 'cached_prompt': 0, 'completion': 0}
+        self.done = 0
+        self.total = 0
+        self.started = None
+
+    def prepare(self, chunk: list) -> list:
+        """
+        청크 하나를 임베딩하고 한 번의 다중 질의 검색으로 FAQ 를 찾습니다 (블로킹, 스레드에서 실행).
+        """
+        texts = list(dict.fromkeys(question for _, question in chunk))  # 같은 질문은 한 번만 임베딩
+        self.tokens['embedding'] += sum(estimate_tokens(text) for text in texts)
+        embeddings = get_embeddings(
+            self.client, texts, model=EMBEDDING_MODEL,
+            max_batch_tokens=EMBEDDING_MAX_BATCH_TOKENS,
+            max_batch_size=EMBEDDING_MAX_BATCH_SIZE,
+            max_concurrency=EMBEDDING_MAX_CONCURRENCY,
+            max_retries=EMBEDDING_MAX_RETRIES,
+            dimensions=EMBEDDING_DIMENSIONS or None
+        )
+        by_text = dict(zip(texts, embeddings))
+        matrix = np.asarray([by_text[question] for _, question in chunk], dtype=np.float32)
+        results = self.retriever.query(query_embeddings=matrix, n_results=5)
+        return [(doc_id, question, select_query_results(results, row))
+                for row, (doc_id, question) in enumerate(chunk)]
+
+    async def answer(self, doc_id: str, question: str, results: dict) -> dict:
+        record = {'id': doc_id, 'question': question, 'faq_ids': results['ids'][0],
+                  'distances': [round(float(d), 4) for d in results['distances'][0]]}
+        start = time.perf_counter()
+        try:
+            if min(results['distances'][0]) > NO_FAQ_MAX_DISTANCE:
+                record.update(route='no_faq', answer=NO_FAQ_MESSAGE)
+            elif self.direct_answer.matches(results):
+                answer = self.direct_answer.format(get_original_answer(results, self.answer_index), results)
+                record.update(route='direct_answer', answer=answer)
+            else:
+                faq_answers, related_questions = split_contexts(results, self.answer_index)
+                answer, usage = await generate_answer_async(self.async_client, question, faq_answers,
+                                                            related_questions, model=self.model, with_usage=True)
+                record.update(route='llm', answer=answer, usage=self._add_usage(usage))
+            record['status'] = 'complete'
+            self.routes[record['route']] += 1
+        except Exception as e:
+            logging.error(f"답변 생성 실패 (id={doc_id}): {e}")
+            record.update(status='error', error=str(e))
+            self.errors += 1
+        record['seconds'] = round(time.perf_counter() - start, 3)
+        return record
+
+    def _add_usage(self, usage) -> dict:
+        if usage is None:
+            return {}
+        details = getattr(usage, 'prompt_tokens_details', None)
+        counts = {
+            'prompt': usage.prompt_tokens or 0,
+            'cached_prompt': (getattr(details, 'cached_tokens', None) if details is not None else None) or 0,
+            'completion': usage.completion_tokens or 0,
+        }
+        for kind, count in counts.items():
+            self.tokens[kind] += count
+        return counts
+
+    def write(self, record: dict):
+        # 한 줄씩 기록하고 바로 flush → 중단되어도 완료된 결과는 남음
+        self.output.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.output.flush()
+        self.done += 1
+        if self.done % 100 == 0 and self.done < self.total:
+            self.report()
+
+    def report(self):
+        elapsed = time.perf_counter() - self.started
+        print(f"{self.done}/{self.total} 완료 ({self.done / elapsed * 60 if elapsed > 0 else 0:.1f} questions/min, "
+              f"경로={self.routes}, 오류={self.errors}, 토큰={self.tokens})")
+
+    async def run(self, questions: list):
+        self.total = len(questions)
+        self.started = time.perf_counter()
+        # 생성 대기열 크기를 제한하여 임베딩/검색이 생성보다 너무 앞서 나가지 않게 함
+        queue = asyncio.Queue(maxsize=max(self.chunk_size, self.concurrency) * 2)
+
+        async def produce():
+            for start in range(0, len(questions), self.chunk_size):
+                prepared = await asyncio.to_thread(self.prepare, questions[start:start + self.chunk_size])
+                for item in prepared:
+                    await queue.put(item)
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def consume():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                self.write(await self.answer(*item))
+
+        tasks = [asyncio.create_task(produce())] + [asyncio.create_task(consume()) for _ in range(self.concurrency)]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def main(args):
+    questions = read_questions(args.input, args.question_field, args.id_field)
+    completed = load_completed(args.output)
+    pending = [(doc_id, question) for doc_id, question in questions if doc_id not in completed]
+    print(f"질문 {len(questions)}개 중 완료 {len(questions) - len(pending)}개, 남은 질문 {len(pending)}개")
+    if not pending:
+        return
+
+    store = load_embedding_store(args.store_dir) if store_exists(args.store_dir) else None
+    if store is not None and EMBEDDING_DIMENSIONS and store.dim != EMBEDDING_DIMENSIONS:
+        raise ValueError(f"임베딩 저장소 차원({store.dim})과 EMBEDDING_DIMENSIONS({EMBEDDING_DIMENSIONS})가 다릅니다.")
+    retriever = create_backend(args.backend, db_path=args.db_path, store_dir=args.store_dir, store=store)
+    answer_index = load_answer_index_from_store(store) if store is not None \
+        else load_answer_index("data/embeddings_openai.csv")
+
+    async_client = load_async_openai_client().with_options(max_retries=args.max_retries)
+    with open(args.output, 'a', encoding='utf-8') as output:
+        answerer = BatchAnswerer(retriever, answer_index, load_openai_api_key(), async_client, output,
+                                 concurrency=args.concurrency, chunk_size=args.chunk_size, model=args.model)
+        try:
+            await answerer.run(pending)
+        finally:
+            await async_client.close()
+            if answerer.done:
+                answerer.report()
+    print(f"결과 저장: {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="offline batch answering (JSONL / CSV → JSONL, resumable)")
+    parser.add_argument("input", help="질문 파일 (.jsonl 또는 .csv)")
+    parser.add_argument("output", help="결과 JSONL (이미 있으면 완료된 질문을 건너뛰고 이어서 기록)")
+    parser.add_argument("--question-field", default="question")
+    parser.add_argument("--id-field", default="id")
+    parser.add_argument("--concurrency", type=int, default=BATCH_MAX_CONCURRENCY, help="동시에 실행할 LLM 생성 수")
+    parser.add_argument("--chunk-size", type=int, default=500, help="한 번에 임베딩/검색할 질문 수")
+    parser.add_argument("--max-retries", type=int, default=EMBEDDING_MAX_RETRIES, help="LLM 요청 재시도 횟수")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--backend", default=RETRIEVAL_BACKEND)
+    parser.add_argument("--store-dir", default="data/embedding_store")
+    parser.add_argument("--db-path", default="data/chroma_db")
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args))
+    except KeyboardInterrupt:
+        print(f"중단됨 - 완료된 결과는 {args.output} 에 기록되어 있으며, 같은 명령으로 다시 실행하면 이어서 처리합니다.")
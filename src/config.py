@@ -0,0 +1,97 @@
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# FAQ 검색 백엔드: chroma (PersistentClient + HNSW) | numpy (임베딩 저장소 기반 정확 검색)
+#                 | int8 / pq (양자화 색인 근사 검색 후 후보를 float32 원본으로 재계산)
+#                 | matryoshka (앞쪽 MATRYOSHKA_DIMENSIONS 차원만 잘라 다시 정규화한 색인으로 후보 선택 후 전체 차원으로 재계산)
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "chroma")
+
+# 2단계 검색(int8 / pq / matryoshka) - 원본 벡터로 다시 계산할 후보 수, PQ 서브벡터 수(임베딩 차원의 약수, 벡터당 바이트 수),
+# matryoshka 1단계 색인 차원
+QUANTIZED_RESCORE_CANDIDATES = int(os.getenv("QUANTIZED_RESCORE_CANDIDATES", "50"))
+PQ_SUBVECTORS = int(os.getenv("PQ_SUBVECTORS", "96"))
+MATRYOSHKA_DIMENSIONS = int(os.getenv("MATRYOSHKA_DIMENSIONS", "256"))
+
+# Chroma(HNSW) 색인 - 거리 공간(l2 | cosine | ip), 노드당 이웃 수(M), 생성/검색 시 후보 목록 크기(ef)
+# 공간/M/construction_ef 는 collection 을 새로 만들 때만 적용 (바꾸려면 data/chroma_db 삭제 후 재색인), search_ef 는 기존 collection 에도 적용
+CHROMA_SPACE = os.getenv("CHROMA_SPACE", "l2")
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_CONSTRUCTION_EF = int(os.getenv("HNSW_CONSTRUCTION_EF", "100"))
+HNSW_SEARCH_EF = int(os.getenv("HNSW_SEARCH_EF", "100"))
+
+# FAQ 검색(Chroma query)을 실행하는 스레드 풀 크기
+RETRIEVAL_MAX_WORKERS = int(os.getenv("RETRIEVAL_MAX_WORKERS", "8"))
+
+# 질의/FAQ 임베딩 모델, 출력 차원 (text-embedding-3 계열의 dimensions 파라미터 - 0 이면 모델 기본 차원)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0"))
+
+# 대량 임베딩 생성 (배치당 최대 토큰 수/항목 수, 동시 요청 수, 재시도 횟수)
+EMBEDDING_MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "8000"))
+EMBEDDING_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", "256"))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+EMBEDDING_MAX_RETRIES = int(os.getenv("EMBEDDING_MAX_RETRIES", "6"))
+
+# 질의 임베딩 캐시 (메모리 LRU 크기, TTL(초), 디스크 캐시 경로 - 비어 있으면 디스크 캐시 미사용)
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "1024"))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+
+# 질의 임베딩 마이크로 배칭 (요청을 모으는 시간(ms) - 0 이면 미사용, 배치당 최대 질의 수)
+EMBEDDING_BATCH_WINDOW_MS = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "0"))
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+
+# 의미 기반 응답 캐시 (최대 항목 수 - 0 이면 미사용, 재사용을 허용할 최대 코사인 거리)
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_MAX_DISTANCE = float(os.getenv("RESPONSE_CACHE_MAX_DISTANCE", "0.05"))
+
+# POST /chat/batch (요청당 최대 질문 수, 동시에 실행할 LLM 생성 수)
+BATCH_MAX_QUERIES = int(os.getenv("BATCH_MAX_QUERIES", "100"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+# 어휘(BM25, 문자 2-gram) 검색 - 빠른 경로 기준(질문 자카드 유사도, 1·2위 점수 배수), RRF 결합 상수
+LEXICAL_ENABLED = os.getenv("LEXICAL_ENABLED", "false").lower() in ("1", "true", "yes")
+LEXICAL_FAST_PATH_MIN_SIMILARITY = float(os.getenv("LEXICAL_FAST_PATH_MIN_SIMILARITY", "0.85"))
+LEXICAL_FAST_PATH_MIN_MARGIN = float(os.getenv("LEXICAL_FAST_PATH_MIN_MARGIN", "1.1"))
+LEXICAL_FUSION_K = int(os.getenv("LEXICAL_FUSION_K", "60"))
+
+# 직접 응답 - 1위 FAQ 거리가 이 값 미만(0 이면 미사용)이고 2위와의 거리 차가 최소 차 이상이면 LLM 없이 저장된 답변을 바로 전송
+DIRECT_ANSWER_MAX_DISTANCE = float(os.getenv("DIRECT_ANSWER_MAX_DISTANCE", "0"))
+DIRECT_ANSWER_MIN_MARGIN = float(os.getenv("DIRECT_ANSWER_MIN_MARGIN", "0.1"))
+
+# 느린 요청 로그 - /chat 전체 소요 시간이 이 값(ms) 이상이면 단계별 소요 시간을 로그로 남김 (0 이면 미사용)
+SLOW_REQUEST_LOG_MS = float(os.getenv("SLOW_REQUEST_LOG_MS", "0"))
+
+# LLM 프롬프트 - FAQ 답변 컨텍스트 최대 토큰 수, 중복으로 보고 제외할 답변 간 문자 2-gram 자카드 유사도
+PROMPT_MAX_CONTEXT_TOKENS = int(os.getenv("PROMPT_MAX_CONTEXT_TOKENS", "1500"))
+PROMPT_DEDUP_SIMILARITY = float(os.getenv("PROMPT_DEDUP_SIMILARITY", "0.8"))
+
+# FAQ 전처리 (data_loader) - 프로세스 수(1 이면 단일 프로세스), 프로세스별 청크 행 수
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", "1"))
+PREPROCESS_CHUNK_SIZE = int(os.getenv("PREPROCESS_CHUNK_SIZE", "50000"))
+
+# SSE 프레임 병합 - LLM delta 를 모으는 시간 창(ms, 0 이면 delta 마다 프레임 전송), 즉시 전송할 버퍼 크기(UTF-8 바이트)
+SSE_COALESCE_WINDOW_MS = float(os.getenv("SSE_COALESCE_WINDOW_MS", "30"))
+SSE_COALESCE_MAX_BYTES = int(os.getenv("SSE_COALESCE_MAX_BYTES", "512"))
+
+# 요청 제한 시간(초) - /chat 전체 마감, 질의 임베딩, FAQ 검색, LLM 첫 토큰까지 (0 이면 제한 없음)
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "60"))
+EMBEDDING_TIMEOUT_SECONDS = float(os.getenv("EMBEDDING_TIMEOUT_SECONDS", "10"))
+RETRIEVAL_TIMEOUT_SECONDS = float(os.getenv("RETRIEVAL_TIMEOUT_SECONDS", "5"))
+LLM_FIRST_TOKEN_TIMEOUT_SECONDS = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT_SECONDS", "20"))
+
+# 진입 제어 (워커 프로세스별) - 동시에 실행할 질의 임베딩 호출 / LLM 스트림 수(0 이면 제한 없음),
+# 업스트림별 최대 대기 요청 수(초과 시 429), 최대 대기 시간(초), 클라이언트(IP)별 분당 요청 수(0 이면 미사용)와 연속 허용 수
+EMBEDDING_MAX_IN_FLIGHT = int(os.getenv("EMBEDDING_MAX_IN_FLIGHT", "16"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "32"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "5"))
+CLIENT_RATE_LIMIT_PER_MINUTE = float(os.getenv("CLIENT_RATE_LIMIT_PER_MINUTE", "0"))
+CLIENT_RATE_LIMIT_BURST = int(os.getenv("CLIENT_RATE_LIMIT_BURST", "10"))
+
+# 서버 워커 프로세스 수 (python main.py 실행 시, 1 이면 단일 프로세스 + reload), 서빙 스냅샷(CURRENT) 변경 확인 주기(초, 0 이면 미사용)
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+INDEX_RELOAD_INTERVAL_SECONDS = float(os.getenv("INDEX_RELOAD_INTERVAL_SECONDS", "5"))
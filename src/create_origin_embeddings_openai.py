@@ -1,7 +1,15 @@
+import os
+
 import pandas as pd
 from openai import OpenAI
 
-from openai_embedding import get_embeddings, load_openai_api_key
+from src.config import (
+    EMBEDDING_MODEL, EMBEDDING_MAX_BATCH_TOKENS, EMBEDDING_MAX_BATCH_SIZE, EMBEDDING_MAX_CONCURRENCY, EMBEDDING_MAX_RETRIES,
+    EMBEDDING_DIMENSIONS
+)
+from src.embedding_store import publish_store, load_embedding_store, export_store_to_csv
+from src.openai_embedding import get_embeddings, load_openai_api_key
+from src.quantization import quantized_index_builder
 
 def load_preprocessed_data(file_path: str) -> pd.DataFrame:
     try:
@@ -12,14 +20,31 @@ def load_preprocessed_data(file_path: str) -> pd.DataFrame:
         print(f"데이터 로드 실패: {e}")
         raise
 
-def create_embeddings(client: OpenAI, df: pd.DataFrame, output_path: str):
+def create_embeddings(client: OpenAI, df: pd.DataFrame, store_dir: str, csv_output_path: str = None,
+                      model: str = EMBEDDING_MODEL, checkpoint_path: str = None):
+    """
+    질문 임베딩을 생성하여 바이너리 임베딩 저장소(store_dir)에 기록합니다.
+    csv_output_path 를 지정하면 기존 CSV 형식으로도 내보냅니다.
+    checkpoint_path 를 지정하면 완료된 배치를 기록하여 중단 후 재실행 시 이어서 처리하고, 저장이 끝나면 삭제합니다.
+    """
     try:
         print("Embedding 생성 시작...")
-        embeddings = get_embeddings(client, df['question_clean'].to_list())
-
-        df['embedding'] = embeddings
-        df.to_csv(output_path, index=False, encoding='utf-8-sig')
-        print(f"Embedding 생성 및 저장 완료: {output_path}")
+        embeddings = get_embeddings(
+            client, df['question_clean'].to_list(), model=model,
+            max_batch_tokens=EMBEDDING_MAX_BATCH_TOKENS,
+            max_batch_size=EMBEDDING_MAX_BATCH_SIZE,
+            max_concurrency=EMBEDDING_MAX_CONCURRENCY,
+            max_retries=EMBEDDING_MAX_RETRIES,
+            checkpoint_path=checkpoint_path,
+            dimensions=EMBEDDING_DIMENSIONS or None
+        )
+
+        publish_store(store_dir, df, embeddings, model, prepare=quantized_index_builder())
+        if csv_output_path:
+            export_store_to_csv(load_embedding_store(store_dir), csv_output_path)
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
+        print(f"Embedding 생성 및 저장 완료: {store_dir}")
     except Exception as e:
         print(f"Embedding 생성 실패: {e}")
         raise
@@ -27,9 +52,12 @@ def create_embeddings(client: OpenAI, df: pd.DataFrame, output_path: str):
 if __name__ == "__main__":
     client = load_openai_api_key()
 
-    preprocessed_data_path = "../data/preprocessed_data.pkl"
-    embedding_output_path = "../data/embeddings_openai.csv"
+    preprocessed_data_path = "data/preprocessed_data.pkl"
+    embedding_store_dir = "data/embedding_store"
+    checkpoint_path = "data/embedding_checkpoint.jsonl"
+    # CSV 내보내기가 필요하면 경로 지정 (예: "data/embeddings_openai.csv")
+    embedding_csv_path = os.getenv("EMBEDDING_CSV_EXPORT_PATH")
 
     df = load_preprocessed_data(preprocessed_data_path)
 
-    create_embeddings(client, df, embedding_output_path)
\ No newline at end of file
+    create_embeddings(client, df, embedding_store_dir, embedding_csv_path, checkpoint_path=checkpoint_path)
\ No newline at end of file
@@ -1,14 +1,50 @@
 import logging
+import time
 
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
 
-from src.openai_embedding import load_openai_api_key, get_embeddings
+from src.config import EMBEDDING_MODEL, EMBEDDING_DIMENSIONS
+from src.embedding_batcher import EmbeddingMicroBatcher
+from src.embedding_cache import QueryEmbeddingCache
+from src.openai_embedding import load_openai_api_key, get_embeddings, get_embeddings_async
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
-def create_query_embedding(client: OpenAI, query: str) -> list:
-    return get_embeddings(client, [query])[0]
+def create_query_embedding(client: OpenAI, query: str, model: str = EMBEDDING_MODEL,
+                           dimensions: int = EMBEDDING_DIMENSIONS) -> list:
+    """
+    FAQ 임베딩 저장소와 같은 모델/차원으로 질의를 임베딩 (오프라인 스크립트용)
+    """
+    return get_embeddings(client, [query], model=model, dimensions=dimensions or None)[0]
+
+
+async def create_query_embedding_async(client: AsyncOpenAI, query: str, cache: QueryEmbeddingCache = None,
+                                       model: str = "text-embedding-3-small",
+                                       batcher: EmbeddingMicroBatcher = None, dimensions: int = None,
+                                       limiter=None) -> list:
+    """
+    cache: 캐시에 있으면 API 호출 생략
+    batcher: 지정하면 동시에 들어온 다른 질의와 묶어서 한 번의 API 호출로 임베딩 (batcher 의 dimensions 사용)
+    dimensions: 축소된 임베딩 차원 (FAQ 임베딩 저장소와 같은 차원이어야 함)
+    limiter: 캐시에 없을 때 API 호출 전에 실행 슬롯을 얻음 (src.admission.AdmissionLimiter, batcher 사용 시에는 batcher 의 limiter)
+    """
+    if cache is not None:
+        embedding = await cache.get_async(query)
+        if embedding is not None:
+            return embedding
+
+    start = time.perf_counter()
+    if batcher is not None:
+        embedding = await batcher.embed(query)
+    elif limiter is not None:
+        async with limiter.slot():
+            embedding = (await get_embeddings_async(client, [query], model=model, dimensions=dimensions))[0]
+    else:
+        embedding = (await get_embeddings_async(client, [query], model=model, dimensions=dimensions))[0]
+    if cache is not None:
+        cache.set(query, embedding, elapsed_seconds=time.perf_counter() - start)
+    return embedding
 
 
 if __name__ == '__main__':
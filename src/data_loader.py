@@ -1,7 +1,13 @@
 # src/data_loader.py
 
+import hashlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import pandas as pd
-import re
+
+from src.config import PREPROCESS_WORKERS, PREPROCESS_CHUNK_SIZE
+from src.text_cleaning import CATEGORY_PATTERN, SUBCATEGORY_PATTERN, QUESTION_AFFIX_PATTERN, NON_WORD_PATTERN
 
 def load_data(file_path: str) -> pd.DataFrame:
     """
@@ -22,66 +28,43 @@ def load_data(file_path: str) -> pd.DataFrame:
         return pd.DataFrame()
 
 def extract_categories(df: pd.DataFrame) -> pd.DataFrame:
-    categories = []
-    subcategories = []
-
-    # 정규표현식 컴파일
-    # 카테고리: 문장 시작의 모든 대괄호 [] 안 내용
-    category_pattern = re.compile(r'^\[([^\]]+)\]')
-    # 서브카테고리: 문장 끝의 소괄호 () 안 내용
-    subcategory_pattern = re.compile(r'\(([^)]+)\)$')
-
-    for q in df['question']:
-        # 카테고리 추출: 문장 시작의 모든 대괄호 안 내용
-        category_matches = category_pattern.findall(q)
-        # findall로 첫 번째 대괄호만 추출하므로 반복문을 사용하여 모든 대괄호 추출
-        category_matches = re.findall(r'\[([^\]]+)\]', q)
-        if category_matches:
-            categories.append(category_matches)
-        else:
-            categories.append(['Uncategorized'])
-
-        # 서브카테고리 추출: 문장 끝의 소괄호 안 내용
-        subcategory_match = subcategory_pattern.search(q)
-        if subcategory_match:
-            subcategories.append(subcategory_match.group(1))
-        else:
-            subcategories.append('')
-
-    df['category'] = categories
-    df['subcategory'] = subcategories
+    # 카테고리 추출: 질문 안의 모든 대괄호 안 내용 (없으면 Uncategorized)
+    categories = df['question'].str.findall(CATEGORY_PATTERN)
+    df['category'] = [matches if matches else ['Uncategorized'] for matches in categories]
+    # 서브카테고리 추출: 문장 끝의 소괄호 안 내용
+    df['subcategory'] = df['question'].str.extract(SUBCATEGORY_PATTERN, expand=False).fillna('')
 
     return df
 
-def clean_question(text: str) -> str:
-    """
-    질문 텍스트 정제 함수:
-    - 문장 시작의 대괄호 [] 안의 내용 제거
-    - 문장 끝의 소괄호 () 안의 내용 제거
-    - 중간에 있는 괄호들은 그대로 유지
-    - 특수 문자 제거 (필요에 따라 조정)
-    - 불필요한 공백 제거
-    """
-    # 문장 시작의 대괄호 [] 안 내용 제거
-    text = re.sub(r'^\[([^\]]+)\]', '', text)
-    # 문장 끝의 소괄호 () 안 내용 제거
-    text = re.sub(r'\(([^)]+)\)$', '', text)
-    # 특수 문자 제거
-    text = re.sub(r'[^\w\s]', ' ', text)
-    # 불필요한 공백 제거 (연속된 공백을 단일 공백으로 변경)
-    text = re.sub(r'\s+', ' ', text)
-    # 양쪽 끝의 공백 제거
-    text = text.strip()
-    return text
-
-def clean_answer(text: str) -> str:
-    # 특수 문자 제거
-    text = re.sub(r'[^\w\s]', ' ', text)
-    # 불필요한 공백 제거 (연속된 공백을 단일 공백으로 변경)
-    text = re.sub(r'\s+', ' ', text)
-    # 양쪽 끝의 공백 제거
-    text = text.strip()
-    return text
+def clean_questions(questions: pd.Series) -> pd.Series:
+    """
+    clean_question 의 Series 버전 (pandas 문자열 연산)
+    """
+    return questions.str.replace(QUESTION_AFFIX_PATTERN, '', regex=True) \
+        .str.replace(NON_WORD_PATTERN, ' ', regex=True).str.strip()
+
+def clean_answers(answers: pd.Series) -> pd.Series:
+    """
+    clean_answer 의 Series 버전 (pandas 문자열 연산)
+    """
+    return answers.str.replace(NON_WORD_PATTERN, ' ', regex=True).str.strip()
+
+def faq_id(question: str) -> str:
+    """
+    원문 질문으로 만든 안정적인 FAQ id (행 순서/삭제와 무관)
+    """
+    return hashlib.sha1(question.encode('utf-8')).hexdigest()[:16]
+
+def content_hash(question: str, answer: str) -> str:
+    """
+    질문/답변 내용 해시. 같은 id 의 FAQ 가 수정되었는지 판단하는 데 사용합니다.
+    """
+    return hashlib.sha1(f"{question}\x1f{answer}".encode('utf-8')).hexdigest()
+
+def assign_faq_ids(df: pd.DataFrame) -> pd.DataFrame:
+    df['id'] = df['question'].map(faq_id)
+    df['content_hash'] = [content_hash(q, a) for q, a in zip(df['question'], df['answer'])]
+    return df
 
 def basic_preprocessing(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -101,15 +84,33 @@ def basic_preprocessing(df: pd.DataFrame) -> pd.DataFrame:
 
     return df
 
-def additional_preprocessing(df: pd.DataFrame) -> pd.DataFrame:
-    print("카테고리 및 서브카테고리 추출 시작")
+def preprocess_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    카테고리 추출 + 텍스트 정제 + FAQ id 생성 (행 단위로 독립적이므로 청크별로 나누어 실행 가능)
+    """
     df = extract_categories(df)
-    print("카테고리 및 서브카테고리 추출 완료")
+    df['question_clean'] = clean_questions(df['question'])
+    df['answer_clean'] = clean_answers(df['answer'])
+    return assign_faq_ids(df)
+
+def additional_preprocessing(df: pd.DataFrame, workers: int = PREPROCESS_WORKERS,
+                             chunk_size: int = PREPROCESS_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    workers > 1 이고 행 수가 chunk_size 보다 많으면 chunk_size 행 단위로 나누어 여러 프로세스에서 처리합니다.
+    """
+    start = time.perf_counter()
+    df = df.copy()
+    if workers > 1 and len(df) > chunk_size:
+        print(f"카테고리 추출 / 텍스트 정제 / FAQ id 생성 시작 ({workers} processes, chunk={chunk_size} rows)")
+        chunks = [df.iloc[i:i + chunk_size].copy() for i in range(0, len(df), chunk_size)]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            df = pd.concat(list(executor.map(preprocess_chunk, chunks)))
+    else:
+        print("카테고리 추출 / 텍스트 정제 / FAQ id 생성 시작")
+        df = preprocess_chunk(df)
 
-    print("텍스트 정제 시작")
-    df['question_clean'] = df['question'].apply(clean_question)
-    df['answer_clean'] = df['answer'].apply(clean_answer)
-    print("텍스트 정제 완료")
+    elapsed = time.perf_counter() - start
+    print(f"전처리 완료: {len(df)} rows, {elapsed:.2f}s ({len(df) / elapsed if elapsed > 0 else 0:.0f} rows/s)")
 
     return df
 
@@ -117,21 +118,23 @@ def validate_dataframe(df: pd.DataFrame):
     """
     DataFrame의 유효성을 검사합니다.
     """
-    required_columns = ['question', 'answer', 'category', 'subcategory', 'question_clean', 'answer_clean']
+    required_columns = ['id', 'content_hash', 'question', 'answer', 'category', 'subcategory', 'question_clean', 'answer_clean']
     for col in required_columns:
         if col not in df.columns:
             raise ValueError(f"DataFrame에 '{col}' 열이 없습니다.")
+    if df['id'].duplicated().any():
+        raise ValueError("중복된 FAQ id 가 있습니다.")
     print("DataFrame 유효성 검사 통과")
 
 if __name__ == "__main__":
-    data_path = "../data/final_result.pkl"
+    data_path = "data/final_result.pkl"
     df = load_data(data_path)
     if not df.empty:
         df = basic_preprocessing(df)
         df = additional_preprocessing(df)
         validate_dataframe(df)  # 유효성 검사 추가
         # 전처리된 데이터를 저장
-        df.to_pickle("../data/preprocessed_data.pkl")
+        df.to_pickle("data/preprocessed_data.pkl")
         print("전처리 완료 및 저장")
     else:
         print("DataFrame이 비어 있어 전처리를 수행하지 않습니다.")
\ No newline at end of file
@@ -0,0 +1,63 @@
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class DirectAnswerPolicy:
+    """
+    고신뢰 구간 직접 응답 (LLM 생략)
+    - 1위 FAQ 거리가 max_distance 미만이고 2위와의 거리 차가 min_margin 이상이면
+      LLM 으로 답변을 다시 쓰지 않고 저장된 FAQ 답변 + 추천 질문을 그대로 응답합니다.
+    - max_distance <= 0 이면 사용하지 않습니다.
+    """
+
+    def __init__(self, max_distance: float = 0.0, min_margin: float = 0.1, max_related: int = 3):
+        self.max_distance = max_distance
+        self.min_margin = min_margin
+        self.max_related = max_related
+
+        self.requests = 0
+        self.hits = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_distance > 0
+
+    def matches(self, results: dict) -> bool:
+        """
+        검색 결과(단일 질의, 거리 오름차순)의 1위 FAQ 로 바로 응답할 수 있는지 판단하고 직접 응답 비율을 기록합니다.
+        """
+        if not self.enabled:
+            return False
+        self.requests += 1
+        distances = results['distances'][0]
+        if not distances or distances[0] >= self.max_distance:
+            return False
+        margin = distances[1] - distances[0] if len(distances) > 1 else float('inf')
+        if margin < self.min_margin:
+            return False
+
+        self.hits += 1
+        logging.info(f"FAQ 직접 응답 (distance={distances[0]:.4f}, margin={margin:.4f}), LLM 호출 생략 "
+                     f"- 직접 응답 비율 {self.hits}/{self.requests} ({self.hits / self.requests:.1%})")
+        return True
+
+    def format(self, answer: str, results: dict) -> str:
+        """
+        저장된 답변 뒤에 LLM 응답과 같은 형식으로 나머지 검색 결과의 질문을 추천 질문으로 붙입니다.
+        """
+        top_question = results['documents'][0][0]
+        related = [q for q in dict.fromkeys(results['documents'][0][1:]) if q and q != top_question]
+        related = related[:self.max_related]
+        if not related:
+            return answer
+        return answer + "\n\n추천 질문:\n" + "\n".join(f"- {q}" for q in related)
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'hits': self.hits,
+            'rate': self.hits / self.requests if self.requests else 0.0,
+            'max_distance': self.max_distance,
+            'min_margin': self.min_margin,
+        }
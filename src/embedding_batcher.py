@@ -0,0 +1,88 @@
+import asyncio
+import logging
+
+from openai import AsyncOpenAI
+
+from src.openai_embedding import get_embeddings_async
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class EmbeddingMicroBatcher:
+    """
+    동시에 들어오는 질의 임베딩 요청을 모아 한 번의 embeddings API 호출로 처리합니다 (request coalescing).
+    - 첫 요청이 도착한 뒤 window_ms 동안 모인 요청을 한 배치로 전송
+    - 배치가 max_batch_size 에 도달하면 즉시 전송
+    추가 지연은 최대 window_ms 로 제한됩니다.
+    limiter: 지정하면 배치 API 호출마다 실행 슬롯을 얻은 뒤 호출 (진입 제어)
+    """
+
+    def __init__(self, client: AsyncOpenAI, model: str = "text-embedding-3-small", window_ms: float = 5,
+                 max_batch_size: int = 64, dimensions: int = None, limiter=None):
+        self.client = client
+        self.model = model
+        self.dimensions = dimensions
+        self.limiter = limiter
+        self.window_seconds = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._pending = []  # (text, future)
+        self._flush_handle = None
+        self._tasks = set()
+
+        self.requests = 0
+        self.batches = 0
+
+    async def embed(self, text: str) -> list:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.requests += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window_seconds, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list):
+        # 같은 배치 안의 동일한 질의는 한 번만 임베딩
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        self.batches += 1
+        try:
+            if self.limiter is not None:
+                async with self.limiter.slot():
+                    embeddings = await get_embeddings_async(self.client, texts, model=self.model,
+                                                            dimensions=self.dimensions)
+            else:
+                embeddings = await get_embeddings_async(self.client, texts, model=self.model, dimensions=self.dimensions)
+        except Exception as e:
+            logging.error(f"질의 임베딩 배치 요청 실패 ({len(batch)}건): {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        by_text = dict(zip(texts, embeddings))
+        for text, future in batch:
+            if not future.done():  # 호출 측에서 취소한 요청은 건너뜀
+                future.set_result(by_text[text])
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'upstream_calls': self.batches,
+            'avg_batch_size': self.requests / self.batches if self.batches else 0.0,
+            'window_ms': self.window_seconds * 1000,
+            'max_batch_size': self.max_batch_size,
+        }
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+from src.text_cleaning import clean_question
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def normalize_query(query: str) -> str:
+    """
+    캐시 키로 사용할 질의 정규화.
+    FAQ 질문 정제(clean_question)와 동일한 규칙을 적용하므로 특수문자/공백만 다른 질의는 같은 키가 됩니다.
+    """
+    normalized = clean_question(query)
+    return normalized if normalized else query.strip()
+
+
+class QueryEmbeddingCache:
+    """
+    질의 임베딩 2단계 캐시
+    - 1단계: 프로세스 내 LRU (크기 + TTL 기반 제거)
+    - 2단계: (선택) SQLite 디스크 캐시, 임베딩 모델(+ 축소 차원)별로 키를 분리하여 재시작 후에도 유지
+    디스크 조회는 get_async 에서 스레드로 실행하고, 디스크 기록은 백그라운드 스레드가 모아서 한 번에 commit 하므로
+    이벤트 루프에서 SQLite 호출(commit 의 fsync 포함)을 기다리지 않습니다.
+    """
+
+    def __init__(self, model: str, max_size: int = 1024, ttl_seconds: float = 3600, disk_path: str = None,
+                 dimensions: int = None, flush_max_rows: int = 256):
+        self.model = f"{model}:{dimensions}" if dimensions else model
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()  # key -> (저장 시각, embedding)
+        self._lock = threading.Lock()
+
+        self._disk = None
+        self._disk_lock = threading.Lock()  # 조회 스레드와 기록 스레드가 같은 연결을 번갈아 사용
+        self._writes = queue.Queue()
+        self._writer = None
+        self.flush_max_rows = flush_max_rows
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                "model TEXT NOT NULL, query TEXT NOT NULL, embedding BLOB NOT NULL, created_at REAL NOT NULL, "
+                "PRIMARY KEY (model, query))"
+            )
+            self._disk.commit()
+            self._writer = threading.Thread(target=self._write_loop, name="embedding-cache-writer", daemon=True)
+            self._writer.start()
+            logging.info(f"임베딩 디스크 캐시 사용: {disk_path}")
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._miss_seconds = 0.0
+
+    def get(self, query: str):
+        """
+        메모리 → 디스크 순서로 조회 (디스크 조회가 블로킹이므로 이벤트 루프에서는 get_async 사용)
+        """
+        key = normalize_query(query)
+        embedding = self._get_memory(key)
+        if embedding is None and self._disk is not None:
+            embedding = self._get_disk(key)
+        if embedding is None:
+            self._count_miss()
+        return embedding
+
+    async def get_async(self, query: str):
+        """
+        메모리에 없을 때만 디스크 조회를 스레드에서 실행합니다.
+        """
+        key = normalize_query(query)
+        embedding = self._get_memory(key)
+        if embedding is None and self._disk is not None:
+            embedding = await asyncio.to_thread(self._get_disk, key)
+        if embedding is None:
+            self._count_miss()
+        return embedding
+
+    def _get_memory(self, key: str):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            stored_at, embedding = entry
+            if now - stored_at <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return embedding
+            del self._memory[key]
+            return None
+
+    def _get_disk(self, key: str):
+        with self._disk_lock:
+            if self._disk is None:
+                return None
+            row = self._disk.execute(
+                "SELECT embedding FROM query_embeddings WHERE model = ? AND query = ?",
+                (self.model, key)
+            ).fetchone()
+        if row is None:
+            return None
+        embedding = array('d', row[0]).tolist()
+        with self._lock:
+            self._put_memory(key, embedding, time.monotonic())
+            self.disk_hits += 1
+        return embedding
+
+    def _count_miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def set(self, query: str, embedding: list, elapsed_seconds: float = 0.0):
+        """
+        elapsed_seconds: 캐시 미스로 실제 임베딩 API 호출에 걸린 시간 (절감 효과 추정용)
+        디스크 기록은 기록 스레드의 대기열에 넣기만 합니다 (블로킹 없음).
+        """
+        key = normalize_query(query)
+        with self._lock:
+            self._miss_seconds += elapsed_seconds
+            self._put_memory(key, embedding, time.monotonic())
+        if self._writer is not None:
+            self._writes.put((self.model, key, array('d', embedding).tobytes(), time.time()))
+
+    def _write_loop(self):
+        """
+        대기열의 기록을 최대 flush_max_rows 개씩 모아 한 번의 executemany + commit 으로 저장합니다.
+        """
+        while True:
+            rows = [self._writes.get()]
+            while len(rows) < self.flush_max_rows:
+                try:
+                    rows.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in rows
+            rows = [row for row in rows if row is not None]
+            if rows:
+                try:
+                    with self._disk_lock:
+                        self._disk.executemany(
+                            "INSERT OR REPLACE INTO query_embeddings (model, query, embedding, created_at) "
+                            "VALUES (?, ?, ?, ?)", rows
+                        )
+                        self._disk.commit()
+                except sqlite3.Error as e:
+                    logging.error(f"임베딩 디스크 캐시 기록 실패 ({len(rows)}건): {e}")
+            if stop:
+                return
+
+    def _put_memory(self, key: str, embedding: list, now: float):
+        self._memory[key] = (now, embedding)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        total = hits + self.misses
+        avg_miss_seconds = self._miss_seconds / self.misses if self.misses else 0.0
+        return {
+            'model': self.model,
+            'size': len(self._memory),
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': hits / total if total else 0.0,
+            # 캐시 적중으로 생략된 임베딩 API 호출 수와 평균 호출 시간 기준의 절감 시간 추정치
+            'saved_requests': hits,
+            'estimated_saved_seconds': hits * avg_miss_seconds,
+        }
+
+    def close(self):
+        # 남은 기록을 모두 저장한 뒤 연결을 닫음
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join()
+            self._writer = None
+        with self._disk_lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
@@ -0,0 +1,221 @@
+import json
+import os
+import shutil
+import struct
+from datetime import datetime
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.feather as feather
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# 임베딩 저장소 형식
+# - vectors.bin : [매직(8) | 헤더 길이(uint32) | JSON 헤더 | 패딩] + 연속된 float32 벡터 (count x dim, row-major)
+#                 헤더에 형식 버전, 임베딩 모델, 차원, 개수를 기록하며 벡터 영역은 64바이트 경계에서 시작 → np.memmap 으로 바로 매핑
+# - meta.feather: id / 질문 / 답변 / 카테고리 등 텍스트 메타데이터 (Arrow IPC, 메모리 매핑으로 로드)
+# 서버는 이 두 파일만으로(Chroma / CSV 없이) 검색·답변에 필요한 데이터를 매핑하므로 서빙 스냅샷으로도 사용합니다.
+#
+# 버전별 스냅샷 (publish_store): <store_dir>/<버전>/{vectors.bin, meta.feather} + <store_dir>/CURRENT (현재 버전 이름)
+# 새 버전 디렉터리를 모두 기록한 뒤 CURRENT 를 원자적으로 교체하므로, 여러 서버 워커가 읽는 중에도 두 파일이 어긋나지 않습니다.
+# CURRENT 가 없으면 <store_dir> 바로 아래의 두 파일을 사용합니다 (기존 형식).
+STORE_FORMAT_VERSION = 1
+STORE_MAGIC = b"FAQEMBED"
+VECTORS_FILE = "vectors.bin"
+META_FILE = "meta.feather"
+CURRENT_FILE = "CURRENT"
+META_COLUMNS = ['id', 'content_hash', 'question', 'answer', 'category', 'subcategory', 'question_clean', 'answer_clean']
+_ALIGNMENT = 64
+
+
+class EmbeddingStore:
+    """
+    메모리 매핑된 임베딩 저장소.
+    vectors 는 디스크 파일을 그대로 매핑한 (count, dim) float32 배열이고, table 은 메모리 매핑된 Arrow 테이블입니다.
+    """
+
+    def __init__(self, store_dir: str, header: dict, vectors: np.ndarray, table: pa.Table):
+        self.store_dir = store_dir
+        self.header = header
+        self.vectors = vectors
+        self.table = table
+
+    @property
+    def model(self) -> str:
+        return self.header['model']
+
+    @property
+    def dim(self) -> int:
+        return self.header['dim']
+
+    @property
+    def version(self) -> str:
+        return self.header['created_at']
+
+    @property
+    def normalized(self) -> bool:
+        return self.header.get('normalized', False)
+
+    def __len__(self) -> int:
+        return self.header['count']
+
+    def column(self, name: str) -> list:
+        return self.table.column(name).to_pylist()
+
+    def rows(self, indices: list, columns: list) -> dict:
+        """
+        지정한 행들의 열 값만 읽음 ({열 이름: 값 리스트}) - 전체 열을 파이썬 객체로 복사하지 않고 매핑된 테이블에서 바로 조회
+        """
+        return {name: [self.table.column(name)[i].as_py() for i in indices] for name in columns}
+
+    def to_dataframe(self, columns: list = None) -> "pd.DataFrame":
+        return self.table.select(columns or self.table.column_names).to_pandas()
+
+
+def save_embedding_store(store_dir: str, df: "pd.DataFrame", embeddings, model: str) -> dict:
+    """
+    전처리된 FAQ DataFrame 과 임베딩을 저장소 형식으로 기록합니다.
+    df 에 id 열이 없으면 행 순서(0, 1, 2, ...)를 문서 id 로 사용합니다.
+    """
+    vectors = np.ascontiguousarray(np.asarray(embeddings, dtype=np.float32))
+    if vectors.ndim != 2 or vectors.shape[0] != len(df):
+        raise ValueError(f"임베딩 개수/형태가 올바르지 않습니다: {vectors.shape}, rows={len(df)}")
+
+    os.makedirs(store_dir, exist_ok=True)
+    header = {
+        'format_version': STORE_FORMAT_VERSION,
+        'model': model,
+        'dim': int(vectors.shape[1]),
+        'count': int(vectors.shape[0]),
+        'dtype': 'float32',
+        # 모든 벡터가 단위 벡터이면 검색 시 정규화 복사 없이 매핑된 파일을 그대로 사용할 수 있음
+        'normalized': bool(np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-3)) if len(vectors) else True,
+        # 저장소(서빙 스냅샷) 버전 - 다시 기록할 때마다 바뀜
+        'created_at': datetime.now().strftime("%Y%m%d%H%M%S%f"),
+    }
+
+    meta = df.reset_index(drop=True)
+    if 'id' not in meta.columns:
+        meta.insert(0, 'id', meta.index.astype(str))
+    meta = meta[[col for col in META_COLUMNS if col in meta.columns]]
+
+    # 임시 파일에 쓴 뒤 교체하여, 기록 도중 읽는 쪽이 깨진 파일을 보지 않도록 함
+    vectors_path = os.path.join(store_dir, VECTORS_FILE)
+    with open(vectors_path + ".tmp", 'wb') as f:
+        f.write(_encode_header(header))
+        f.write(vectors.tobytes())
+    feather.write_feather(pa.Table.from_pandas(meta, preserve_index=False), os.path.join(store_dir, META_FILE) + ".tmp",
+                          compression='uncompressed')
+    os.replace(vectors_path + ".tmp", vectors_path)
+    os.replace(os.path.join(store_dir, META_FILE) + ".tmp", os.path.join(store_dir, META_FILE))
+    print(f"임베딩 저장소 기록 완료: {store_dir} ({header['count']} x {header['dim']}, {model})")
+    return header
+
+
+def publish_store(store_dir: str, df: "pd.DataFrame", embeddings, model: str, keep: int = 3, prepare=None) -> dict:
+    """
+    새 버전 디렉터리(<store_dir>/<created_at>)에 저장소를 기록하고 CURRENT 를 원자적으로 교체합니다.
+    prepare(디렉터리) 를 지정하면 교체 전에 호출하여 파생 색인(양자화 색인 등)을 같은 스냅샷에 함께 기록합니다.
+    실행 중인 서버는 CURRENT 변경을 감지하여 재시작 없이 새 스냅샷으로 교체합니다.
+    최근 keep 개 버전만 남기고 오래된 버전은 삭제합니다 (이미 매핑한 프로세스는 삭제 후에도 기존 매핑을 계속 사용).
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    staging_dir = os.path.join(store_dir, f".staging-{os.getpid()}")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    header = save_embedding_store(staging_dir, df, embeddings, model)
+    if prepare is not None:
+        prepare(staging_dir)
+    version = header['created_at']
+    os.rename(staging_dir, os.path.join(store_dir, version))
+
+    pointer_path = os.path.join(store_dir, CURRENT_FILE)
+    with open(pointer_path + ".tmp", 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(pointer_path + ".tmp", pointer_path)
+    print(f"서빙 스냅샷 교체: {version}")
+
+    versions = sorted(name for name in os.listdir(store_dir)
+                      if name != version and not name.startswith('.') and os.path.exists(os.path.join(store_dir, name, VECTORS_FILE)))
+    for name in versions[:max(0, len(versions) - (keep - 1))]:
+        shutil.rmtree(os.path.join(store_dir, name), ignore_errors=True)
+    return header
+
+
+def current_store_version(store_dir: str):
+    """
+    CURRENT 가 가리키는 스냅샷 버전 (버전별 스냅샷이 아니면 None)
+    """
+    try:
+        with open(os.path.join(store_dir, CURRENT_FILE), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def resolve_store_dir(store_dir: str) -> str:
+    """
+    CURRENT 가 있으면 현재 버전 디렉터리, 없으면 store_dir 그대로 반환
+    """
+    version = current_store_version(store_dir)
+    return os.path.join(store_dir, version) if version else store_dir
+
+
+def read_store_header(store_dir: str) -> tuple:
+    """
+    벡터 파일의 헤더를 읽어 (header, 벡터 영역 시작 오프셋)을 반환합니다.
+    """
+    with open(os.path.join(store_dir, VECTORS_FILE), 'rb') as f:
+        prefix = f.read(len(STORE_MAGIC) + 4)
+        if prefix[:len(STORE_MAGIC)] != STORE_MAGIC:
+            raise ValueError(f"임베딩 저장소 형식이 아닙니다: {store_dir}")
+        (header_len,) = struct.unpack('<I', prefix[len(STORE_MAGIC):])
+        header = json.loads(f.read(header_len).decode('utf-8'))
+    if header.get('format_version') != STORE_FORMAT_VERSION:
+        raise ValueError(f"지원하지 않는 임베딩 저장소 버전입니다: {header.get('format_version')}")
+    return header, _data_offset(header_len)
+
+
+def load_embedding_store(store_dir: str) -> EmbeddingStore:
+    """
+    저장소를 복사 없이 메모리 매핑으로 엽니다. 실제 데이터는 접근하는 시점에 OS 가 페이지 단위로 읽어옵니다.
+    여러 프로세스가 같은 파일을 매핑하면 OS 페이지 캐시를 공유하므로 벡터/메타데이터는 한 벌만 메모리에 올라갑니다.
+    """
+    store_dir = resolve_store_dir(store_dir)
+    try:
+        header, offset = read_store_header(store_dir)
+        vectors = np.memmap(os.path.join(store_dir, VECTORS_FILE), dtype=np.float32, mode='r',
+                            offset=offset, shape=(header['count'], header['dim']))
+        table = feather.read_table(os.path.join(store_dir, META_FILE), memory_map=True)
+        print(f"임베딩 저장소 로드 성공: {header['count']} rows, dim={header['dim']}, model={header['model']}")
+        return EmbeddingStore(store_dir, header, vectors, table)
+    except Exception as e:
+        print(f"임베딩 저장소 로드 실패: {e}")
+        raise
+
+
+def export_store_to_csv(store: EmbeddingStore, output_path: str):
+    """
+    기존 embeddings_openai.csv 형식(임베딩을 리스트 문자열로 저장)으로 내보냅니다. 호환/검토용 선택 기능입니다.
+    """
+    df = store.to_dataframe([col for col in store.table.column_names if col != 'id'])
+    df['embedding'] = [vector.tolist() for vector in store.vectors]
+    df.to_csv(output_path, index=False, encoding='utf-8-sig')
+    print(f"CSV 내보내기 완료: {output_path}")
+
+
+def store_exists(store_dir: str) -> bool:
+    store_dir = resolve_store_dir(store_dir)
+    return os.path.exists(os.path.join(store_dir, VECTORS_FILE)) and os.path.exists(os.path.join(store_dir, META_FILE))
+
+
+def _encode_header(header: dict) -> bytes:
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    prefix = STORE_MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes
+    return prefix + b"\0" * (_data_offset(len(header_bytes)) - len(prefix))
+
+
+def _data_offset(header_len: int) -> int:
+    size = len(STORE_MAGIC) + 4 + header_len
+    return (size + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
@@ -1,11 +1,20 @@
 import asyncio
 import json
 import logging
+import time
+from contextlib import aclosing
 
-import openai
-from openai import OpenAI, Stream
+from openai import AsyncOpenAI, OpenAI
 
+from src.admission import AdmissionLimiter, AdmissionRejected
+from src.config import SSE_COALESCE_WINDOW_MS, SSE_COALESCE_MAX_BYTES
+from src.metrics import (
+    RequestTimer, PROMPT_TOKENS, STREAM_SECONDS, STREAM_TOKENS, STREAM_TOKENS_TOTAL, STREAM_FRAMES, STREAM_FRAMES_TOTAL,
+    ABANDONED_STREAMS_TOTAL, TOKENS_SAVED_TOTAL, record_usage
+)
 from src.openai_embedding import load_openai_api_key
+from src.prompt_builder import build_messages
+from src.sse_coalescer import coalesce_deltas
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -23,66 +32,14 @@ def generate_response(
     - 추천 질문
     을 함께 생성.
     """
+    # 1) 프롬프트 구성 (고정 지시문 + FAQ 답변/연관 질문/사용자 질문, 토큰 예산 내)
+    messages, prompt_info = build_messages(user_query, faq_answers, related_questions)
 
-    # 1) FAQ 답변 컨텍스트 구성 (상위 3개)
-    faq_context = ""
-    for i, ans in enumerate(faq_answers):
-        faq_context += f"FAQ {i + 1} Answer:\n{ans}\n\n"
-
-    # 2) 추천 질문 컨텍스트 구성 (나머지 2개)
-    #    필요하다면 답변도 함께 넘겨줄 수 있지만, 여기서는 질문만 넘긴다고 가정
-    recommended_context = ""
-    for i, q in enumerate(related_questions):
-        recommended_context += f"- {q}\n"
-
-    # 3) 최종 프롬프트 생성
-    prompt = (
-        "You are a friendly and helpful Korean chatbot named 'SmartStore Bot'. "
-        "When answering the user's question, please speak in a warm and polite tone, "
-        "providing sufficient detail and clarity. Refer to the given FAQ context if it is relevant. "
-        "If the user asks for a step-by-step procedure, list each step clearly and use friendly language. "
-        "If the FAQ doesn't have an answer, politely apologize and suggest alternative actions. "
-        "Please provide the answer in Korean. Keep the response concise but not too short—"
-        "around 200~300 characters or a few paragraphs is okay. "
-        "Use line breaks to improve readability, but avoid using Markdown like Bold.\n\n"
-        "예시 포맷:\n"
-        "1) 첫 번째 작업을 설명합니다.\n"
-        "2) 두 번째 작업을 설명합니다.\n"
-        "3) 세 번째 작업을 설명합니다.\n\n"
-        "End the answer with a short polite closing statement such as '도움이 되셨길 바랍니다. 더 궁금한 점 있으시면 언제든 알려주세요!'.\n\n"
-
-        f"사용자 질문: {user_query}\n\n"
-        f"FAQ 답변 정보:\n{faq_context}\n"
-        f"연관 질문 후보:\n{recommended_context}\n"
-
-        "아래 형식을 참고하여 답변을 작성하세요:\n"
-        "-----\n"
-        "답변:\n"
-        "(FAQ들을 참조해서 사용자 질문에 대한 답변을 작성)\n\n"
-        "추천 질문:\n"
-        "(연관 질문 후보 중 2~3개를 자연스럽게 나열)\n"
-        "-----\n"
-        "답변:"
-    )
-
-    # 4) LLM 호출
+    # 2) LLM 호출
     try:
         response = client.chat.completions.create(
             model=model,
-            messages=[
-                {
-                    "role": "developer",
-                    "content": (
-                        "You are a friendly and helpful Korean chatbot named 'SmartStore Bot'. "
-                        "You speak in a polite and warm tone, providing thorough explanations. "
-                        "If you cannot find relevant info in the FAQ, politely apologize and suggest other possible solutions."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
+            messages=messages,
             temperature=0.4,
             top_p=0.9,
             frequency_penalty=0,
@@ -91,7 +48,7 @@ def generate_response(
         )
 
         generated_answer = response.choices[0].message.content
-        logging.info("LLM 응답 생성 완료")
+        logging.info(f"LLM 응답 생성 완료 (prompt_tokens≈{prompt_info['prompt_tokens']})")
         return generated_answer
 
     except Exception as e:
@@ -99,81 +56,204 @@ def generate_response(
         raise
 
 
-async def stream_sync_to_async(stream: Stream):
+def _record_prompt(prompt_info: dict):
+    PROMPT_TOKENS.observe(prompt_info['prompt_tokens'])
+    logging.info(f"프롬프트 구성 완료: prompt_tokens≈{prompt_info['prompt_tokens']} "
+                 f"(answers={prompt_info['answers']}, deduped={prompt_info['deduped']}, "
+                 f"truncated={prompt_info['truncated']}, dropped={prompt_info['dropped']})")
+
+
+async def replay_response_sse(answer: str, timer: RequestTimer = None, outcome: str = "response_cache"):
     """
-    동기 스트림을 비동기적으로 변환
+    캐시된 답변을 generate_response_sse 와 동일한 SSE 프레임 형식으로 전송
     """
-    for item in stream:
-        await asyncio.sleep(0)  # 이벤트 루프에 양보
-        yield item
-
-async def generate_response_sse(client: OpenAI, user_query, faq_context, recommended_context, model: str = "gpt-4o-mini"):
-    # 최종 프롬프트
-    prompt = (
-        "You are a friendly and helpful Korean chatbot named 'SmartStore Bot'. "
-        "When answering the user's question, please speak in a warm and polite tone, "
-        "providing sufficient detail and clarity. Refer to the given FAQ context if it is relevant. "
-        "If the user asks for a step-by-step procedure, list each step clearly and use friendly language. "
-        "If the FAQ doesn't have an answer, politely apologize and suggest alternative actions. "
-        "Please provide the answer in Korean. Keep the response concise but not too short—"
-        "around 200~300 characters or a few paragraphs is okay. "
-        "If you cannot find relevant info in the FAQ, politely apologize and only say '지금 말씀하신 질문은 FaQ 에 포함되어 있지 않습니다.'."
-        "Use line breaks to improve readability, but avoid using Markdown like Bold.\n\n"
-        "예시 포맷:\n"
-        "1) 첫 번째 작업을 설명합니다.\n"
-        "2) 두 번째 작업을 설명합니다.\n"
-        "3) 세 번째 작업을 설명합니다.\n\n"
-        "End the answer with a short polite closing statement such as '도움이 되셨길 바랍니다. 더 궁금한 점 있으시면 언제든 알려주세요!'.\n\n"
-
-        f"사용자 질문: {user_query}\n\n"
-        f"FAQ 답변 정보:\n{faq_context}\n"
-        f"연관 질문 후보:\n{recommended_context}\n"
-
-        "아래 형식을 참고하여 답변을 작성하세요:\n"
-        "-----\n"
-        "답변:\n"
-        "(FAQ들을 참조해서 사용자 질문에 대한 답변을 작성)\n\n"
-        "추천 질문:\n"
-        "(연관 질문 후보 중 2~3개를 자연스럽게 나열)\n"
-        "-----\n"
-        "답변:"
-    )
+    try:
+        if timer is not None:
+            timer.first_token()
+        yield f"data: {json.dumps({'status': 'processing', 'data': answer}, ensure_ascii=False)}\n\n"
+        yield f"data: {json.dumps({'status': 'complete', 'data': 'Stream finished'}, ensure_ascii=False)}\n\n"
+    finally:
+        if timer is not None:
+            timer.finish(outcome)
+
+# 정상 완료된 스트림의 평균 delta 수 - 중간에 닫은 스트림의 절감 토큰 수 추정에 사용
+_completed_streams = {'responses': 0, 'tokens': 0}
+
+TIMEOUT_MESSAGE = "응답 생성 시간이 초과되었습니다. 잠시 후 다시 시도해 주세요."
+NO_FAQ_MESSAGE = '질문과 관련된 FAQ가 없습니다. 다시 시도해 주세요.'
 
+
+def _estimate_tokens_saved(consumed: int) -> int:
+    if not _completed_streams['responses']:
+        return 0
+    expected = _completed_streams['tokens'] / _completed_streams['responses']
+    return max(0, round(expected - consumed))
+
+
+async def error_response_sse(message: str, timer: RequestTimer = None, outcome: str = "error"):
+    """
+    generate_response_sse 와 같은 형식의 error 프레임 하나로 응답 (예: 검색 단계 시간 초과)
+    """
     try:
-        # stream=True 를 사용한 ChatCompletion
-        response = client.chat.completions.create(
+        yield f"data: {json.dumps({'status': 'error', 'data': message}, ensure_ascii=False)}\n\n"
+    finally:
+        if timer is not None:
+            timer.finish(outcome)
+
+
+async def generate_response_sse(client: AsyncOpenAI, user_query, faq_answers: list, related_questions: list,
+                                model: str = "gpt-4o-mini", on_complete=None, timer: RequestTimer = None,
+                                is_disconnected=None, first_token_timeout: float = None,
+                                limiter: AdmissionLimiter = None):
+    """
+    faq_answers: 답변 컨텍스트로 사용할 FAQ 답변 (검색 순위순), related_questions: 추천 질문 후보
+    on_complete: 스트리밍이 정상 완료되면 전체 답변 텍스트로 호출되는 콜백 (예: 응답 캐시 저장)
+    timer: 단계별 지연 시간 기록 및 요청 마감 시각 - 스트림이 끝나면 요청을 종료 처리
+    is_disconnected: 클라이언트 연결 종료 여부를 반환하는 async 함수 (예: Request.is_disconnected)
+                     연결이 끊기면 LLM 스트림을 즉시 닫아 더 이상 토큰을 생성/수신하지 않음
+    first_token_timeout: LLM 요청부터 첫 토큰까지의 제한 시간(초), 이후에는 요청 마감까지
+    limiter: LLM 스트림 동시 실행 수 제한 - 슬롯을 얻을 때까지 대기하고 스트림이 끝나면 반환,
+             대기열이 가득 찼거나 대기 시간을 넘기면 error 프레임으로 응답
+    """
+    timer = timer or RequestTimer()
+    outcome = "llm"
+    answer_chunks = []
+    stream_start = None
+    frames = 0
+    response = None
+    admitted = False
+    try:
+        with timer.stage("prompt"):
+            messages, prompt_info = build_messages(user_query, faq_answers, related_questions)
+        _record_prompt(prompt_info)
+
+        # 검색 중에 이미 연결이 끊긴 경우 LLM 을 호출하지 않음
+        if is_disconnected is not None and await is_disconnected():
+            outcome = "abandoned"
+            return
+
+        if limiter is not None:
+            with timer.stage("llm_queue"):
+                await limiter.acquire(timeout=timer.timeout())
+            admitted = True
+
+        # stream=True 를 사용한 ChatCompletion (AsyncOpenAI → 토큰 대기 중에도 이벤트 루프를 막지 않음)
+        request_start = time.perf_counter()
+        response = await asyncio.wait_for(client.chat.completions.create(
             model=model,
-            messages=[
-                {
-                    "role": "developer",
-                    "content": (
-                        "You are a friendly and helpful Korean chatbot named 'SmartStore Bot'. "
-                        "You speak in a polite and warm tone, providing thorough explanations. "
-                        # "If you cannot find relevant info in the FAQ, politely apologize only."
-                    )
-                },
-                {"role": "user", "content": prompt},
-            ],
+            messages=messages,
             temperature=0.4,
             top_p=0.9,
             frequency_penalty=0,
             presence_penalty=0,
             stream=True,
-        )
+            # 마지막 청크로 usage(프롬프트/캐시된 프롬프트/완료 토큰 수)를 받음
+            stream_options={"include_usage": True},
+        ), timeout=timer.timeout(first_token_timeout))
+
+        async def deltas():
+            nonlocal stream_start
+            chunks = response.__aiter__()
+            while True:
+                # 첫 토큰까지는 first_token_timeout, 이후에는 요청 마감까지만 기다림
+                timeout = timer.timeout(first_token_timeout if stream_start is None else None)
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=timeout)
+                except StopAsyncIteration:
+                    return
+                if getattr(chunk, 'usage', None) is not None:
+                    record_usage(chunk.usage)
+                if not chunk.choices:
+                    continue
+                chunk_content = chunk.choices[0].delta.content
+                if chunk_content:
+                    if stream_start is None:
+                        stream_start = time.perf_counter()
+                        timer.record("llm_first_token", stream_start - request_start)
+                        timer.first_token()
+                    answer_chunks.append(chunk_content)
+                    yield chunk_content
 
+        # 작은 delta 들을 시간 창/크기 기준으로 모아 processing 프레임 하나로 전송 (첫 토큰은 즉시 전송)
+        async with aclosing(coalesce_deltas(deltas(), SSE_COALESCE_WINDOW_MS, SSE_COALESCE_MAX_BYTES)) as texts:
+            async for text in texts:
+                if is_disconnected is not None and await is_disconnected():
+                    outcome = "abandoned"
+                    return
+                frames += 1
+                yield f"data: {json.dumps({'status': 'processing', 'data': text}, ensure_ascii=False)}\n\n"
 
-        async for chunk in stream_sync_to_async(response):  # 비동기적으로 chunk를 처리
-            chunk_content = chunk.choices[0].delta.content
-            if chunk_content:
-                yield f"data: {json.dumps({'status': 'processing', 'data': chunk_content}, ensure_ascii=False)}\n\n"
+        if on_complete is not None:
+            on_complete("".join(answer_chunks))
 
         # 스트리밍 완료
         yield f"data: {json.dumps({'status': 'complete', 'data': 'Stream finished'}, ensure_ascii=False)}\n\n"
 
+    except AdmissionRejected as e:
+        outcome = "rejected"
+        logging.warning(f"LLM 스트림 진입 거절 ({e.reason})")
+        yield f"data: {json.dumps({'status': 'error', 'data': e.message}, ensure_ascii=False)}\n\n"
+
+    except asyncio.TimeoutError:
+        outcome = "timeout"
+        logging.warning(f"LLM 응답 시간 초과 (tokens={len(answer_chunks)})")
+        yield f"data: {json.dumps({'status': 'error', 'data': TIMEOUT_MESSAGE}, ensure_ascii=False)}\n\n"
+
+    except (asyncio.CancelledError, GeneratorExit):
+        # 서버가 연결 종료를 감지하여 스트리밍을 중단한 경우
+        outcome = "abandoned"
+        raise
+
     except Exception as e:
+        outcome = "error"
         logging.error(f"LLM 응답 생성 실패: {e}")
         yield f"data: {json.dumps({'status': 'error', 'data': str(e)}, ensure_ascii=False)}\n\n"
 
+    finally:
+        if response is not None:
+            # 정상 완료가 아니면 업스트림 연결을 닫아 생성을 중단 (완료된 스트림에는 영향 없음)
+            await response.close()
+        if admitted:
+            limiter.release()
+        if outcome == "llm":
+            _completed_streams['responses'] += 1
+            _completed_streams['tokens'] += len(answer_chunks)
+        elif outcome == "abandoned":
+            ABANDONED_STREAMS_TOTAL.inc(stage="streaming" if stream_start is not None else "before_first_token")
+            TOKENS_SAVED_TOTAL.inc(_estimate_tokens_saved(len(answer_chunks)))
+            logging.info(f"클라이언트 연결 종료로 LLM 스트림 중단 (tokens={len(answer_chunks)})")
+        if stream_start is not None:
+            stream_seconds = time.perf_counter() - stream_start
+            timer.record("llm_stream", stream_seconds)
+            STREAM_SECONDS.observe(stream_seconds)
+        STREAM_TOKENS_TOTAL.inc(len(answer_chunks))
+        STREAM_TOKENS.observe(len(answer_chunks))
+        STREAM_FRAMES_TOTAL.inc(frames)
+        STREAM_FRAMES.observe(frames)
+        timer.finish(outcome)
+
+
+async def generate_answer_async(client: AsyncOpenAI, user_query, faq_answers: list, related_questions: list,
+                                model: str = "gpt-4o-mini", with_usage: bool = False):
+    """
+    generate_response_sse 와 같은 프롬프트로 스트리밍 없이 전체 답변을 생성 (배치 처리용)
+    with_usage: True 이면 (답변, usage) 를 반환 (토큰 사용량 집계용)
+    """
+    messages, prompt_info = build_messages(user_query, faq_answers, related_questions)
+    _record_prompt(prompt_info)
+    response = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=0.4,
+        top_p=0.9,
+        frequency_penalty=0,
+        presence_penalty=0,
+    )
+    record_usage(response.usage)
+    if with_usage:
+        return response.choices[0].message.content, response.usage
+    return response.choices[0].message.content
+
 
 if __name__ == "__main__":
     client = load_openai_api_key()
@@ -0,0 +1,283 @@
+import logging
+import time
+from collections import defaultdict
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.text_cleaning import clean_question
+from src.embedding_store import EmbeddingStore
+from src.retrieval import METADATA_COLUMNS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+_SPACE = ord(' ')
+_SHIFT = 21  # 유니코드 코드포인트는 21비트 이내
+_DOC_SHIFT = 2 * _SHIFT
+
+
+def _ngram_codes(codepoints: np.ndarray) -> tuple:
+    """
+    공백으로 감싼 코드포인트 배열에서 문자 2-gram 을 정수 코드(앞 글자 << 21 | 뒷 글자)로 만듭니다.
+    한 글자 어절은 (글자 << 21) 단일 토큰으로 사용합니다.
+    반환: (토큰 코드 배열, 각 토큰의 시작 위치 배열)
+    """
+    is_space = codepoints == _SPACE
+    left, right = codepoints[:-1], codepoints[1:]
+    bigram = ~is_space[:-1] & ~is_space[1:]
+    unigram = np.zeros_like(is_space)
+    unigram[1:-1] = ~is_space[1:-1] & is_space[:-2] & is_space[2:]
+
+    bigram_positions = np.flatnonzero(bigram)
+    unigram_positions = np.flatnonzero(unigram)
+    codes = np.concatenate([(left[bigram_positions] << _SHIFT) | right[bigram_positions],
+                            codepoints[unigram_positions] << _SHIFT])
+    return codes, np.concatenate([bigram_positions, unigram_positions])
+
+
+def _codepoints(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int64)
+
+
+# str.split() 과 같은 공백 문자 (유니코드 공백 포함)
+_WHITESPACE = r'[\s\p{Z}\x{1c}-\x{1f}\x{85}]+'
+
+
+def _joined_texts(texts: list) -> tuple:
+    """
+    문서들을 소문자 / 공백 정규화하여 공백으로 이어 붙인 문자열과 문서별 길이(코드포인트)
+    """
+    normalized = [' '.join((text or '').lower().split()) for text in texts]
+    return ' '.join(normalized), np.array([len(text) for text in normalized], dtype=np.int64)
+
+
+def _joined_arrow_texts(column) -> tuple:
+    """
+    _joined_texts 와 같은 결과를 Arrow 열에서 바로 만듭니다 (문서별 파이썬 문자열을 만들지 않음).
+    """
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+    normalized = pc.utf8_trim_whitespace(pc.replace_substring_regex(pc.utf8_lower(column.fill_null('')), _WHITESPACE, ' '))
+    lengths = pc.utf8_length(normalized).to_numpy(zero_copy_only=False).astype(np.int64)
+    offsets = pa.array([0, len(normalized)], type=pa.int32())
+    separator = pa.scalar(' ', type=normalized.type)
+    return pc.binary_join(pa.ListArray.from_arrays(offsets, normalized), separator)[0].as_py(), lengths
+
+
+def ngram_codes(text: str) -> np.ndarray:
+    """
+    한국어용 문자 n-gram 토큰화 (n=2). 어절(공백 단위)마다 2-gram 을 만들고, 한 글자 어절은 그대로 사용합니다.
+    형태소 분석기 없이도 조사/어미 변화('회원가입은', '회원가입을')에 강합니다.
+    토큰은 비교/색인이 빠르도록 정수 코드로 표현합니다.
+    """
+    return _ngram_codes(_codepoints(f" {' '.join(text.lower().split())} "))[0]
+
+
+class BM25Index:
+    """
+    question_clean / answer_clean 에 대한 메모리 내 역색인 + BM25 점수.
+    점수 = BM25(질문) + answer_weight × BM25(답변)
+    색인은 NumPy 로 한 번에 만듭니다 (토큰 코드 정렬 → 토큰별 posting 구간).
+    """
+
+    def __init__(self, ids: list, questions: list, answers: list, metadata_columns: dict = None,
+                 k1: float = 1.5, b: float = 0.75, answer_weight: float = 0.3, store: EmbeddingStore = None):
+        """
+        store: 지정하면 ids / questions / answers / metadata_columns 대신 매핑된 메타데이터 테이블을 사용
+               (색인은 Arrow 열에서 바로 만들고 결과 행만 읽으므로 텍스트를 워커마다 파이썬 객체로 복사하지 않음)
+        """
+        start = time.perf_counter()
+        self.ids = ids
+        self.documents = questions
+        self.metadata_columns = metadata_columns or {}
+        self.store = store
+        self.k1 = k1
+        self.b = b
+        self.answer_weight = answer_weight
+
+        if store is not None:
+            self.n_docs = len(store)
+            fields = [_joined_arrow_texts(store.table.column(col)) for col in ('question_clean', 'answer_clean')]
+        else:
+            self.n_docs = len(ids)
+            fields = [_joined_texts(questions), _joined_texts(answers)]
+        self._fields = [self._build_field(text, lengths) for text, lengths in fields]
+        logging.info(f"BM25 색인 생성 완료: {self.n_docs} docs, {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    @classmethod
+    def from_store(cls, store: EmbeddingStore, **kwargs):
+        return cls(None, None, None, store=store, **kwargs)
+
+    def _build_field(self, text: str, text_lengths: np.ndarray) -> dict:
+        n_docs = len(text_lengths)
+        # 모든 문서를 공백으로 이어 붙여 한 번에 토큰화한 뒤, 위치로 문서 번호를 찾음
+        starts = np.concatenate([[0], np.cumsum(text_lengths[:-1] + 1)])
+        codes, positions = _ngram_codes(_codepoints(' ' + text + ' '))
+        docs = np.searchsorted(starts, positions, side='right') - 1
+        lengths = np.bincount(docs, minlength=n_docs).astype(np.float32)
+
+        # (문서, 토큰) 쌍별 tf
+        pairs, tfs = np.unique((docs.astype(np.int64) << _DOC_SHIFT) | codes, return_counts=True)
+        pair_docs = (pairs >> _DOC_SHIFT).astype(np.int32)
+        pair_codes = pairs & ((1 << _DOC_SHIFT) - 1)
+
+        # 토큰 코드 순으로 정렬하면 토큰별 posting 이 연속 구간이 됨
+        order = np.argsort(pair_codes, kind='stable')
+        pair_docs, pair_codes, tfs = pair_docs[order], pair_codes[order], tfs[order].astype(np.float32)
+        terms, term_starts, dfs = np.unique(pair_codes, return_index=True, return_counts=True)
+
+        avg_length = float(lengths.mean()) if n_docs else 0.0
+        norm = self.k1 * (1 - self.b + self.b * lengths / (avg_length or 1.0))
+        idf = np.log(1 + (n_docs - dfs + 0.5) / (dfs + 0.5)).astype(np.float32)
+        # 문서별 BM25 항을 미리 계산해 두면 질의 시에는 더하기만 하면 됨
+        weights = np.repeat(idf, dfs) * tfs * (self.k1 + 1) / (tfs + norm[pair_docs])
+        return {'terms': terms, 'starts': term_starts, 'ends': term_starts + dfs, 'docs': pair_docs, 'weights': weights}
+
+    def _query_codes(self, query: str) -> np.ndarray:
+        return ngram_codes(clean_question(query) or query)
+
+    def scores(self, query: str) -> np.ndarray:
+        codes = self._query_codes(query)
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for weight, field in zip((1.0, self.answer_weight), self._fields):
+            found = np.searchsorted(field['terms'], codes)
+            for term, position in zip(codes, found):
+                if position < len(field['terms']) and field['terms'][position] == term:
+                    start, end = field['starts'][position], field['ends'][position]
+                    scores[field['docs'][start:end]] += weight * field['weights'][start:end]
+        return scores
+
+    def search(self, query: str, top_k: int = 5) -> tuple:
+        """
+        반환: (상위 문서 번호 배열, 점수 배열) - 점수 내림차순
+        """
+        scores = self.scores(query)
+        k = min(top_k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(k)
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def similarity(self, query: str, doc: int) -> float:
+        """
+        질의와 FAQ 질문의 2-gram 집합 자카드 유사도 (0~1)
+        """
+        query_terms = set(self._query_codes(query).tolist())
+        doc_terms = set(ngram_codes(self.document(doc) or '').tolist())
+        union = query_terms | doc_terms
+        return len(query_terms & doc_terms) / len(union) if union else 0.0
+
+    def document(self, doc: int) -> str:
+        if self.store is not None:
+            return self.store.rows([doc], ['question_clean'])['question_clean'][0]
+        return self.documents[doc]
+
+    def doc_id(self, doc: int) -> str:
+        if self.store is not None:
+            return self.store.rows([doc], ['id'])['id'][0]
+        return self.ids[doc]
+
+    def doc_ids(self) -> list:
+        return self.store.column('id') if self.store is not None else list(self.ids)
+
+    def results(self, docs, distances) -> dict:
+        """
+        문서 번호 목록을 search_faq 와 같은 형식(단일 질의)의 결과로 변환
+        """
+        docs = [int(doc) for doc in docs]
+        if self.store is not None:
+            return self._store_results(docs, distances)
+        return {
+            'ids': [[self.ids[doc] for doc in docs]],
+            'documents': [[self.documents[doc] for doc in docs]],
+            'metadatas': [[{col: values[doc] for col, values in self.metadata_columns.items()} for doc in docs]],
+            'distances': [list(distances)],
+        }
+
+    def _store_results(self, docs: list, distances) -> dict:
+        metadata_columns = [col for col in METADATA_COLUMNS if col in self.store.table.column_names]
+        rows = self.store.rows(docs, ['id', *metadata_columns])
+        if 'category' in rows:
+            # Chroma 메타데이터와 동일하게 카테고리 리스트를 문자열로 반환
+            rows['category'] = [str(list(c)) if c is not None else '' for c in rows['category']]
+        return {
+            'ids': [rows['id']],
+            'documents': [rows['question_clean']],
+            'metadatas': [[{col: rows[col][i] for col in metadata_columns} for i in range(len(docs))]],
+            'distances': [list(distances)],
+        }
+
+
+class LexicalRetriever:
+    """
+    BM25 빠른 경로 + 벡터 검색 결합
+    - 빠른 경로: 최상위 문서가 질의와 거의 같은 문장(자카드 유사도 ≥ min_similarity)이고
+      2위와 점수 차(배수 ≥ min_margin)가 충분하면 질의 임베딩 없이 바로 검색 결과를 만듭니다.
+    - 그 외: 어휘/벡터 순위를 Reciprocal Rank Fusion 으로 결합
+    """
+
+    def __init__(self, index: BM25Index, min_similarity: float = 0.85, min_margin: float = 1.1, fusion_k: int = 60):
+        self.index = index
+        self.min_similarity = min_similarity
+        self.min_margin = min_margin
+        self.fusion_k = fusion_k
+        self._position = {doc_id: i for i, doc_id in enumerate(index.doc_ids())}
+
+        self.requests = 0
+        self.fast_path_hits = 0
+        self.fused = 0
+
+    def fast_path(self, query: str, top_k: int = 5):
+        """
+        확신할 수 있으면 검색 결과를, 아니면 None 을 반환합니다.
+        빠른 경로의 distances 는 벡터 거리 대신 2 × (1 - 자카드 유사도) 로 채웁니다 (순위 / 로그용).
+        임베딩 거리와 척도가 다르므로 NO_FAQ_MAX_DISTANCE / DIRECT_ANSWER_MAX_DISTANCE 판정에는 사용하지 않습니다.
+        """
+        self.requests += 1
+        docs, scores = self.index.search(query, top_k)
+        if len(docs) == 0 or scores[0] <= 0:
+            return None
+        if len(scores) > 1 and scores[1] > 0 and scores[0] / scores[1] < self.min_margin:
+            return None
+        similarity = self.index.similarity(query, int(docs[0]))
+        if similarity < self.min_similarity:
+            return None
+
+        self.fast_path_hits += 1
+        distances = [2.0 * (1.0 - self.index.similarity(query, int(doc))) for doc in docs]
+        logging.info(f"어휘 빠른 경로 적중 (similarity={similarity:.3f}), 질의 임베딩 생략")
+        return self.index.results(docs, distances)
+
+    def fuse(self, query: str, vector_results: dict, top_k: int = 5) -> dict:
+        """
+        벡터 검색 결과(단일 질의)와 BM25 결과를 RRF 로 결합합니다.
+        거리는 벡터 검색 거리를 그대로 쓰고, 어휘 검색에서만 나온 문서는 벡터 결과 중 가장 먼 거리로 채웁니다.
+        """
+        self.fused += 1
+        docs, scores = self.index.search(query, top_k * 2)
+
+        fused = defaultdict(float)
+        vector_distance = {}
+        for rank, (doc_id, distance) in enumerate(zip(vector_results['ids'][0], vector_results['distances'][0])):
+            if doc_id not in self._position:
+                # 임베딩 저장소와 색인이 어긋난 경우(재색인 중 등) 해당 문서는 결합에서 제외
+                continue
+            fused[doc_id] += 1.0 / (self.fusion_k + rank + 1)
+            vector_distance[doc_id] = distance
+        for rank, (doc, score) in enumerate(zip(docs, scores)):
+            if score > 0:
+                fused[self.index.doc_id(int(doc))] += 1.0 / (self.fusion_k + rank + 1)
+
+        ranked = sorted(fused, key=fused.get, reverse=True)[:top_k]
+        worst = max(vector_distance.values()) if vector_distance else 2.0
+        return self.index.results([self._position[doc_id] for doc_id in ranked],
+                                  [vector_distance.get(doc_id, worst) for doc_id in ranked])
+
+    def stats(self) -> dict:
+        return {
+            'requests': self.requests,
+            'fast_path_hits': self.fast_path_hits,
+            'fast_path_rate': self.fast_path_hits / self.requests if self.requests else 0.0,
+            'fused': self.fused,
+        }
@@ -0,0 +1,286 @@
+import asyncio
+import bisect
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# 지연 시간 히스토그램 구간(초) - 임베딩/검색(ms 단위)부터 LLM 스트리밍(수십 초)까지
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048)
+PROMPT_TOKEN_BUCKETS = (256, 512, 768, 1024, 1536, 2048, 3072, 4096, 8192)
+
+
+def _format_labels(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self._values = {}  # labels → [구간별 개수, 합계, 개수]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, f'le="{_format_value(float(bound))}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Prometheus 텍스트 형식(/metrics)으로 내보내는 지표 모음.
+    캐시 적중률처럼 다른 객체가 이미 집계하고 있는 값은 gauge 콜백으로 등록하여 조회 시점에 읽습니다.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._gauges = []  # (이름, 설명, 값을 반환하는 함수)
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge_callback(self, name: str, documentation: str, fn):
+        self._gauges = [gauge for gauge in self._gauges if gauge[0] != name]
+        self._gauges.append((name, documentation, fn))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for name, documentation, fn in self._gauges:
+            try:
+                value = fn()
+            except Exception as e:
+                logging.warning(f"지표 {name} 조회 실패: {e}")
+                continue
+            if value is None:
+                continue
+            lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} gauge", f"{name} {_format_value(value)}"])
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "faq_chat_stage_seconds", "Latency of each /chat pipeline stage", ("stage",))
+REQUEST_SECONDS = REGISTRY.histogram(
+    "faq_chat_request_seconds", "End-to-end /chat latency including streaming", ("outcome",))
+TTFT_SECONDS = REGISTRY.histogram(
+    "faq_chat_time_to_first_token_seconds", "Time from request start to the first answer frame", ("outcome",))
+REQUESTS_TOTAL = REGISTRY.counter(
+    "faq_chat_requests_total",
+    "/chat requests by outcome (llm, response_cache, direct_answer, below_threshold, error, timeout, abandoned, rejected)", ("outcome",))
+RETRIEVAL_PATH_TOTAL = REGISTRY.counter(
+    "faq_chat_retrieval_path_total", "/chat requests by retrieval path (lexical, vector, fused)", ("path",))
+STREAM_TOKENS_TOTAL = REGISTRY.counter(
+    "faq_chat_stream_tokens_total", "Answer tokens (stream chunks) sent to clients")
+STREAM_TOKENS = REGISTRY.histogram(
+    "faq_chat_stream_tokens", "Answer tokens (stream chunks) per streamed response", buckets=TOKEN_BUCKETS)
+STREAM_FRAMES_TOTAL = REGISTRY.counter(
+    "faq_chat_stream_frames_total", "SSE processing frames sent for streamed answers")
+STREAM_FRAMES = REGISTRY.histogram(
+    "faq_chat_stream_frames", "SSE processing frames per streamed response", buckets=TOKEN_BUCKETS)
+STREAM_SECONDS = REGISTRY.histogram(
+    "faq_chat_stream_seconds", "LLM stream duration from first to last token")
+ABANDONED_STREAMS_TOTAL = REGISTRY.counter(
+    "faq_chat_abandoned_streams_total", "LLM streams closed early because the client disconnected", ("stage",))
+TOKENS_SAVED_TOTAL = REGISTRY.counter(
+    "faq_chat_tokens_saved_total", "Estimated completion tokens not generated thanks to closing abandoned streams")
+INDEX_RELOADS_TOTAL = REGISTRY.counter(
+    "faq_index_reloads_total", "Serving snapshot hot swaps by result (swapped, failed)", ("result",))
+ADMISSION_WAIT_SECONDS = REGISTRY.histogram(
+    "faq_admission_wait_seconds", "Time spent in the admission queue before an upstream call", ("upstream",))
+ADMISSION_REJECTED_TOTAL = REGISTRY.counter(
+    "faq_admission_rejected_total",
+    "Requests shed by admission control (upstream: embedding, llm, client; reason: queue_full, wait_timeout, rate_limited)",
+    ("upstream", "reason"))
+PROMPT_TOKENS = REGISTRY.histogram(
+    "faq_chat_prompt_tokens", "Estimated prompt tokens per LLM request (after dedup and budget trimming)",
+    buckets=PROMPT_TOKEN_BUCKETS)
+LLM_TOKENS_TOTAL = REGISTRY.counter(
+    "faq_llm_tokens_total", "Tokens reported by the LLM API usage field (prompt, cached_prompt, completion)", ("kind",))
+
+
+def record_usage(usage):
+    """
+    OpenAI 응답의 usage 를 누적 (cached_prompt: 프롬프트 prefix 캐시로 처리된 입력 토큰 - 동일한 앞부분이 1024 토큰 이상일 때만 발생)
+    """
+    if usage is None:
+        return
+    LLM_TOKENS_TOTAL.inc(usage.prompt_tokens or 0, kind="prompt")
+    LLM_TOKENS_TOTAL.inc(usage.completion_tokens or 0, kind="completion")
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached = getattr(details, 'cached_tokens', None) if details is not None else None
+    LLM_TOKENS_TOTAL.inc(cached or 0, kind="cached_prompt")
+
+
+def process_memory() -> dict:
+    """
+    현재 프로세스의 메모리 사용량(바이트) - Linux /proc 기준 (다른 OS 에서는 빈 dict)
+    - rss: 상주 메모리 전체, rss_anon: 프로세스 전용(힙 등), rss_file: 파일 매핑(임베딩 저장소 등, 워커 간 공유)
+    - pss: 공유 페이지를 공유하는 프로세스 수로 나눈 값 (워커들의 pss 합 ≈ 실제 전체 사용량)
+    """
+    memory = {}
+    fields = {'VmRSS': 'rss', 'RssAnon': 'rss_anon', 'RssFile': 'rss_file', 'RssShmem': 'rss_shmem'}
+    try:
+        with open("/proc/self/status", encoding='utf-8') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in fields:
+                    memory[fields[key]] = int(value.split()[0]) * 1024
+        with open("/proc/self/smaps_rollup", encoding='utf-8') as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    memory['pss'] = int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return memory
+
+
+class RequestTimer:
+    """
+    요청 하나의 단계별 소요 시간 기록.
+    with timer.stage("embedding"): ... 로 측정하면 단계별 히스토그램에 기록되고, 요청 종료 시(finish)
+    전체 지연 시간이 slow_request_ms 를 넘으면 단계별 내역을 로그로 남깁니다.
+    """
+
+    def __init__(self, route: str = "/chat", slow_request_ms: float = 0, on_finish=None, deadline_seconds: float = 0):
+        self.route = route
+        self.slow_request_ms = slow_request_ms
+        self.on_finish = on_finish
+        self.start = time.perf_counter()
+        # 요청 전체 마감 시각 (deadline_seconds <= 0 이면 제한 없음)
+        self.deadline = self.start + deadline_seconds if deadline_seconds > 0 else None
+        self.stages = {}
+        self.first_token_seconds = None
+        self.finished = False
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def timeout(self, stage_timeout: float = None):
+        """
+        단계 제한 시간과 요청 마감까지 남은 시간 중 작은 값 (asyncio.wait_for 의 timeout 으로 사용, None 이면 제한 없음)
+        마감이 이미 지났으면 asyncio.TimeoutError 를 발생시킵니다.
+        """
+        limits = [t for t in (stage_timeout if stage_timeout and stage_timeout > 0 else None,
+                              self.deadline - time.perf_counter() if self.deadline is not None else None)
+                  if t is not None]
+        if not limits:
+            return None
+        if min(limits) <= 0:
+            raise asyncio.TimeoutError()
+        return min(limits)
+
+    def record(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+        STAGE_SECONDS.observe(seconds, stage=name)
+
+    def first_token(self):
+        if self.first_token_seconds is None:
+            self.first_token_seconds = time.perf_counter() - self.start
+
+    def finish(self, outcome: str):
+        """
+        요청당 한 번만 기록 (스트리밍 응답은 스트림이 끝날 때 호출)
+        """
+        if self.finished:
+            return
+        self.finished = True
+        total = time.perf_counter() - self.start
+        REQUESTS_TOTAL.inc(outcome=outcome)
+        REQUEST_SECONDS.observe(total, outcome=outcome)
+        if self.first_token_seconds is not None:
+            TTFT_SECONDS.observe(self.first_token_seconds, outcome=outcome)
+        if self.on_finish is not None:
+            self.on_finish(outcome)
+
+        if self.slow_request_ms > 0 and total * 1000 >= self.slow_request_ms:
+            breakdown = {name: round(seconds * 1000, 1) for name, seconds in self.stages.items()}
+            ttft = round(self.first_token_seconds * 1000, 1) if self.first_token_seconds is not None else None
+            logging.warning(f"느린 요청 {self.route} outcome={outcome} total_ms={total * 1000:.1f} ttft_ms={ttft} "
+                            f"stages_ms={json.dumps(breakdown)}")
+
+
+class BootTimer:
+    """
+    서버 기동 단계별 시각 기록 (기동 시작 시점 기준 초). 단계마다 처음 한 번만 기록합니다.
+    예: imports → startup(요청 수신 시작) → ready(색인 준비 완료) → first_answer(첫 응답 완료)
+    """
+
+    def __init__(self, started: float = None):
+        self.started = started if started is not None else time.perf_counter()
+        self.phases = {}
+
+    def mark(self, phase: str):
+        if phase not in self.phases:
+            self.phases[phase] = time.perf_counter() - self.started
+            logging.info(f"기동 단계 '{phase}': {self.phases[phase]:.3f}s")
+
+    def stats(self) -> dict:
+        return {f"{phase}_seconds": round(seconds, 3) for phase, seconds in self.phases.items()}
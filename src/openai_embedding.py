@@ -1,6 +1,20 @@
+import hashlib
+import json
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import openai
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import AsyncOpenAI, OpenAI
+
+try:
+    import tiktoken
+    _tokenizer = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _tokenizer = None
 
 load_dotenv()
 
@@ -14,23 +28,184 @@ def load_openai_api_key() -> OpenAI:
 
     return client
 
-def get_embeddings(client: OpenAI, texts: list, model: str = "text-embedding-3-small") -> list:
+def load_async_openai_client() -> AsyncOpenAI:
+    """
+    서버(이벤트 루프)에서 사용할 비동기 OpenAI 클라이언트를 생성합니다.
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise ValueError("OPENAI_API_KEY 환경 변수가 설정되지 않았습니다.")
+    client = AsyncOpenAI(
+        api_key=api_key
+    )
+
+    return client
+
+def estimate_tokens(text: str) -> int:
+    """
+    입력 텍스트의 토큰 수. tiktoken 이 설치되어 있으면 정확히 계산하고,
+    없으면 UTF-8 바이트 수 기준으로 보수적으로 추정합니다 (한글 1자 ≈ 3바이트 ≈ 1토큰).
+    """
+    if _tokenizer is not None:
+        return len(_tokenizer.encode(text))
+    return max(1, len(text.encode('utf-8')) // 3)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    text 를 max_tokens 토큰 이내로 자릅니다 (estimate_tokens 와 같은 기준).
+    """
+    if max_tokens <= 0:
+        return ""
+    if _tokenizer is not None:
+        tokens = _tokenizer.encode(text)
+        return text if len(tokens) <= max_tokens else _tokenizer.decode(tokens[:max_tokens])
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # UTF-8 바이트 기준 추정과 같도록 앞에서부터 바이트 수를 누적하여 자름
+    limit, size = max_tokens * 3, 0
+    for i, char in enumerate(text):
+        size += len(char.encode('utf-8'))
+        if size > limit:
+            return text[:i]
+    return text
+
+def make_token_batches(texts: list, max_batch_tokens: int = 8000, max_batch_size: int = 256) -> list:
+    """
+    토큰 수와 항목 수 한도를 넘지 않도록 texts 를 연속 구간 (start, end) 목록으로 나눕니다.
+    """
+    batches = []
+    start, batch_tokens = 0, 0
+    for i, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if i > start and (batch_tokens + tokens > max_batch_tokens or i - start >= max_batch_size):
+            batches.append((start, i))
+            start, batch_tokens = i, 0
+        batch_tokens += tokens
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+def _batch_key(batch: list, model: str, dimensions: int = None) -> str:
+    digest = hashlib.sha1(model.encode('utf-8') + (f":{dimensions}".encode('utf-8') if dimensions else b""))
+    for text in batch:
+        digest.update(b"\0" + text.encode('utf-8'))
+    return digest.hexdigest()
+
+def _load_checkpoint(checkpoint_path: str) -> dict:
+    """
+    완료된 배치 기록을 읽습니다. {배치 키: 임베딩 리스트}
+    """
+    completed = {}
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        with open(checkpoint_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 기록 도중 중단되어 잘린 마지막 줄은 무시
+                    continue
+                completed[record['key']] = record['embeddings']
+    return completed
+
+def _embedding_options(dimensions: int = None) -> dict:
+    """
+    dimensions: text-embedding-3 계열의 출력 차원 축소 (앞쪽 차원만 남기고 다시 정규화한 벡터, None/0 이면 모델 기본 차원)
+    """
+    return {'dimensions': dimensions} if dimensions else {}
+
+def _create_with_retry(client: OpenAI, batch: list, model: str, max_retries: int, dimensions: int = None) -> list:
+    """
+    429(rate limit)/일시적 오류는 지수 백오프(+지터)로 재시도합니다. Retry-After 헤더가 있으면 그 값을 우선합니다.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            response = client.embeddings.create(input=batch, model=model, **_embedding_options(dimensions))
+            return [item.embedding for item in response.data]
+        except (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError, openai.InternalServerError) as e:
+            if attempt == max_retries:
+                raise
+            delay = min(60.0, 2 ** attempt) * (0.5 + random.random())
+            retry_after = getattr(getattr(e, 'response', None), 'headers', {}).get('retry-after')
+            if retry_after:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            print(f"Embedding 요청 재시도 {attempt + 1}/{max_retries} ({type(e).__name__}), {delay:.1f}초 후")
+            time.sleep(delay)
+
+def get_embeddings(client: OpenAI, texts: list, model: str = "text-embedding-3-small",
+                   max_batch_tokens: int = 8000, max_batch_size: int = 256, max_concurrency: int = 4,
+                   max_retries: int = 6, checkpoint_path: str = None, dimensions: int = None) -> list:
+    """
+    대량 임베딩 생성
+    - 토큰 수 기준으로 배치를 나누고 최대 max_concurrency 개의 요청을 동시에 보냄
+    - 429/일시적 오류는 백오프 후 재시도
+    - 결과는 입력 순서를 유지
+    - checkpoint_path 를 지정하면 완료된 배치를 기록하여, 중단 후 다시 실행하면 남은 배치만 처리
+    - dimensions 를 지정하면 해당 차원으로 축소된 임베딩을 요청
+    """
     try:
+        batches = make_token_batches(texts, max_batch_tokens, max_batch_size)
+        keys = [_batch_key(texts[start:end], model, dimensions) for start, end in batches]
+        completed = _load_checkpoint(checkpoint_path)
+        results = [completed.get(key) for key in keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if len(pending) < len(batches):
+            print(f"체크포인트에서 {len(batches) - len(pending)}/{len(batches)}개 배치 복원")
+
+        lock = threading.Lock()
+        checkpoint = open(checkpoint_path, 'a', encoding='utf-8') if checkpoint_path else None
+        total_items = sum(batches[i][1] - batches[i][0] for i in pending)
+        done_items = 0
+        started = time.perf_counter()
+
+        def run(batch_index: int):
+            nonlocal done_items
+            start, end = batches[batch_index]
+            batch_embeddings = _create_with_retry(client, texts[start:end], model, max_retries, dimensions)
+            with lock:
+                results[batch_index] = batch_embeddings
+                if checkpoint is not None:
+                    checkpoint.write(json.dumps({'key': keys[batch_index], 'embeddings': batch_embeddings}) + "\n")
+                    checkpoint.flush()
+                done_items += end - start
+                elapsed = time.perf_counter() - started
+                print(f"Batch {batch_index + 1}/{len(batches)}: {end - start} items 완료 "
+                      f"({done_items}/{total_items}, "
+                      f"{done_items / elapsed if elapsed > 0 else 0:.1f} items/s)")
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+                futures = [executor.submit(run, i) for i in pending]
+                try:
+                    for future in as_completed(futures):
+                        future.result()
+                except Exception:
+                    # 아직 시작하지 않은 배치는 취소 (이미 완료된 배치는 체크포인트에 남아 재실행 시 복원됨)
+                    for future in futures:
+                        future.cancel()
+                    raise
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+
         embeddings = []
-        batch_size = 50  # 배치 크기
-
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]  # 50개 단위로 분할
-            print(f"Batch {i // batch_size + 1}: Processing {len(batch)} items")
-            response = (
-                client.embeddings.create(input=batch, model=model))
-            batch_embeddings = [item.embedding for item in response.data]
-            embeddings.extend(batch_embeddings)  # 결과를 누적
+        for batch_embeddings in results:
+            embeddings.extend(batch_embeddings)  # 입력 순서대로 결과를 누적
         return embeddings
     except Exception as e:
         print(f"Embedding 생성 실패: {e}")
         raise
 
+async def get_embeddings_async(client: AsyncOpenAI, texts: list, model: str = "text-embedding-3-small",
+                               dimensions: int = None) -> list:
+    """
+    get_embeddings 의 비동기 버전. 이벤트 루프를 막지 않고 한 번의 요청으로 임베딩을 생성합니다.
+    """
+    response = await client.embeddings.create(input=texts, model=model, **_embedding_options(dimensions))
+    return [item.embedding for item in response.data]
+
 def test_openapi_embedding(client: OpenAI):
     test_sentences = [
         "안녕하세요, 스마트스토어에 오신 것을 환영합니다.",
@@ -0,0 +1,115 @@
+from src.config import PROMPT_MAX_CONTEXT_TOKENS, PROMPT_DEDUP_SIMILARITY
+from src.openai_embedding import estimate_tokens, truncate_to_tokens
+
+# 모든 요청에서 바이트 단위로 동일한 고정 지시문
+# 요청마다 달라지는 FAQ 컨텍스트/사용자 질문은 모두 이 뒤(user 메시지)에 배치합니다.
+# OpenAI 프롬프트 prefix 캐시는 동일한 앞부분이 1024 토큰 이상일 때만 적용되므로 현재 길이(STATIC_PROMPT_TOKENS)에서는 적중하지 않습니다.
+SYSTEM_PROMPT = (
+    "You are a friendly and helpful Korean chatbot named 'SmartStore Bot'. "
+    "When answering the user's question, please speak in a warm and polite tone, "
+    "providing sufficient detail and clarity. Refer to the given FAQ context if it is relevant. "
+    "If the user asks for a step-by-step procedure, list each step clearly and use friendly language. "
+    "If the FAQ doesn't have an answer, politely apologize and suggest alternative actions. "
+    "Please provide the answer in Korean. Keep the response concise but not too short—"
+    "around 200~300 characters or a few paragraphs is okay. "
+    "If you cannot find relevant info in the FAQ, politely apologize and only say '지금 말씀하신 질문은 FaQ 에 포함되어 있지 않습니다.'."
+    "Use line breaks to improve readability, but avoid using Markdown like Bold.\n\n"
+    "예시 포맷:\n"
+    "1) 첫 번째 작업을 설명합니다.\n"
+    "2) 두 번째 작업을 설명합니다.\n"
+    "3) 세 번째 작업을 설명합니다.\n\n"
+    "End the answer with a short polite closing statement such as '도움이 되셨길 바랍니다. 더 궁금한 점 있으시면 언제든 알려주세요!'.\n\n"
+    "사용자 메시지에는 'FAQ 답변 정보', '연관 질문 후보', '사용자 질문' 이 차례로 주어집니다.\n"
+    "아래 형식을 참고하여 답변을 작성하세요:\n"
+    "-----\n"
+    "답변:\n"
+    "(FAQ들을 참조해서 사용자 질문에 대한 답변을 작성)\n\n"
+    "추천 질문:\n"
+    "(연관 질문 후보 중 2~3개를 자연스럽게 나열)\n"
+    "-----"
+)
+
+# 잘린 답변 뒤에 붙이는 표시, 잘라서라도 넣을 최소 토큰 수 (이보다 적게 남으면 해당 답변은 제외)
+TRUNCATION_MARK = " …"
+MIN_TRUNCATED_TOKENS = 64
+STATIC_PROMPT_TOKENS = estimate_tokens(SYSTEM_PROMPT)
+
+
+def _bigrams(text: str) -> set:
+    text = " ".join(text.split())
+    return {text[i:i + 2] for i in range(len(text) - 1)} or {text}
+
+
+def _is_duplicate(answer: str, kept: list, max_similarity: float) -> bool:
+    """
+    이미 선택한 답변과 같거나, 포함되거나, 문자 2-gram 자카드 유사도가 max_similarity 이상이면 중복
+    """
+    normalized = " ".join(answer.split())
+    grams = _bigrams(normalized)
+    for other in kept:
+        other_normalized = " ".join(other.split())
+        if normalized in other_normalized:
+            return True
+        other_grams = _bigrams(other_normalized)
+        if len(grams & other_grams) / len(grams | other_grams) >= max_similarity:
+            return True
+    return False
+
+
+def select_answers(faq_answers: list, max_tokens: int = PROMPT_MAX_CONTEXT_TOKENS,
+                   max_similarity: float = PROMPT_DEDUP_SIMILARITY) -> tuple:
+    """
+    검색 순위대로 FAQ 답변을 고르면서 중복을 제거하고 토큰 예산 안으로 자릅니다.
+    반환: (선택된 답변 목록, {'deduped': 제거된 중복 수, 'truncated': 잘린 답변 수, 'dropped': 예산 초과로 제외된 수})
+    """
+    kept = []
+    info = {'deduped': 0, 'truncated': 0, 'dropped': 0}
+    remaining = max_tokens
+    for answer in faq_answers:
+        if _is_duplicate(answer, kept, max_similarity):
+            info['deduped'] += 1
+            continue
+        tokens = estimate_tokens(answer)
+        if tokens <= remaining:
+            kept.append(answer)
+            remaining -= tokens
+        elif remaining >= MIN_TRUNCATED_TOKENS:
+            kept.append(truncate_to_tokens(answer, remaining) + TRUNCATION_MARK)
+            info['truncated'] += 1
+            remaining = 0
+        else:
+            info['dropped'] += 1
+    return kept, info
+
+
+def build_messages(user_query: str, faq_answers: list, related_questions: list,
+                   max_context_tokens: int = PROMPT_MAX_CONTEXT_TOKENS,
+                   max_similarity: float = PROMPT_DEDUP_SIMILARITY) -> tuple:
+    """
+    LLM 요청 메시지를 구성합니다.
+    - developer 메시지: 고정 지시문 (요청 간 동일)
+    - user 메시지: FAQ 답변 정보 → 연관 질문 후보 → 사용자 질문 순 (가변 부분은 모두 뒤쪽)
+    반환: (messages, 프롬프트 정보 dict - prompt_tokens 등)
+    """
+    answers, info = select_answers(faq_answers, max_context_tokens, max_similarity)
+    questions = list(dict.fromkeys(q for q in related_questions if q))
+
+    faq_context = "".join(f"FAQ {i + 1} Answer:\n{answer}\n\n" for i, answer in enumerate(answers))
+    recommended_context = "".join(f"- {q}\n" for q in questions)
+    user_content = (
+        f"FAQ 답변 정보:\n{faq_context}\n"
+        f"연관 질문 후보:\n{recommended_context}\n"
+        f"사용자 질문: {user_query}\n\n"
+        "답변:"
+    )
+    messages = [
+        {"role": "developer", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_content},
+    ]
+
+    info.update(
+        answers=len(answers),
+        static_tokens=STATIC_PROMPT_TOKENS,
+        prompt_tokens=STATIC_PROMPT_TOKENS + estimate_tokens(user_content),
+    )
+    return messages, info
@@ -0,0 +1,304 @@
+import json
+import os
+import time
+from functools import partial
+
+import numpy as np
+
+from src.config import RETRIEVAL_BACKEND, PQ_SUBVECTORS, MATRYOSHKA_DIMENSIONS
+from src.embedding_store import load_embedding_store
+
+# 양자화 색인 형식 (서빙 스냅샷 디렉터리 안에 저장, np.load(mmap_mode='r') 로 매핑하여 워커 간 공유)
+# - quantized.json            : 종류별 헤더 (개수, 차원, 서브벡터 수 등)
+# - int8_codes.npy / int8_scale.npy : 차원별 대칭 스칼라 양자화 코드 (count, dim) int8 / 차원별 배율 (dim,) float32
+# - pq_codes.npy / pq_codebooks.npy : 곱 양자화(PQ) 코드 (subvectors, count) uint8 - 서브벡터별 연속 배치 / 코드북 (subvectors, 256, sub_dim)
+# - matryoshka.npy            : 앞쪽 dim 차원만 잘라 다시 정규화한 벡터 (count, dim) float32 (text-embedding-3 계열의 Matryoshka 표현)
+# 근사 점수로 후보를 고른 뒤 원본 float32 벡터(vectors.bin)로 다시 계산하므로 최종 거리는 정확 검색과 같습니다.
+QUANTIZED_HEADER_FILE = "quantized.json"
+QUANTIZED_KINDS = ("int8", "pq", "matryoshka")
+PQ_CENTROIDS = 256
+# 근사 점수 계산 시 한 번에 float32 로 변환하는 행 수 (변환한 블록이 CPU 캐시에 남아 있는 크기여야 float32 검색보다 느려지지 않음)
+_BLOCK_ROWS = 256
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class Int8Index:
+    """
+    차원별 대칭 스칼라 양자화: code = round(x / scale), scale = max|x| / 127 (벡터당 dim 바이트, float32 의 1/4)
+    """
+
+    kind = "int8"
+
+    def __init__(self, codes: np.ndarray, scale: np.ndarray):
+        self.codes = codes
+        self.scale = scale
+
+    @classmethod
+    def train(cls, vectors) -> "Int8Index":
+        matrix = normalize_rows(vectors)
+        scale = np.abs(matrix).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        codes = np.clip(np.rint(matrix / scale), -127, 127).astype(np.int8)
+        return cls(codes, scale.astype(np.float32))
+
+    def __len__(self) -> int:
+        return self.codes.shape[0]
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        """
+        정규화된 질의 (질의 수, dim) 에 대한 근사 코사인 유사도 (질의 수, 문서 수)
+        """
+        weighted = (queries * self.scale).astype(np.float32)
+        scores = np.empty((queries.shape[0], len(self)), dtype=np.float32)
+        for start in range(0, len(self), _BLOCK_ROWS):
+            block = self.codes[start:start + _BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = weighted @ block.T
+        return scores
+
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scale.nbytes
+
+    def save(self, index_dir: str) -> dict:
+        np.save(os.path.join(index_dir, "int8_codes.npy"), np.ascontiguousarray(self.codes))
+        np.save(os.path.join(index_dir, "int8_scale.npy"), self.scale)
+        return {'count': len(self), 'dim': int(self.codes.shape[1])}
+
+    @classmethod
+    def load(cls, index_dir: str, header: dict) -> "Int8Index":
+        return cls(np.load(os.path.join(index_dir, "int8_codes.npy"), mmap_mode='r'),
+                   np.load(os.path.join(index_dir, "int8_scale.npy")))
+
+
+class PQIndex:
+    """
+    곱 양자화(PQ): 벡터를 subvectors 개의 구간으로 나누고 구간마다 256개 중심점(k-means) 번호 1바이트로 저장.
+    질의 시 구간별 (질의 · 중심점) 표를 만든 뒤 코드로 표를 조회해 더하는 방식(ADC)으로 근사 내적을 계산합니다.
+    """
+
+    kind = "pq"
+
+    def __init__(self, codes: np.ndarray, codebooks: np.ndarray):
+        self.codes = codes  # (subvectors, count) uint8
+        self.codebooks = codebooks  # (subvectors, centroids, sub_dim) float32
+
+    @classmethod
+    def train(cls, vectors, subvectors: int = 96, iterations: int = 20, sample_size: int = 20000,
+              seed: int = 0) -> "PQIndex":
+        matrix = normalize_rows(vectors)
+        count, dim = matrix.shape
+        if dim % subvectors != 0:
+            raise ValueError(f"차원({dim})이 서브벡터 수({subvectors})로 나누어떨어지지 않습니다.")
+        sub_dim = dim // subvectors
+        rng = np.random.default_rng(seed)
+        sample = matrix[rng.choice(count, size=min(sample_size, count), replace=False)]
+        centroids = min(PQ_CENTROIDS, len(sample))
+
+        codebooks = np.empty((subvectors, centroids, sub_dim), dtype=np.float32)
+        codes = np.empty((subvectors, count), dtype=np.uint8)
+        for j in range(subvectors):
+            columns = slice(j * sub_dim, (j + 1) * sub_dim)
+            codebooks[j] = _kmeans(sample[:, columns], centroids, iterations, rng)
+            codes[j] = _assign(matrix[:, columns], codebooks[j])
+        return cls(codes, codebooks)
+
+    def __len__(self) -> int:
+        return self.codes.shape[1]
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        subvectors, _, sub_dim = self.codebooks.shape
+        scores = np.zeros((queries.shape[0], len(self)), dtype=np.float32)
+        for i, query in enumerate(queries):
+            # 구간별 (질의 구간 · 중심점) 표: (subvectors, centroids)
+            tables = np.einsum('jcd,jd->jc', self.codebooks, query.reshape(subvectors, sub_dim))
+            for j in range(subvectors):
+                scores[i] += tables[j].take(self.codes[j])
+        return scores
+
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.codebooks.nbytes
+
+    def save(self, index_dir: str) -> dict:
+        np.save(os.path.join(index_dir, "pq_codes.npy"), np.ascontiguousarray(self.codes))
+        np.save(os.path.join(index_dir, "pq_codebooks.npy"), self.codebooks)
+        subvectors, centroids, sub_dim = self.codebooks.shape
+        return {'count': len(self), 'dim': subvectors * sub_dim, 'subvectors': subvectors, 'centroids': centroids}
+
+    @classmethod
+    def load(cls, index_dir: str, header: dict) -> "PQIndex":
+        return cls(np.load(os.path.join(index_dir, "pq_codes.npy"), mmap_mode='r'),
+                   np.load(os.path.join(index_dir, "pq_codebooks.npy")))
+
+
+class MatryoshkaIndex:
+    """
+    축소 차원 색인: 임베딩의 앞쪽 dimensions 차원만 잘라 다시 정규화 (API 의 dimensions 파라미터와 같은 방식).
+    text-embedding-3 계열은 앞쪽 차원에 정보가 몰리도록 학습되어 있어 256 차원으로도 후보 선택에 충분합니다.
+    """
+
+    kind = "matryoshka"
+
+    def __init__(self, vectors: np.ndarray):
+        self.vectors = vectors
+
+    @classmethod
+    def train(cls, vectors, dimensions: int = 256) -> "MatryoshkaIndex":
+        truncated = np.empty((len(vectors), min(dimensions, vectors.shape[1])), dtype=np.float32)
+        for start in range(0, len(vectors), 65536):
+            truncated[start:start + 65536] = normalize_rows(vectors[start:start + 65536, :truncated.shape[1]])
+        return cls(truncated)
+
+    @property
+    def dimensions(self) -> int:
+        return self.vectors.shape[1]
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    def scores(self, queries: np.ndarray) -> np.ndarray:
+        return normalize_rows(queries[:, :self.dimensions]) @ self.vectors.T
+
+    def nbytes(self) -> int:
+        return self.vectors.nbytes
+
+    def save(self, index_dir: str) -> dict:
+        np.save(os.path.join(index_dir, "matryoshka.npy"), np.ascontiguousarray(self.vectors))
+        return {'count': len(self), 'dim': self.dimensions}
+
+    @classmethod
+    def load(cls, index_dir: str, header: dict) -> "MatryoshkaIndex":
+        return cls(np.load(os.path.join(index_dir, "matryoshka.npy"), mmap_mode='r'))
+
+
+_INDEX_CLASSES = {index_class.kind: index_class for index_class in (Int8Index, PQIndex, MatryoshkaIndex)}
+
+
+def _assign(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    각 점에서 가장 가까운 중심점 번호 (제곱 L2 거리, 메모리 사용을 줄이기 위해 블록 단위)
+    """
+    labels = np.empty(len(points), dtype=np.uint8)
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    for start in range(0, len(points), 65536):
+        block = points[start:start + 65536]
+        distances = centroid_norms[np.newaxis, :] - 2.0 * (block @ centroids.T)
+        labels[start:start + len(block)] = distances.argmin(axis=1)
+    return labels
+
+
+def _kmeans(points: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    centroids = points[rng.choice(len(points), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = _assign(points, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = np.stack([np.bincount(labels, weights=points[:, d], minlength=k) for d in range(points.shape[1])], axis=1)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, np.newaxis]
+        # 빈 군집은 임의의 점으로 다시 시작
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = points[rng.choice(len(points), size=len(empty), replace=False)]
+    return centroids
+
+
+def rescored_search(index, vectors, queries: np.ndarray, n_results: int, candidates: int = 50,
+                    normalized: bool = True) -> tuple:
+    """
+    양자화 색인으로 질의별 상위 candidates 개 후보를 고른 뒤, 후보만 원본 float32 벡터(vectors, 메모리 매핑 가능)로
+    정확한 코사인 유사도를 다시 계산하여 상위 n_results 개를 반환합니다.
+    queries 는 정규화된 (질의 수, dim) 배열, 반환: (행 번호 (질의 수, k), 코사인 유사도 (질의 수, k))
+    """
+    approximate = index.scores(queries)
+    count = approximate.shape[1]
+    c = min(max(candidates, n_results), count)
+    if c < count:
+        top = np.argpartition(-approximate, c - 1, axis=1)[:, :c]
+    else:
+        top = np.tile(np.arange(count), (len(queries), 1))
+
+    # 행 번호 순으로 읽어 디스크 접근을 순차적으로
+    top = np.sort(top, axis=1)
+    rows = np.asarray(vectors[top.ravel()], dtype=np.float32)
+    if not normalized:
+        rows = normalize_rows(rows)
+    scores = np.einsum('qcd,qd->qc', rows.reshape(len(queries), c, -1), queries)
+
+    order = np.argsort(-scores, axis=1)[:, :min(n_results, c)]
+    return np.take_along_axis(top, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def train_quantized_index(vectors, kind: str, pq_subvectors: int = 96, matryoshka_dimensions: int = 256):
+    if kind == "int8":
+        return Int8Index.train(vectors)
+    if kind == "pq":
+        return PQIndex.train(vectors, subvectors=pq_subvectors)
+    if kind == "matryoshka":
+        return MatryoshkaIndex.train(vectors, dimensions=matryoshka_dimensions)
+    raise ValueError(f"지원하지 않는 양자화 방식입니다: {kind}")
+
+
+def build_quantized_index(store_dir: str, kinds: tuple = QUANTIZED_KINDS, pq_subvectors: int = 96,
+                          matryoshka_dimensions: int = 256) -> dict:
+    """
+    서빙 스냅샷 디렉터리의 float32 벡터로 양자화 색인을 만들어 같은 디렉터리에 기록합니다.
+    (publish_store 의 prepare 로 넘기면 CURRENT 교체 전에 새 스냅샷에 함께 기록됩니다)
+    """
+    store = load_embedding_store(store_dir)
+    header_path = os.path.join(store.store_dir, QUANTIZED_HEADER_FILE)
+    header = read_quantized_header(store.store_dir)
+    for kind in kinds:
+        start = time.perf_counter()
+        index = train_quantized_index(store.vectors, kind, pq_subvectors, matryoshka_dimensions)
+        header[kind] = {**index.save(store.store_dir), 'source_version': store.version}
+        print(f"양자화 색인 기록 완료: {kind} ({len(index)} rows, {index.nbytes() / len(index):.1f} bytes/vector, "
+              f"{time.perf_counter() - start:.1f}s)")
+    with open(header_path + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump(header, f, ensure_ascii=False)
+    os.replace(header_path + ".tmp", header_path)
+    return header
+
+
+def quantized_index_builder(backend: str = RETRIEVAL_BACKEND, pq_subvectors: int = PQ_SUBVECTORS,
+                            matryoshka_dimensions: int = MATRYOSHKA_DIMENSIONS):
+    """
+    양자화 검색 백엔드(int8 / pq)를 사용하면 새 스냅샷을 공개하기 전에 양자화 색인도 함께 기록하도록
+    publish_store 의 prepare 로 넘길 함수를 반환 (워커마다 색인을 생성하지 않도록, 그 외 백엔드는 None)
+    """
+    if backend not in QUANTIZED_KINDS:
+        return None
+    return partial(build_quantized_index, kinds=(backend,), pq_subvectors=pq_subvectors,
+                   matryoshka_dimensions=matryoshka_dimensions)
+
+
+def read_quantized_header(store_dir: str) -> dict:
+    try:
+        with open(os.path.join(store_dir, QUANTIZED_HEADER_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def load_quantized_index(store_dir: str, kind: str, source_version: str = None, dim: int = None):
+    """
+    기록된 양자화 색인을 매핑하여 엽니다. 없거나 다른 스냅샷 버전 / 다른 차원(dim 지정 시)으로 만든 색인이면 None
+    """
+    header = read_quantized_header(store_dir).get(kind)
+    if header is None or (source_version is not None and header.get('source_version') != source_version):
+        return None
+    if dim is not None and header.get('dim') != dim:
+        return None
+    return _INDEX_CLASSES[kind].load(store_dir, header)
+
+
+if __name__ == "__main__":
+    import sys
+
+    embedding_store_dir = "data/embedding_store"
+    kinds = tuple(sys.argv[1:]) or QUANTIZED_KINDS
+
+    build_quantized_index(embedding_store_dir, kinds, pq_subvectors=PQ_SUBVECTORS, matryoshka_dimensions=MATRYOSHKA_DIMENSIONS)
@@ -0,0 +1,134 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.config import (
+    EMBEDDING_MODEL, EMBEDDING_MAX_BATCH_TOKENS, EMBEDDING_MAX_BATCH_SIZE, EMBEDDING_MAX_CONCURRENCY, EMBEDDING_MAX_RETRIES,
+    EMBEDDING_DIMENSIONS
+)
+from src.data_loader import assign_faq_ids
+from src.embedding_store import load_embedding_store, publish_store, store_exists
+from src.openai_embedding import get_embeddings, load_openai_api_key
+from src.quantization import quantized_index_builder
+from src.vector_db import (
+    initialize_chroma, create_collection, insert_embeddings, delete_embeddings, get_indexed_hashes, write_index_version
+)
+
+
+def reuse_embeddings(df: pd.DataFrame, store_dir: str, model: str) -> tuple:
+    """
+    기존 임베딩 저장소에서 재사용 가능한 벡터를 찾습니다.
+    임베딩은 question_clean 으로만 만들어지므로, 같은 id 이고 question_clean 이 같으면 답변이 바뀌었더라도 벡터를 재사용합니다.
+    반환: (벡터 행렬 - 재사용 불가 행은 0, 새로 임베딩해야 하는 행 번호 목록)
+    """
+    if not store_exists(store_dir):
+        return None, list(range(len(df)))
+
+    store = load_embedding_store(store_dir)
+    if store.model != model:
+        print(f"임베딩 모델 변경 ({store.model} → {model}), 전체 재임베딩")
+        return None, list(range(len(df)))
+    if EMBEDDING_DIMENSIONS and store.dim != EMBEDDING_DIMENSIONS:
+        print(f"임베딩 차원 변경 ({store.dim} → {EMBEDDING_DIMENSIONS}), 전체 재임베딩")
+        return None, list(range(len(df)))
+
+    old_rows = {doc_id: (row, question) for row, (doc_id, question)
+                in enumerate(zip(store.column('id'), store.column('question_clean')))}
+    vectors = np.zeros((len(df), store.dim), dtype=np.float32)
+    missing = []
+    for row, (doc_id, question) in enumerate(zip(df['id'], df['question_clean'])):
+        old = old_rows.get(doc_id)
+        if old is not None and old[1] == question:
+            vectors[row] = store.vectors[old[0]]
+        else:
+            missing.append(row)
+    return vectors, missing
+
+
+def store_is_current(df: pd.DataFrame, store_dir: str, model: str) -> bool:
+    """
+    현재 서빙 스냅샷이 df 와 같은 FAQ(같은 순서의 id / content_hash)와 같은 임베딩 모델/차원이면 True
+    """
+    if not store_exists(store_dir):
+        return False
+    store = load_embedding_store(store_dir)
+    if store.model != model or (EMBEDDING_DIMENSIONS and store.dim != EMBEDDING_DIMENSIONS):
+        return False
+    if 'content_hash' not in store.table.column_names:
+        return False
+    return store.column('id') == df['id'].to_list() and store.column('content_hash') == df['content_hash'].to_list()
+
+
+def reindex(df: pd.DataFrame, store_dir: str = "data/embedding_store", db_path: str = "data/chroma_db",
+            model: str = EMBEDDING_MODEL) -> dict:
+    """
+    증분 재색인
+    1) 기존 저장소와 비교하여 새로 추가되었거나 질문이 바뀐 FAQ 만 임베딩
+    2) 새 임베딩 저장소(서빙 스냅샷) 버전 기록 및 CURRENT 교체
+    3) Chroma 에서 사라진 FAQ 는 delete, 추가/변경된 FAQ 만 upsert
+    바뀐 FAQ 가 없으면 새 스냅샷을 발행하지 않습니다 (워커 교체 / 응답 캐시 무효화가 일어나지 않음).
+    """
+    start = time.perf_counter()
+    if 'id' not in df.columns or 'content_hash' not in df.columns:
+        df = assign_faq_ids(df)
+    df = df.reset_index(drop=True)
+
+    collection = create_collection(initialize_chroma(db_path))
+    indexed = get_indexed_hashes(collection)
+    current = dict(zip(df['id'], df['content_hash']))
+    stale_ids = [doc_id for doc_id in indexed if doc_id not in current]
+    changed_rows = [row for row, doc_id in enumerate(df['id']) if indexed.get(doc_id) != current[doc_id]]
+    store_changed = not store_is_current(df, store_dir, model)
+
+    summary = {
+        'rows': len(df),
+        'embedded': 0,
+        'upserted': len(changed_rows),
+        'deleted': len(stale_ids),
+        'unchanged': len(df) - len(changed_rows),
+        'published': store_changed,
+    }
+    if not store_changed and not stale_ids and not changed_rows:
+        summary['seconds'] = round(time.perf_counter() - start, 2)
+        print(f"변경된 FAQ 없음, 새 스냅샷을 발행하지 않습니다: {summary}")
+        return summary
+
+    vectors, missing = reuse_embeddings(df, store_dir, model)
+    summary['embedded'] = len(missing)
+    if missing:
+        client = load_openai_api_key()
+        print(f"임베딩 대상: {len(missing)}/{len(df)} rows")
+        new_embeddings = np.asarray(get_embeddings(
+            client, df.loc[missing, 'question_clean'].to_list(), model=model,
+            max_batch_tokens=EMBEDDING_MAX_BATCH_TOKENS,
+            max_batch_size=EMBEDDING_MAX_BATCH_SIZE,
+            max_concurrency=EMBEDDING_MAX_CONCURRENCY,
+            max_retries=EMBEDDING_MAX_RETRIES,
+            dimensions=EMBEDDING_DIMENSIONS or None
+        ), dtype=np.float32)
+        if vectors is None:
+            vectors = np.zeros((len(df), new_embeddings.shape[1]), dtype=np.float32)
+        vectors[missing] = new_embeddings
+    # 새 버전 스냅샷을 기록한 뒤 CURRENT 를 교체 → 실행 중인 서버 워커가 재시작 없이 새 색인으로 교체
+    if store_changed:
+        publish_store(store_dir, df, vectors, model, prepare=quantized_index_builder())
+
+    if stale_ids:
+        delete_embeddings(collection, stale_ids)
+    if changed_rows:
+        insert_embeddings(collection, df.loc[changed_rows].reset_index(drop=True), vectors[changed_rows])
+    if stale_ids or changed_rows:
+        write_index_version(db_path)
+
+    summary['seconds'] = round(time.perf_counter() - start, 2)
+    print(f"증분 재색인 완료: {summary}")
+    return summary
+
+
+if __name__ == "__main__":
+    preprocessed_data_path = "data/preprocessed_data.pkl"
+
+    df = pd.read_pickle(preprocessed_data_path)
+
+    reindex(df)
@@ -0,0 +1,102 @@
+import itertools
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+class SemanticResponseCache:
+    """
+    질의 임베딩 기반 응답 캐시.
+    새 질의가 캐시된 질의와 코사인 거리 max_distance 이내이고 검색된 FAQ id 목록이 같으면
+    저장된 답변을 그대로 재사용합니다 (LLM 호출 생략).
+    - max_entries 를 넘으면 가장 오래 사용되지 않은 항목부터 제거 (LRU)
+    - FAQ 컬렉션이 재색인되어 index_version 이 바뀌면 전체 무효화
+    """
+
+    def __init__(self, max_entries: int = 512, max_distance: float = 0.05):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.index_version = None
+        self._entries = OrderedDict()  # entry_id -> (faq_ids, 정규화된 임베딩, 답변)
+        self._by_faq_ids = {}  # faq_ids -> {entry_id, ...}
+        self._next_id = itertools.count()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def lookup(self, query_embedding: list, faq_ids: list, index_version=None):
+        key = tuple(faq_ids)
+        query = _normalize(query_embedding)
+        with self._lock:
+            self._check_version(index_version)
+            best_id, best_distance = None, None
+            for entry_id in self._by_faq_ids.get(key, ()):
+                distance = 1.0 - float(np.dot(self._entries[entry_id][1], query))
+                if distance <= self.max_distance and (best_distance is None or distance < best_distance):
+                    best_id, best_distance = entry_id, distance
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            logging.info(f"응답 캐시 적중 (cosine distance={best_distance:.4f})")
+            return self._entries[best_id][2]
+
+    def store(self, query_embedding: list, faq_ids: list, answer: str, index_version=None):
+        if self.max_entries <= 0 or not answer:
+            return
+        key = tuple(faq_ids)
+        with self._lock:
+            self._check_version(index_version)
+            entry_id = next(self._next_id)
+            self._entries[entry_id] = (key, _normalize(query_embedding), answer)
+            self._by_faq_ids.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                old_id, (old_key, _, _) = self._entries.popitem(last=False)
+                bucket = self._by_faq_ids[old_key]
+                bucket.discard(old_id)
+                if not bucket:
+                    del self._by_faq_ids[old_key]
+
+    def invalidate(self):
+        with self._lock:
+            self._clear()
+
+    def _check_version(self, index_version):
+        # FAQ 재색인 시 기존 답변은 더 이상 유효하지 않으므로 모두 제거
+        if index_version != self.index_version:
+            if self._entries:
+                logging.info(f"FAQ 인덱스 버전 변경 ({self.index_version} → {index_version}), 응답 캐시 무효화")
+            self._clear()
+            self.index_version = index_version
+
+    def _clear(self):
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._by_faq_ids.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'invalidations': self.invalidations,
+            'index_version': self.index_version,
+        }
+
+
+def _normalize(embedding) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
@@ -0,0 +1,242 @@
+import logging
+import os
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from src.config import QUANTIZED_RESCORE_CANDIDATES, PQ_SUBVECTORS, MATRYOSHKA_DIMENSIONS, HNSW_SEARCH_EF
+from src.embedding_store import EmbeddingStore, load_embedding_store
+from src.quantization import (
+    QUANTIZED_KINDS, load_quantized_index, normalize_rows, rescored_search, train_quantized_index
+)
+from src.vector_db import initialize_chroma, read_index_version, collection_space, INDEX_VERSION_FILE
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# 검색 결과 metadatas 에 포함되는 열 (vector_db.insert_embeddings 와 동일)
+METADATA_COLUMNS = ['question_clean', 'answer_clean', 'category', 'subcategory']
+
+# 1위 FAQ 거리가 이 값보다 크면 관련 FAQ 없음 (공통 척도 2 - 2·cos 기준, 코사인 유사도 0.5)
+NO_FAQ_MAX_DISTANCE = 1.0
+
+
+def to_l2_distance(distances, space: str):
+    """
+    Chroma 거리 공간별 거리를 모든 백엔드 공통 척도인 단위 벡터 간 제곱 L2 거리(2 - 2·cos)로 변환합니다.
+    cosine 은 1 - cos, ip 는 1 - 내적(단위 벡터이면 1 - cos) 이므로 두 배 하면 같은 척도가 됩니다.
+    이 척도를 쓰는 임계값(검색 결과 없음, 직접 응답 등)은 거리 공간을 바꿔도 그대로 사용할 수 있습니다.
+    """
+    if space == "l2":
+        return distances
+    return [[max(2.0 * d, 0.0) for d in row] for row in distances]
+
+
+class RetrievalBackend(ABC):
+    """
+    FAQ 검색 백엔드 인터페이스.
+    query 는 Chroma collection.query 와 같은 시그니처/반환 형식을 따르므로 search_faq 에서 그대로 사용할 수 있습니다.
+    반환: {'ids': [[...]], 'documents': [[...]], 'metadatas': [[...]], 'distances': [[...]]} (질의별 리스트)
+    """
+
+    @abstractmethod
+    def query(self, query_embeddings: list, n_results: int = 3, include: list = None) -> dict:
+        ...
+
+    @abstractmethod
+    def index_version(self):
+        """
+        현재 색인 버전. 값이 바뀌면 응답 캐시 등 색인에 의존하는 상태를 무효화합니다.
+        """
+        ...
+
+
+class ChromaBackend(RetrievalBackend):
+    def __init__(self, collection, db_path: str = "data/chroma_db"):
+        self.collection = collection
+        self.db_path = db_path
+        self.space = collection_space(collection)
+        # 요청마다 파일을 읽지 않도록 버전을 기억해 두고, 버전 파일의 수정 시각이 바뀐 경우에만 다시 읽음
+        self._version_path = os.path.join(db_path, INDEX_VERSION_FILE)
+        self._version_mtime = None
+        self.version = None
+
+    def query(self, query_embeddings: list, n_results: int = 3, include: list = None) -> dict:
+        results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=n_results,
+            include=include or ['metadatas', 'documents', 'distances']
+        )
+        if results.get('distances') is not None:
+            results['distances'] = to_l2_distance(results['distances'], self.space)
+        return results
+
+    def index_version(self):
+        """
+        재색인(write_index_version)으로 버전 파일이 바뀌면 스냅샷 감시(INDEX_RELOAD_INTERVAL_SECONDS)와 관계없이
+        다음 요청부터 새 버전을 반환합니다 (요청마다 stat 한 번).
+        """
+        try:
+            mtime = os.stat(self._version_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._version_mtime or self.version is None:
+            self._version_mtime = mtime
+            self.version = read_index_version(self.db_path)
+        return self.version
+
+
+class NumpyBackend(RetrievalBackend):
+    """
+    프로세스 내 정확(exact) 검색.
+    정규화된 float32 행렬과 행렬-벡터 곱 한 번, argpartition 으로 top-k 를 구합니다.
+    거리는 Chroma 기본(l2) 공간과 같은 제곱 L2 거리(단위 벡터 기준 2 - 2·cos)로 반환하여 기존 threshold 를 그대로 사용합니다.
+    """
+
+    def __init__(self, vectors: np.ndarray, ids: list, documents: list, metadata_columns: dict, version=None,
+                 normalized: bool = False, store: EmbeddingStore = None):
+        """
+        normalized: vectors 가 이미 단위 벡터이면 복사 없이 그대로 사용 (메모리 매핑된 저장소를 페이지 단위로 지연 로드)
+        store: 지정하면 ids / documents / metadata_columns 대신 매핑된 메타데이터 테이블에서 결과 행만 읽음
+               (텍스트를 워커마다 파이썬 객체로 복사하지 않으므로 여러 워커가 같은 스냅샷을 공유)
+        """
+        if normalized:
+            self.matrix = vectors
+        else:
+            matrix = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self.matrix = np.ascontiguousarray(matrix / norms)
+        self.ids = ids
+        self.documents = documents
+        self.metadata_columns = metadata_columns
+        self.version = version
+        self.store = store
+
+    @classmethod
+    def from_store(cls, store: EmbeddingStore):
+        return cls(store.vectors, None, None, None, version=store.version, normalized=store.normalized, store=store)
+
+    def query(self, query_embeddings: list, n_results: int = 3, include: list = None) -> dict:
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        scores = (queries / norms) @ self.matrix.T  # (질의 수, 문서 수) 코사인 유사도
+
+        k = min(n_results, self.matrix.shape[0])
+        if k < self.matrix.shape[0]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.tile(np.arange(k), (scores.shape[0], 1))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return self._format_results(top, np.maximum(2.0 - 2.0 * top_scores, 0.0))
+
+    def _format_results(self, top: np.ndarray, distances: np.ndarray) -> dict:
+        if self.store is not None:
+            return self._format_store_results(top, distances)
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': distances.tolist()}
+        for row in top.tolist():
+            results['ids'].append([self.ids[i] for i in row])
+            results['documents'].append([self.documents[i] for i in row])
+            results['metadatas'].append([
+                {col: values[i] for col, values in self.metadata_columns.items()} for i in row
+            ])
+        return results
+
+    def _format_store_results(self, top: np.ndarray, distances: np.ndarray) -> dict:
+        metadata_columns = [col for col in METADATA_COLUMNS if col in self.store.table.column_names]
+        rows = self.store.rows(top.ravel().tolist(), ['id', *metadata_columns])
+        if 'category' in rows:
+            # Chroma 메타데이터와 동일하게 카테고리 리스트를 문자열로 반환
+            rows['category'] = [str(list(c)) if c is not None else '' for c in rows['category']]
+
+        results = {'ids': [], 'documents': [], 'metadatas': [], 'distances': distances.tolist()}
+        k = top.shape[1]
+        for start in range(0, top.size, k):
+            positions = range(start, start + k)
+            results['ids'].append([rows['id'][i] for i in positions])
+            results['documents'].append([rows['question_clean'][i] for i in positions])
+            results['metadatas'].append([{col: rows[col][i] for col in metadata_columns} for i in positions])
+        return results
+
+    def index_version(self):
+        return self.version
+
+
+class QuantizedBackend(NumpyBackend):
+    """
+    양자화 색인(int8 / PQ) 또는 축소 차원 색인(matryoshka) 근사 검색 + 원본 재계산.
+    메모리에 상주하는 것은 압축된 색인뿐이고, 근사 점수 상위 candidates 개만 디스크(메모리 매핑)의 float32 벡터로
+    정확한 코사인 유사도를 다시 계산하므로 반환 거리는 NumpyBackend 와 같은 기준입니다.
+    """
+
+    def __init__(self, index, store: EmbeddingStore, candidates: int = 50):
+        super().__init__(store.vectors, None, None, None, version=store.version, normalized=True, store=store)
+        self.index = index
+        self.candidates = candidates
+        self.normalized = store.normalized
+
+    @classmethod
+    def from_store(cls, store: EmbeddingStore, kind: str = "int8", candidates: int = 50, pq_subvectors: int = 96,
+                   matryoshka_dimensions: int = 256):
+        expected_dim = min(matryoshka_dimensions, store.dim) if kind == "matryoshka" else None
+        index = load_quantized_index(store.store_dir, kind, source_version=store.version, dim=expected_dim)
+        if index is None:
+            # 스냅샷에 기록된 양자화 색인이 없으면 메모리에서 생성 (워커마다 생성하므로 python -m src.quantization 권장)
+            logging.warning(f"스냅샷에 '{kind}' 양자화 색인이 없어 새로 생성합니다: {store.store_dir}")
+            index = train_quantized_index(store.vectors, kind, pq_subvectors, matryoshka_dimensions)
+        return cls(index, store, candidates)
+
+    def query(self, query_embeddings: list, n_results: int = 3, include: list = None) -> dict:
+        queries = normalize_rows(query_embeddings)
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+        top, top_scores = rescored_search(self.index, self.matrix, queries, n_results, self.candidates,
+                                          normalized=self.normalized)
+        return self._format_results(top, np.maximum(2.0 - 2.0 * top_scores, 0.0))
+
+
+def create_backend(backend: str, db_path: str = "data/chroma_db", store_dir: str = "data/embedding_store",
+                   collection_name: str = "faq_embeddings", store: EmbeddingStore = None) -> RetrievalBackend:
+    """
+    설정값(RETRIEVAL_BACKEND)에 따라 검색 백엔드를 생성합니다.
+    - chroma: Chroma PersistentClient + HNSW
+    - numpy : 임베딩 저장소를 메모리에 올려 정확 검색 (store 를 주면 이미 매핑한 저장소를 사용)
+    - int8 / pq / matryoshka: 압축 색인 근사 검색 후 상위 후보만 원본 벡터로 재계산
+    """
+    if backend == "chroma":
+        chroma_client = initialize_chroma(db_path)
+        try:
+            collection = chroma_client.get_collection(name=collection_name)
+            # ef_search 는 색인 생성 / 재색인(create_collection)에서만 저장 - 워커가 기동 / 교체할 때마다
+            # 공유 Chroma 저장소에 쓰지 않도록 서빙 경로에서는 설정값과 다르면 경고만 남김
+            ef_search = ((collection.configuration or {}).get('hnsw') or {}).get('ef_search')
+            if ef_search != HNSW_SEARCH_EF:
+                logging.warning(f"컬렉션의 ef_search({ef_search})가 HNSW_SEARCH_EF({HNSW_SEARCH_EF})와 다릅니다 "
+                                f"- src.reindex 또는 색인 생성 스크립트를 실행하면 적용됩니다.")
+            logging.info(f"컬렉션 '{collection_name}' 로드 완료 (space={collection_space(collection)}, "
+                         f"hnsw={collection.configuration.get('hnsw')})")
+        except Exception as e:
+            logging.error(f"컬렉션 '{collection_name}'을(를) 찾을 수 없습니다: {e}")
+            raise e
+        return ChromaBackend(collection, db_path)
+
+    if backend == "numpy":
+        retriever = NumpyBackend.from_store(store if store is not None else load_embedding_store(store_dir))
+        logging.info(f"NumPy 검색 백엔드 준비 완료: {retriever.matrix.shape}")
+        return retriever
+
+    if backend in QUANTIZED_KINDS:
+        retriever = QuantizedBackend.from_store(store if store is not None else load_embedding_store(store_dir), backend,
+                                                candidates=QUANTIZED_RESCORE_CANDIDATES, pq_subvectors=PQ_SUBVECTORS,
+                                                matryoshka_dimensions=MATRYOSHKA_DIMENSIONS)
+        logging.info(f"2단계({backend}) 검색 백엔드 준비 완료: {len(retriever.index)} rows, "
+                     f"{retriever.index.nbytes() / max(len(retriever.index), 1):.1f} bytes/vector")
+        return retriever
+
+    raise ValueError(f"지원하지 않는 검색 백엔드입니다: {backend}")
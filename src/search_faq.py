@@ -1,12 +1,18 @@
+import asyncio
 import logging
-import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 
+from src.config import RETRIEVAL_MAX_WORKERS
 from src.openai_embedding import load_openai_api_key
-from src.vector_db import initialize_chroma, create_collection, load_embeddings_from_csv
+from src.vector_db import initialize_chroma, create_collection, load_answer_index_from_store
+from src.embedding_store import load_embedding_store
 from src.create_query_embedding_openai import create_query_embedding
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# collection.query 는 동기(blocking) 호출이므로 크기가 제한된 스레드 풀에서 실행
+_retrieval_executor = ThreadPoolExecutor(max_workers=RETRIEVAL_MAX_WORKERS, thread_name_prefix="faq-search")
+
 def search_faq(collection, query_embedding: list, top_k: int = 3):
     try:
         results = collection.query(
@@ -19,17 +25,86 @@ def search_faq(collection, query_embedding: list, top_k: int = 3):
         logging.error(f"FAQ 검색 실패: {e}")
         raise
 
-def get_answers_from_results(results, df: pd.DataFrame):
+def search_faq_batch(collection, query_embeddings: list, top_k: int = 3):
+    """
+    여러 질의를 한 번의 query 호출로 검색합니다. 결과는 질의 순서대로 리스트의 리스트입니다.
+    """
+    try:
+        results = collection.query(
+            query_embeddings=query_embeddings,
+            n_results=top_k,
+            include=['metadatas', 'documents', 'distances']
+        )
+        return results
+    except Exception as e:
+        logging.error(f"FAQ 배치 검색 실패: {e}")
+        raise
+
+def select_query_results(results, row: int):
+    """
+    배치 검색 결과에서 row 번째 질의의 결과만 단일 질의 결과와 같은 형태로 꺼냅니다.
+    """
+    return {key: [results[key][row]] for key in ('ids', 'documents', 'metadatas', 'distances') if results.get(key)}
+
+async def search_faq_async(collection, query_embedding: list, top_k: int = 3):
+    """
+    search_faq 를 검색 전용 스레드 풀에서 실행하여 이벤트 루프를 막지 않습니다.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_retrieval_executor, search_faq, collection, query_embedding, top_k)
+
+async def search_faq_batch_async(collection, query_embeddings: list, top_k: int = 3):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_retrieval_executor, search_faq_batch, collection, query_embeddings, top_k)
+
+def get_answers_from_results(results, answer_index: dict = None):
+    """
+    검색 결과의 각 문서에 대한 답변을 반환합니다.
+    메타데이터에 저장된 answer_clean 을 우선 사용하고, 없으면 문서 id → 답변 인덱스에서 조회합니다 (O(1)).
+    """
     answers = []
+    metadatas = results.get('metadatas') or [[]]
+    ids = results.get('ids') or [[]]
     for i in range(len(results['documents'][0])):
-        question = results['documents'][0][i]
-        answer = df.loc[df['question_clean'] == question, 'answer_clean'].values
-        if len(answer) > 0:
-            answers.append(answer[0])
+        metadata = metadatas[0][i] if i < len(metadatas[0]) else None
+        answer = metadata.get('answer_clean') if metadata else None
+        if answer is None and answer_index is not None and i < len(ids[0]):
+            answer = answer_index.get(ids[0][i])
+        if answer is not None:
+            answers.append(answer)
         else:
             answers.append("해당 질문에 대한 답변을 찾을 수 없습니다.")
     return answers
 
+def split_top(results, n: int) -> dict:
+    """
+    검색 결과(단일 질의)의 상위 n 개 문서만 남긴 결과
+    """
+    return {
+        'ids': [(results.get('ids') or [[]])[0][:n]],
+        'documents': [results['documents'][0][:n]],
+        'metadatas': [(results.get('metadatas') or [[]])[0][:n]]
+    }
+
+def split_contexts(results, answer_index: dict = None, n_answers: int = 3) -> tuple:
+    """
+    검색 결과(단일 질의, top_k=5)를 LLM 답변 컨텍스트와 추천 질문 후보로 나눕니다.
+    상위 n_answers 개는 답변(FAQ 답변 텍스트), 나머지는 추천 질문(FAQ 질문 텍스트)으로 사용합니다.
+    """
+    return get_answers_from_results(split_top(results, n_answers), answer_index), list(results['documents'][0][n_answers:])
+
+def get_original_answer(results, answer_index=None) -> str:
+    """
+    1위 문서의 저장된 원문 답변 (직접 응답용). answer_clean 은 문장부호 / 줄바꿈이 제거되어 LLM 프롬프트에만 사용합니다.
+    원문을 조회할 수 없으면(원문 열이 없는 기존 CSV 답변 인덱스) answer_clean 을 사용합니다.
+    """
+    doc_id = ((results.get('ids') or [[]])[0] or [None])[0]
+    if doc_id is not None and hasattr(answer_index, 'get_original'):
+        answer = answer_index.get_original(doc_id)
+        if answer is not None:
+            return answer
+    return get_answers_from_results(split_top(results, 1), answer_index)[0]
+
 def main():
     client = load_openai_api_key()
 
@@ -42,8 +117,8 @@ def main():
         logging.error(f"컬렉션을 찾을 수 없습니다: {e}")
         return
 
-    embedding_csv_path = "../data/embeddings_openai.csv"
-    df_embeddings = load_embeddings_from_csv(embedding_csv_path)
+    embedding_store_dir = "data/embedding_store"
+    answer_index = load_answer_index_from_store(load_embedding_store(embedding_store_dir))
 
     user_query = input("질문을 입력하세요: ")
 
@@ -51,7 +126,7 @@ def main():
 
     results = search_faq(collection, query_embedding, top_k=5)
 
-    answers = get_answers_from_results(results, df_embeddings)
+    answers = get_answers_from_results(results, answer_index)
 
     print("\n검색된 FAQ 답변:")
     for idx, answer in enumerate(answers, 1):
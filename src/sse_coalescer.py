@@ -0,0 +1,64 @@
+import asyncio
+
+
+async def coalesce_deltas(deltas, window_ms: float = 30, max_bytes: int = 512):
+    """
+    LLM 스트림의 텍스트 조각(delta)을 모아 더 큰 조각으로 내보냅니다 (SSE 프레임 수 / write 횟수 감소).
+    - 첫 조각은 바로 내보내므로 첫 토큰까지의 시간(TTFT)은 그대로입니다.
+    - 이후에는 버퍼의 첫 조각이 들어온 뒤 window_ms 가 지나거나, 모인 크기가 max_bytes(UTF-8) 이상이면 내보냅니다.
+      다음 조각을 기다리는 중에도 window_ms 가 지나면 내보내므로 스트림이 잠시 멈춰도 지연은 window_ms 이내입니다.
+    window_ms <= 0 이면 조각을 그대로 내보냅니다.
+    """
+    if window_ms <= 0:
+        async for text in deltas:
+            yield text
+        return
+
+    loop = asyncio.get_running_loop()
+    window = window_ms / 1000
+    iterator = deltas.__aiter__()
+    buffer, size, deadline = [], 0, None
+    first = True
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            timeout = max(0.0, deadline - loop.time()) if buffer else None
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                # 다음 조각이 오기 전에 시간 창이 끝남 → 지금까지 모은 내용을 내보냄
+                yield "".join(buffer)
+                buffer, size, deadline = [], 0, None
+                continue
+
+            task, pending = pending, None
+            try:
+                text = task.result()
+            except StopAsyncIteration:
+                break
+
+            if first:
+                first = False
+                yield text
+                continue
+            if not buffer:
+                deadline = loop.time() + window
+            buffer.append(text)
+            size += len(text.encode('utf-8'))
+            if size >= max_bytes:
+                yield "".join(buffer)
+                buffer, size, deadline = [], 0, None
+
+        if buffer:
+            yield "".join(buffer)
+    finally:
+        # 소비 측이 중간에 멈춘 경우(연결 종료 등) 대기 중인 조각 요청을 취소하고 원본 스트림을 닫음
+        if pending is not None:
+            pending.cancel()
+            try:
+                await pending
+            except (asyncio.CancelledError, StopAsyncIteration, Exception):
+                pass
+        if hasattr(iterator, 'aclose'):
+            await iterator.aclose()
@@ -0,0 +1,28 @@
+# src/text_cleaning.py
+# FAQ 전처리(data_loader)와 서버(질의 정규화, 어휘 색인)가 함께 쓰는 텍스트 정제 규칙.
+# 서버가 pandas 를 불러오지 않도록 표준 라이브러리만 사용합니다.
+
+import re
+
+# 카테고리: 질문 안의 모든 대괄호 [] 안 내용 / 서브카테고리: 문장 끝의 소괄호 () 안 내용
+CATEGORY_PATTERN = re.compile(r'\[([^\]]+)\]')
+SUBCATEGORY_PATTERN = re.compile(r'\(([^)]+)\)$')
+# 질문 정제: 문장 시작의 대괄호 [] 와 문장 끝의 소괄호 () 를 한 번에 제거
+QUESTION_AFFIX_PATTERN = re.compile(r'^\[[^\]]+\]|\([^)]+\)$')
+# 특수 문자와 공백 연속 구간을 단일 공백으로 ([^\w\s] → ' ' 후 \s+ → ' ' 와 같은 결과)
+NON_WORD_PATTERN = re.compile(r'\W+')
+
+def clean_question(text: str) -> str:
+    """
+    질문 텍스트 정제 함수:
+    - 문장 시작의 대괄호 [] 안의 내용 제거
+    - 문장 끝의 소괄호 () 안의 내용 제거
+    - 중간에 있는 괄호들은 그대로 유지
+    - 특수 문자 제거 및 불필요한 공백 제거 (연속된 공백을 단일 공백으로 변경, 양쪽 끝 공백 제거)
+    """
+    text = QUESTION_AFFIX_PATTERN.sub('', text)
+    return NON_WORD_PATTERN.sub(' ', text).strip()
+
+def clean_answer(text: str) -> str:
+    # 특수 문자 제거 및 불필요한 공백 제거
+    return NON_WORD_PATTERN.sub(' ', text).strip()
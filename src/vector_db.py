@@ -1,27 +1,105 @@
 import ast
+import os
+from datetime import datetime
+from typing import TYPE_CHECKING
 
-import chromadb
-import pandas as pd
+from src.config import CHROMA_SPACE, HNSW_M, HNSW_CONSTRUCTION_EF, HNSW_SEARCH_EF
+from src.embedding_store import EmbeddingStore, load_embedding_store
 
+# chromadb / pandas 는 import 비용이 커서(서버 기동 시간) 실제로 사용하는 함수 안에서 불러옵니다.
+if TYPE_CHECKING:
+    import chromadb
+    import pandas as pd
+
+
+def initialize_chroma(db_path: str = "data/chroma_db") -> "chromadb.ClientAPI":
+    import chromadb
 
-def initialize_chroma(db_path: str = "../data/chroma_db") -> chromadb.Client:
     client = chromadb.PersistentClient(path=db_path)
     return client
 
 
-def create_collection(client: chromadb.Client, collection_name: str = "faq_embeddings"):
+CHROMA_SPACES = ("l2", "cosine", "ip")
+
+
+def hnsw_configuration(space: str = CHROMA_SPACE, m: int = HNSW_M, construction_ef: int = HNSW_CONSTRUCTION_EF,
+                       search_ef: int = HNSW_SEARCH_EF) -> dict:
+    """
+    Chroma collection 의 HNSW 설정 (create_collection 의 configuration)
+    """
+    if space not in CHROMA_SPACES:
+        raise ValueError(f"지원하지 않는 거리 공간입니다: {space} (지원: {', '.join(CHROMA_SPACES)})")
+    return {'hnsw': {'space': space, 'max_neighbors': m, 'ef_construction': construction_ef, 'ef_search': search_ef}}
+
+
+def collection_space(collection) -> str:
+    """
+    collection 의 거리 공간 (설정이 없는 이전 collection 은 Chroma 기본값 l2)
+    """
+    hnsw = (collection.configuration or {}).get('hnsw') or {}
+    return hnsw.get('space') or (collection.metadata or {}).get('hnsw:space') or "l2"
+
+
+def create_collection(client: "chromadb.ClientAPI", collection_name: str = "faq_embeddings",
+                      configuration: dict = None):
+    """
+    configuration: HNSW 설정 (기본값은 config 의 CHROMA_SPACE / HNSW_* )
+    이미 있는 collection 은 search_ef 만 갱신하고, 생성 시에만 정해지는 설정(공간/M/construction_ef)이 다르면 경고합니다.
+    """
+    configuration = configuration or hnsw_configuration()
     try:
-        if collection_name not in client.list_collections():
-            collection = client.create_collection(name=collection_name)
+        names = [c if isinstance(c, str) else c.name for c in client.list_collections()]
+        if collection_name not in names:
+            collection = client.create_collection(name=collection_name, configuration=configuration)
         else:
             collection = client.get_collection(name=collection_name)
+            apply_search_ef(collection, configuration['hnsw']['ef_search'])
+            current = collection.configuration.get('hnsw') or {}
+            fixed = {key: value for key, value in configuration['hnsw'].items() if key != 'ef_search'}
+            changed = {key: (current.get(key), value) for key, value in fixed.items() if current.get(key) != value}
+            if changed:
+                print(f"기존 collection '{collection_name}' 의 HNSW 설정이 다릅니다 (현재, 설정값): {changed} "
+                      f"- 적용하려면 {collection_name} 를 삭제하고 다시 색인하세요.")
     except Exception as e:
         print(f"collection 로드 실패: {e}")
         raise
     return collection
 
 
-def load_embeddings_from_csv(file_path: str) -> pd.DataFrame:
+def apply_search_ef(collection, search_ef: int):
+    """
+    검색 시 후보 목록 크기(ef_search)는 색인을 다시 만들지 않고 바꿀 수 있습니다.
+    """
+    hnsw = (collection.configuration or {}).get('hnsw') or {}
+    if hnsw.get('ef_search') != search_ef:
+        collection.modify(configuration={'hnsw': {'ef_search': search_ef}})
+
+
+INDEX_VERSION_FILE = "index_version"
+
+
+def write_index_version(db_path: str = "data/chroma_db") -> str:
+    """
+    FAQ 컬렉션을 (재)색인할 때마다 새 인덱스 버전을 기록합니다.
+    서버는 이 값이 바뀌면 응답 캐시 등 색인에 의존하는 상태를 무효화합니다.
+    """
+    version = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    with open(os.path.join(db_path, INDEX_VERSION_FILE), 'w', encoding='utf-8') as f:
+        f.write(version)
+    return version
+
+
+def read_index_version(db_path: str = "data/chroma_db"):
+    try:
+        with open(os.path.join(db_path, INDEX_VERSION_FILE), encoding='utf-8') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def load_embeddings_from_csv(file_path: str) -> "pd.DataFrame":
+    import pandas as pd
+
     try:
         df = pd.read_csv(file_path)
         print(f"Embedding 데이터 로드 성공: {df.shape[0]} rows")
@@ -31,35 +109,122 @@ def load_embeddings_from_csv(file_path: str) -> pd.DataFrame:
         raise
 
 
-def insert_embeddings(collection, df: pd.DataFrame):
+def load_answer_index(file_path: str) -> dict:
+    """
+    문서 id(= 임베딩 CSV 의 행 번호) → answer_clean 사전을 생성합니다.
+    임베딩 열은 읽지 않으므로 서버가 전체 DataFrame 을 메모리에 유지할 필요가 없습니다.
+    """
+    import pandas as pd
+
+    try:
+        df = pd.read_csv(file_path, usecols=['answer_clean'])
+        answer_index = dict(zip(df.index.astype(str), df['answer_clean']))
+        print(f"답변 인덱스 로드 성공: {len(answer_index)} rows")
+        return answer_index
+    except Exception as e:
+        print(f"답변 인덱스 로드 실패: {e}")
+        raise
+
+
+class StoreAnswerIndex:
+    """
+    문서 id → 답변 조회 (dict 와 같은 get 인터페이스).
+    id → 행 번호만 메모리에 두고 답변 텍스트는 메모리 매핑된 저장소에서 조회 시점에 읽습니다.
+    """
+
+    def __init__(self, store: EmbeddingStore):
+        self.store = store
+        self._rows = {doc_id: row for row, doc_id in enumerate(store.column('id'))}
+
+    def get(self, doc_id, default=None, column: str = 'answer_clean'):
+        row = self._rows.get(doc_id)
+        if row is None:
+            return default
+        return self.store.rows([row], [column])[column][0]
+
+    def get_original(self, doc_id, default=None):
+        """
+        정제 전 원문 답변 (문장부호 / 줄바꿈 유지 - 직접 응답용)
+        """
+        if 'answer' not in self.store.table.column_names:
+            return self.get(doc_id, default)
+        return self.get(doc_id, default, column='answer')
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+def load_answer_index_from_store(store: EmbeddingStore) -> StoreAnswerIndex:
+    """
+    임베딩 저장소의 id / answer_clean 열로 문서 id → 답변 인덱스를 생성합니다.
+    """
+    answer_index = StoreAnswerIndex(store)
+    print(f"답변 인덱스 로드 성공: {len(answer_index)} rows")
+    return answer_index
+
+
+def insert_embeddings(collection, df: "pd.DataFrame", embeddings=None, batch_size: int = 1000):
+    """
+    embeddings 를 주지 않으면 df 의 embedding 열(구 CSV 형식)을 사용합니다.
+    df 에 id 열이 있으면 문서 id 로 사용하고, 없으면 행 번호를 사용합니다.
+    upsert 로 기록하므로 다시 실행해도 중복되거나 실패하지 않습니다.
+    """
     try:
-        if isinstance(df['embedding'][0], str):
-            df['embedding'] = df['embedding'].apply(ast.literal_eval)
-        embeddings = df['embedding'].tolist()
-        ids = df.index.astype(str).to_list()
-        metadatas = df[['question_clean', 'category', 'subcategory']].to_dict(orient='records')
-        collection.add(
-            documents=df['question_clean'].tolist(),
-            embeddings=embeddings,
-            metadatas=metadatas,
-            ids=ids
-        )
-        print("Embedding 데이터베이스에 삽입 완료")
+        if embeddings is None:
+            if isinstance(df['embedding'][0], str):
+                df['embedding'] = df['embedding'].apply(ast.literal_eval)
+            embeddings = df['embedding'].tolist()
+        ids = df['id'].to_list() if 'id' in df.columns else df.index.astype(str).to_list()
+        # 답변을 메타데이터에 함께 저장하여 검색 결과에서 바로 꺼내 쓸 수 있도록 함
+        metadata_columns = ['question_clean', 'answer_clean', 'category', 'subcategory']
+        if 'content_hash' in df.columns:
+            metadata_columns.append('content_hash')
+        metadatas = df[metadata_columns].to_dict(orient='records')
+        for metadata in metadatas:
+            # Chroma 메타데이터는 리스트를 저장할 수 없으므로 카테고리 리스트는 문자열로 저장 (구 CSV 형식과 동일)
+            if not isinstance(metadata['category'], str):
+                metadata['category'] = str(list(metadata['category']))
+        documents = df['question_clean'].tolist()
+        for start in range(0, len(ids), batch_size):
+            end = start + batch_size
+            collection.upsert(
+                documents=documents[start:end],
+                embeddings=embeddings[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end]
+            )
+        print(f"Embedding 데이터베이스에 삽입 완료: {len(ids)} rows")
     except Exception as e:
         print(f"Embedding 데이터베이스 삽입 실패: {e}")
         raise
 
 
+def get_indexed_hashes(collection) -> dict:
+    """
+    컬렉션에 색인된 문서 id → content_hash (구 형식 문서는 None)
+    """
+    indexed = collection.get(include=['metadatas'])
+    return {doc_id: (metadata or {}).get('content_hash') for doc_id, metadata in zip(indexed['ids'], indexed['metadatas'])}
+
+
+def delete_embeddings(collection, ids: list, batch_size: int = 1000):
+    for start in range(0, len(ids), batch_size):
+        collection.delete(ids=ids[start:start + batch_size])
+    print(f"Embedding 데이터베이스에서 삭제 완료: {len(ids)} rows")
+
+
 if __name__ == "__main__":
-    embedding_csv_path = "../data/embeddings_openai.csv"
+    embedding_store_dir = "data/embedding_store"
 
     chroma_client = initialize_chroma()
 
     collection = create_collection(chroma_client)
 
-    df_embeddings = load_embeddings_from_csv(embedding_csv_path)
+    store = load_embedding_store(embedding_store_dir)
+
+    insert_embeddings(collection, store.to_dataframe(), store.vectors)
 
-    insert_embeddings(collection, df_embeddings)
+    write_index_version()
 
 
     print("Chroma 데이터베이스 저장 완료")
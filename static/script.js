@@ -63,6 +63,10 @@ document.addEventListener("DOMContentLoaded", function () {
                         hideLoadingIndicator();
                         eventSource.close();
                     } else if (status === "error") {
+                        // 첫 프레임이 error 인 경우(시간 초과 등)에도 메시지를 표시
+                        if (!botMsgDiv) {
+                            botMsgDiv = addMessage("bot", "");
+                        }
                         botMsgDiv.querySelector(".text").textContent = `Error: ${data}`;
                         hideLoadingIndicator();
                         eventSource.close();